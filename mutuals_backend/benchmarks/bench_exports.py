@@ -0,0 +1,122 @@
+"""
+Streaming exports: peak Python memory while streaming the users and events
+exports (mutuals_app/exports.py) at growing table sizes, against building
+the same rows as one list first.
+
+    python benchmarks/bench_exports.py --rows 10000 50000 100000
+
+Runs against a scratch SQLite file, growing the tables between sizes.
+Streaming should stay flat; the list grows with the rows.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mutuals_backend.settings")
+
+CITIES = ["London", "Manchester", "Bolton", "Preston", "Liverpool", "Stockport"]
+TAGS = ["cars", "family", "music", "travel", "art", "gaming", "fitness", "parenting", "diy", "nature"]
+
+
+def setup_database():
+    from django.conf import settings
+
+    settings.DATABASES["default"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(tempfile.mkdtemp(), "exports.sqlite3"),
+    }
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+
+    from mutuals_app.models import Group, Interest
+    Interest.objects.bulk_create([Interest(name=f"Interest {i}") for i in range(40)])
+    Group.objects.bulk_create([Group(group_id=i, name=f"Group {i}") for i in range(1, 10)])
+
+
+def grow(start, stop, rng):
+    """
+    Adds users start..stop (3 interests each) and as many events, with bulk
+    queries bypassing signals.
+    """
+    from mutuals_app.models import Event, Group, Interest, User
+
+    interests = list(Interest.objects.values_list("pk", flat=True))
+    groups = list(Group.objects.values_list("pk", flat=True))
+    for lo in range(start, stop, 20000):
+        hi = min(lo + 20000, stop)
+        users = User.objects.bulk_create([
+            User(
+                name=f"User {i}", user_id=f"B{i:08d}", dob=datetime.date(1990, 1, 1), gender="F",
+                city=rng.choice(CITIES), occupation="Engineer", budget=rng.choice([500, 1250.5]),
+                age=30, age_range="26-35", group_id=rng.choice(groups),
+            )
+            for i in range(lo, hi)
+        ])
+        User.interests.through.objects.bulk_create([
+            User.interests.through(user_id=user.pk, interest_id=interest)
+            for user in users
+            for interest in rng.sample(interests, 3)
+        ])
+        Event.objects.bulk_create([
+            Event(
+                event_id=i, event_name=f"Event {i}", event_date=datetime.date(2025, 6, 1),
+                location=rng.choice(CITIES), ticket_price=round(rng.uniform(5, 300), 2),
+                venue_id=i % 50, tags=rng.sample(TAGS, 3),
+            )
+            for i in range(lo, hi)
+        ])
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of the streaming exports.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 50000, 100000])
+    args = parser.parse_args()
+
+    setup_database()
+
+    from mutuals_app.exports import EVENT_COLUMNS, USER_COLUMNS, event_rows, export_response, user_rows
+
+    def streamed(columns, rows, fmt):
+        return lambda: sum(len(chunk) for chunk in export_response("export", columns, rows(), fmt).streaming_content)
+
+    def listed(columns, rows, fmt):
+        return lambda: sum(len(chunk) for chunk in export_response("export", columns, list(rows()), fmt).streaming_content)
+
+    rng = random.Random(91)
+    print(f"{'rows':>8} {'export':<14} {'stream s':>9} {'stream MB':>10} {'list s':>8} {'list MB':>8} {'out MB':>8}")
+    current = 0
+    for rows in sorted(args.rows):
+        grow(current, rows, rng)
+        current = rows
+        for name, columns, source in (("users", USER_COLUMNS, user_rows), ("events", EVENT_COLUMNS, event_rows)):
+            for fmt in ("csv", "ndjson"):
+                s_time, s_peak, size = measure(streamed(columns, source, fmt))
+                l_time, l_peak, _ = measure(listed(columns, source, fmt))
+                print(
+                    f"{rows:>8} {name + ' ' + fmt:<14} {s_time:>9.2f} {s_peak:>10.1f} "
+                    f"{l_time:>8.2f} {l_peak:>8.1f} {size / 2**20:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Startup cost of the clustering model: unpickling the notebook artifacts
+(what ml_models/models.py used to do at import) versus lazily loading the
+compact .npz/.json artifacts.
+
+    python benchmarks/bench_model_startup.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETUP = """
+import os, sys, time, resource
+sys.path.insert(0, {backend!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mutuals_backend.settings')
+start = time.perf_counter()
+"""
+
+# Each snippet runs in a fresh interpreter so module caches don't hide the cost
+SNIPPETS = {
+    "pickles (legacy)": """
+import pickle
+import networkx
+import django.db.models
+model_path = os.path.join({backend!r}, "mutuals_app", "ml_models")
+for name in ("leiden_partition.pkl", "cluster_tags.pkl", "bipartite_graph.pkl"):
+    with open(os.path.join(model_path, name), "rb") as f:
+        pickle.load(f)
+""",
+    "import only (lazy)": """
+import mutuals_app.ml_models.models
+""",
+    "npz first use": """
+from mutuals_app.ml_models.models import model_registry
+model_registry.get()
+""",
+}
+
+REPORT = """
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def run(snippet):
+    code = (SETUP + snippet).format(backend=BACKEND_DIR) + REPORT
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    elapsed, maxrss = out.split()
+    return float(elapsed), int(maxrss)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark clustering model startup.")
+    parser.add_argument('--runs', type=int, default=5, help='Cold starts per variant')
+    args = parser.parse_args()
+
+    print(f"{'variant':<20} {'median ms':>10} {'min ms':>10} {'max RSS MB':>11}")
+    for name, snippet in SNIPPETS.items():
+        results = [run(snippet) for _ in range(args.runs)]
+        times = [t * 1000 for t, _ in results]
+        rss = max(r for _, r in results) / 1024
+        print(f"{name:<20} {statistics.median(times):>10.1f} {min(times):>10.1f} {rss:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Seeding: `seed_data.py --users --bulk` (load_users_bulk) against the
+row-by-row load_users, on synthetic CSVs of growing size.
+
+    python benchmarks/bench_seeding.py --rows 10000 100000 1000000
+
+Rows are drawn from data/clustered_mutuals.csv with fresh user ids, so they
+keep its interests and clusters (and get packed into subgroups). Each run
+loads into a fresh scratch SQLite file; the row-by-row loader only runs up
+to --legacy-max rows. Peak RSS is that of the whole benchmark so far, so
+it should stop growing once the file no longer fits one chunk.
+"""
+import argparse
+import contextlib
+import io
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mutuals_backend.settings")
+
+SAMPLE_CSV = os.path.join(BACKEND_DIR, "data", "clustered_mutuals.csv")
+GROUPS_JSON = os.path.join(BACKEND_DIR, "data", "groups.json")
+
+
+def synthetic_csv(rows, directory, chunk_size=100000):
+    # Written a chunk at a time, to keep the benchmark's own peak RSS down
+    sample = pd.read_csv(SAMPLE_CSV, index_col=0)
+    path = os.path.join(directory, f"users_{rows}.csv")
+    for start in range(0, rows, chunk_size):
+        count = min(chunk_size, rows - start)
+        df = sample.sample(n=count, replace=True, random_state=start).reset_index(drop=True)
+        df.index += start
+        df["user_id"] = range(start + 1, start + count + 1)
+        df.to_csv(path, mode="a" if start else "w", header=not start)
+    return path
+
+
+def fresh_database(directory, name):
+    from django.core.management import call_command
+    from django.db import connections
+
+    connection = connections["default"]
+    connection.close()
+    connection.settings_dict["NAME"] = os.path.join(directory, f"{name}.sqlite3")
+    call_command("migrate", verbosity=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk against row-by-row user seeding.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None, help="Parse processes (default: CPU count - 1)")
+    parser.add_argument("--legacy-max", type=int, default=10000, help="Largest size to run load_users on")
+    args = parser.parse_args()
+
+    from django.conf import settings
+
+    directory = tempfile.mkdtemp()
+    settings.DATABASES["default"]["NAME"] = os.path.join(directory, "scratch.sqlite3")
+    import seed_data  # sets Django up
+
+    def seed(name, load):
+        fresh_database(directory, name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed_data.load_interests(SAMPLE_CSV)
+            seed_data.load_groups(GROUPS_JSON)
+            start = time.perf_counter()
+            result = load()
+        return time.perf_counter() - start, result
+
+    # read and parse overlap the inserts (wait: inserts held up by parsing)
+    stages = ["read", "parse", "wait", "prepare", "insert", "subgroups"]
+    print(
+        f"{'rows':>8} " + " ".join(f"{stage:>9}" for stage in stages)
+        + f" {'bulk s':>8} {'peak MB':>8} {'legacy s':>9}"
+    )
+    for rows in sorted(args.rows):
+        path = synthetic_csv(rows, directory)
+        bulk, times = seed(f"bulk_{rows}", lambda: seed_data.load_users_bulk(path, args.chunk_size, args.workers))
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        legacy = seed(f"legacy_{rows}", lambda: seed_data.load_users(path))[0] if rows <= args.legacy_max else None
+        print(
+            f"{rows:>8} " + " ".join(f"{times.times.get(stage, 0):>9.2f}" for stage in stages)
+            + f" {bulk:>8.2f} {peak_mb:>8.0f} " + (f"{legacy:>9.2f}" if legacy is not None else f"{'-':>9}")
+        )
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+List serialization: DRF serializers + JSONRenderer versus the fast path
+(values() rows + FastJSONRenderer, see mutuals_app/fast_serializers.py) for
+users, events and subgroups, and a check that both produce the same bytes.
+
+    python benchmarks/bench_serialization.py --rows 1000 10000 100000
+
+Runs against a scratch SQLite file. orjson is used by the fast path when
+installed; without it only the row projection is faster.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mutuals_backend.settings")
+
+CITIES = ["London", "Manchester", "Bolton", "Preston", "Liverpool", "Stockport"]
+TAGS = ["cars", "family", "music", "travel", "art", "gaming", "fitness", "parenting", "diy", "nature"]
+
+
+def setup_database():
+    from django.conf import settings
+
+    settings.DATABASES["default"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(tempfile.mkdtemp(), "bench.sqlite3"),
+    }
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+
+
+def populate(rows, rng):
+    """
+    Inserts `rows` users (with groups, subgroups of 5 and 3 interests each) and
+    `rows` events with bulk queries, bypassing signals.
+    """
+    from mutuals_app.models import Event, Group, Interest, SubGroup, User
+
+    Interest.objects.bulk_create([Interest(name=f"Interest {i}") for i in range(40)])
+    interests = list(Interest.objects.values_list("pk", flat=True))
+    Group.objects.bulk_create([Group(group_id=i, name=f"Group {i}") for i in range(1, 10)])
+    groups = list(Group.objects.values_list("pk", flat=True))
+
+    SubGroup.objects.bulk_create(
+        [
+            SubGroup(subgroup_id=i, group_id=groups[i % len(groups)], name=f"Squad {i}", member_count=5)
+            for i in range(rows // 5 + 1)
+        ],
+        batch_size=2000,
+    )
+    subgroups = list(SubGroup.objects.order_by("pk").values_list("pk", "group_id"))
+
+    users = []
+    for i in range(rows):
+        subgroup, group = subgroups[i // 5]
+        users.append(User(
+            name=f"User {i}", user_id=f"B{i:07d}", dob=datetime.date(1990, 1, 1) + datetime.timedelta(days=i % 9000),
+            gender=rng.choice(["M", "F"]), city=rng.choice(CITIES), occupation="Engineer",
+            budget=round(rng.uniform(100, 5000), 2), age=20 + i % 40, age_range="26-35",
+            group_id=group, subgroup_id=subgroup,
+        ))
+    User.objects.bulk_create(users, batch_size=2000)
+    Through = User.interests.through
+    Through.objects.bulk_create(
+        [
+            Through(user_id=pk, interest_id=interest)
+            for pk in User.objects.values_list("pk", flat=True)
+            for interest in rng.sample(interests, 3)
+        ],
+        batch_size=5000,
+    )
+
+    start = datetime.date(2026, 1, 1)
+    Event.objects.bulk_create(
+        [
+            Event(
+                event_id=i, event_name=f"Event {i}", event_date=start + datetime.timedelta(days=i % 365),
+                location=rng.choice(CITIES), ticket_price=round(rng.uniform(5, 300), 2), venue_id=i % 40,
+                tags=rng.sample(TAGS, 3),
+            )
+            for i in range(rows)
+        ],
+        batch_size=2000,
+    )
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def cases():
+    from django.db.models import Prefetch
+    from mutuals_app import fast_serializers as fast
+    from mutuals_app.models import Event, Interest, SubGroup, User
+    from mutuals_app.serializers import EventSerializer, SubGroupSerializer, UserSerializer
+
+    return {
+        "users": (
+            lambda: UserSerializer(
+                User.objects.select_related("group", "subgroup__group")
+                .prefetch_related(Prefetch("interests", queryset=Interest.objects.order_by("pk")))
+                .order_by("id"),
+                many=True,
+            ).data,
+            lambda: fast.user_dicts(list(User.objects.order_by("id").values(*fast.USER_VALUES))),
+        ),
+        "events": (
+            lambda: EventSerializer(Event.objects.order_by("pk"), many=True).data,
+            lambda: fast.event_dicts(Event.objects.order_by("pk")),
+        ),
+        "subgroups": (
+            lambda: SubGroupSerializer(SubGroup.objects.order_by("pk"), many=True).data,
+            lambda: fast.subgroup_list(SubGroup.objects.order_by("pk")),
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark list serialization.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept)")
+    args = parser.parse_args()
+
+    setup_database()
+
+    from django.conf import settings
+    from django.core.management import call_command
+    from rest_framework.renderers import JSONRenderer
+    from mutuals_app.renderers import FastJSONRenderer, orjson
+
+    settings.FAST_SERIALIZATION = True
+    print(f"orjson: {'yes' if orjson else 'no'}")
+    print(f"{'rows':>7} {'list':<10} {'drf (s)':>9} {'fast (s)':>9} {'speedup':>8}  same bytes")
+
+    for rows in args.rows:
+        call_command("flush", interactive=False, verbosity=0)
+        populate(rows, random.Random(rows))
+        for name, (drf, fast) in cases().items():
+            drf_time, drf_bytes = timed(lambda: JSONRenderer().render(drf()), args.repeat)
+            fast_time, fast_bytes = timed(lambda: FastJSONRenderer().render(fast()), args.repeat)
+            print(
+                f"{rows:>7} {name:<10} {drf_time:>9.3f} {fast_time:>9.3f} "
+                f"{drf_time / fast_time:>7.1f}x  {drf_bytes == fast_bytes}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Read latency under concurrent signups, through the ASGI application.
+
+Reader tasks fetch user details and events-by-user pages for random users
+while signup tasks keep creating users (each one scored against the
+clustering model), then the read latency percentiles are reported for
+
+- sync:  the DRF views (/api/...), each run in its own thread by Django,
+- async: the async views (/api/async/..., see mutuals_app/async_views.py),
+         with scoring queued in the CLUSTER_SCORING_WORKERS pool.
+
+    python benchmarks/load_async_reads.py --readers 8 --signups 4 --seconds 15
+
+Requests go straight to the ASGI callable (no server or sockets), against a
+scratch SQLite file seeded from data/. --no-cache swaps in a dummy cache so
+every read reaches the database.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mutuals_backend.settings")
+
+PREFIXES = {"sync": "/api", "async": "/api/async"}
+
+
+def setup_database(args):
+    from django.conf import settings
+
+    settings.DATABASES["default"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(tempfile.mkdtemp(), "load.sqlite3"),
+        # Take the write lock up front and wait for it instead of failing
+        "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 60},
+    }
+    settings.CLUSTER_SCORING_WORKERS = args.scoring_workers
+    if args.no_cache:
+        for alias in settings.CACHES:
+            settings.CACHES[alias] = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+
+    import seed_data
+
+    call_command("migrate", verbosity=0)
+    os.chdir(BACKEND_DIR)
+    with contextlib.redirect_stdout(io.StringIO()):
+        seed_data.load_interests("./data/clustered_mutuals.csv")
+        seed_data.load_groups("./data/groups.json")
+        seed_data.load_events("./data/mock_events.csv")
+        seed_data.load_users("./data/clustered_mutuals.csv")
+
+
+async def call(app, method, path, body=None):
+    """
+    One request to the ASGI app. Returns the response status.
+    """
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"localhost"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    payload = json.dumps(body).encode() if body else b""
+    scope["headers"].append((b"content-length", str(len(payload)).encode()))
+    messages = [{"type": "http.request", "body": payload, "more_body": False}]
+    never = asyncio.Event()
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await never.wait()  # The client never disconnects
+
+    response = {}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+
+    await app(scope, receive, send)
+    return response.get("status")
+
+
+async def reader(app, prefix, user_ids, end, latencies, counts, rng):
+    while time.perf_counter() < end:
+        user_id = rng.choice(user_ids)
+        path = rng.choice([f"{prefix}/user-detail/{user_id}/", f"{prefix}/events/user/{user_id}/"])
+        start = time.perf_counter()
+        status = await call(app, "GET", path)
+        latencies.append(time.perf_counter() - start)
+        counts["failed"] += status != 200
+
+
+async def signer(app, prefix, interests, end, counts, rng):
+    while time.perf_counter() < end:
+        picked = rng.sample(interests, rng.randint(2, 5))
+        status = await call(app, "POST", f"{prefix}/users/", {
+            "name": "Load Test", "dob": f"{rng.randint(1960, 2004)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+            "gender": rng.choice(["M", "F"]), "city": "London", "occupation": "Tester",
+            "budget": rng.choice([200, 500, 1000, 2000]), "interests": picked, "interest_ids": picked,
+        })
+        counts["ok" if status == 201 else "failed"] += 1
+
+
+async def run(mode, args):
+    from django.core.asgi import get_asgi_application
+    from mutuals_app.ml_models.models import get_assignment_index
+    from mutuals_app.models import Interest, User
+
+    app = get_asgi_application()
+    await asyncio.to_thread(get_assignment_index)
+    user_ids = await asyncio.to_thread(lambda: list(User.objects.values_list("user_id", flat=True)))
+    interests = await asyncio.to_thread(lambda: list(Interest.objects.values_list("pk", flat=True)))
+
+    prefix = PREFIXES[mode]
+    rng = random.Random(args.seed)
+    latencies, counts = [], {"ok": 0, "failed": 0}
+    end = time.perf_counter() + args.seconds
+    await asyncio.gather(
+        *[reader(app, prefix, user_ids, end, latencies, counts, random.Random(rng.random())) for _ in range(args.readers)],
+        *[signer(app, prefix, interests, end, counts, random.Random(rng.random())) for _ in range(args.signups)],
+    )
+    ms = np.asarray(latencies) * 1000
+    return {
+        "mode": mode,
+        "reads": len(ms),
+        "p50": np.percentile(ms, 50) if len(ms) else 0.0,
+        "p95": np.percentile(ms, 95) if len(ms) else 0.0,
+        "p99": np.percentile(ms, 99) if len(ms) else 0.0,
+        "signups": counts["ok"],
+        "failed": counts["failed"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read latency under concurrent signups, sync vs async views.")
+    parser.add_argument("--modes", nargs="+", choices=sorted(PREFIXES), default=["sync", "async"])
+    parser.add_argument("--readers", type=int, default=8, help="Concurrent read loops")
+    parser.add_argument("--signups", type=int, default=4, help="Concurrent signup loops")
+    parser.add_argument("--seconds", type=float, default=15.0, help="Duration of each run")
+    parser.add_argument("--scoring-workers", type=int, default=2, help="CLUSTER_SCORING_WORKERS")
+    parser.add_argument("--no-cache", action="store_true", help="Use a dummy cache")
+    parser.add_argument("--seed", type=int, default=91)
+    args = parser.parse_args()
+
+    setup_database(args)
+
+    print(f"{'mode':<6} {'reads':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'signups':>8} {'failed':>7}")
+    for mode in args.modes:
+        with contextlib.redirect_stdout(io.StringIO()):  # Scoring logs neighbours
+            r = asyncio.run(run(mode, args))
+        print(
+            f"{r['mode']:<6} {r['reads']:>7} {r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f} "
+            f"{r['signups']:>8} {r['failed']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Concurrent subgroup placement: signs up users from several threads at once
+into a single group (the worst case, every signup competes for the same
+subgroups), then checks that no subgroup ended up with more than 5 members
+or with members more than 5 years or 500 budget apart, and that the stored
+aggregates match the members. tests/test_subgroups.py runs it as a test.
+
+    python benchmarks/stress_subgroup_allocation.py --users 400 --threads 1 2 4 8
+
+Runs against a scratch SQLite file by default. SQLite serializes writers, so
+throughput only scales on a server database; point --database-engine/--database-*
+at one (e.g. PostgreSQL) to measure that.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mutuals_backend.settings")
+
+
+def configure(args):
+    from django.conf import settings
+
+    if args.database_engine == "sqlite":
+        settings.DATABASES["default"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": args.database_name or os.path.join(tempfile.mkdtemp(), "stress.sqlite3"),
+            # Take the write lock up front and wait for it instead of failing
+            "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 60},
+        }
+    else:
+        settings.DATABASES["default"] = {
+            "ENGINE": args.database_engine,
+            "NAME": args.database_name,
+            "USER": args.database_user,
+            "PASSWORD": args.database_password,
+            "HOST": args.database_host,
+        }
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+
+
+def sign_up(group, count, seed, errors):
+    from django.db import connection
+    from mutuals_app.ml_models.models import assign_user_to_subgroup
+    from mutuals_app.models import SubGroup, User
+
+    rng = random.Random(seed)
+    try:
+        for i in range(count):
+            age = rng.randint(20, 32)
+            user = User.objects.create(
+                name=f"Stress {seed}-{i}",
+                user_id=f"S{seed:03d}{i:06d}",
+                dob="1990-01-01",
+                gender="F",
+                city="London",
+                occupation="Tester",
+                budget=rng.choice([200, 400, 600, 800, 1000]),
+                age=age,
+                age_range="25-34",
+                group=group,
+            )
+            assign_user_to_subgroup(user, SubGroup, group)
+    except Exception as exc:  # reported by the main thread
+        errors.append(exc)
+    finally:
+        connection.close()
+
+
+def run(threads, users):
+    from django.db.models import Count, Max, Min
+    from mutuals_app.models import Group, SubGroup, User
+
+    User.objects.all().delete()
+    SubGroup.objects.all().delete()
+    group, _ = Group.objects.get_or_create(group_id=9999, defaults={"name": "Stress"})
+
+    per_thread = users // threads
+    errors = []
+    workers = [
+        threading.Thread(target=sign_up, args=(group, per_thread, seed, errors))
+        for seed in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    placed = User.objects.filter(subgroup__isnull=False).count()
+    biggest = 0
+    mismatched = 0
+    for sg in SubGroup.objects.annotate(
+        n=Count("users"), lo_age=Min("users__age"), hi_age=Max("users__age"),
+        lo_budget=Min("users__budget"), hi_budget=Max("users__budget"),
+    ):
+        biggest = max(biggest, sg.n)
+        stored = (sg.member_count, sg.min_age, sg.max_age, sg.min_budget, sg.max_budget)
+        mismatched += stored != (sg.n, sg.lo_age, sg.hi_age, sg.lo_budget, sg.hi_budget)
+        if sg.n and (sg.hi_age - sg.lo_age > 5 or sg.hi_budget - sg.lo_budget > 500):
+            mismatched += 1
+
+    return {
+        "threads": threads,
+        "users": per_thread * threads,
+        "placed": placed,
+        "seconds": elapsed,
+        "rate": per_thread * threads / elapsed,
+        "subgroups": SubGroup.objects.count(),
+        "largest": biggest,
+        "mismatched": mismatched,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress concurrent subgroup placement.")
+    parser.add_argument("--users", type=int, default=400, help="Signups per run")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--database-engine", default="sqlite")
+    parser.add_argument("--database-name")
+    parser.add_argument("--database-user", default="")
+    parser.add_argument("--database-password", default="")
+    parser.add_argument("--database-host", default="")
+    args = parser.parse_args()
+
+    configure(args)
+
+    print(f"{'threads':>7} {'users':>6} {'placed':>6} {'users/s':>8} {'subgroups':>9} {'largest':>7} {'bad':>4}")
+    failed = False
+    for threads in args.threads:
+        r = run(threads, args.users)
+        print(
+            f"{r['threads']:>7} {r['users']:>6} {r['placed']:>6} {r['rate']:>8.1f} "
+            f"{r['subgroups']:>9} {r['largest']:>7} {r['mismatched']:>4}"
+        )
+        for exc in r["errors"]:
+            print(f"  error: {exc!r}")
+        failed |= bool(r["errors"]) or r["largest"] > 5 or r["mismatched"] > 0 or r["placed"] != r["users"]
+
+    if failed:
+        sys.exit("FAILED: subgroup invariants violated")
+    print("OK: every user placed, no subgroup above 5 members or out of range, aggregates consistent")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MutualsAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "mutuals_app"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,137 @@
+"""
+Async versions of the hot endpoints, for ASGI servers (asgi.py).
+
+They answer like their DRF counterparts in views.py, rendered by the same
+JSONRenderer, and share their queries and payload builders. Reads go
+through Django's async ORM; cluster scoring and event ranking run in the
+bounded scoring pool (ml_models/models.py), so a burst of signups queues
+there instead of taking the CPU from cheap reads on the same worker. Cache
+backends are sync (and may do I/O), so cache calls run in a thread.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+
+from .cache import get_cached, get_user_detail, set_cached, set_user_detail, user_detail_key
+from .ml_models.models import aassign_new_user_to_cluster, run_in_scoring_pool
+from .models import User
+from .serializers import UserSerializer
+from .views import (
+    complete_signup,
+    group_events_key,
+    group_events_page,
+    parse_page,
+    prepare_signup,
+    user_detail_payload,
+    user_detail_queryset,
+)
+
+
+def json_response(data, status):
+    # The bytes and content type of a DRF Response rendered as JSON
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type=JSONRenderer.media_type)
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    data = _json_body(request)
+    user_id = data.get('user_id') if data else None
+
+    if not user_id:
+        return json_response({"error": "user_id is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        user = await (
+            User.objects.select_related('group', 'subgroup__group')
+            .prefetch_related('interests')
+            .aget(user_id=user_id)
+        )
+    except User.DoesNotExist:
+        return json_response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    return json_response({
+        "message": "Login successful",
+        "user": UserSerializer(user).data
+    }, status=status.HTTP_200_OK)
+
+
+@require_GET
+async def get_user_by_user_id(request, user_id):
+    key = await sync_to_async(user_detail_key)(user_id)
+    user_data = await sync_to_async(get_user_detail)(key)
+    if user_data is not None:
+        return json_response(user_data, status=status.HTTP_200_OK)
+
+    try:
+        user = await user_detail_queryset().aget(user_id=user_id)
+    except User.DoesNotExist:
+        return json_response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    # Interests and members are prefetched: no queries from here on
+    members = user.subgroup.users.all() if user.subgroup else []
+    user_data = user_detail_payload(user, user.interests.all(), members)
+    await sync_to_async(set_user_detail)(key, user_data)
+    return json_response(user_data, status=status.HTTP_200_OK)
+
+
+@require_GET
+async def events_by_user_group_tags(request, user_id):
+    try:
+        user = await User.objects.select_related('group').aget(user_id=user_id)
+    except User.DoesNotExist:
+        return json_response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+    group = user.group
+
+    if not group:
+        return json_response({"error": "User does not belong to any group."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit, offset = parse_page(request.GET, default_limit=3)
+    except ValueError as e:
+        return json_response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    ranked = request.GET.get('mode') == 'ranked'
+
+    key = await sync_to_async(group_events_key)(request, user, ranked, limit, offset)
+    data = await sync_to_async(get_cached)('events-by-user', key)
+    if data is None:
+        if ranked:
+            data = await run_in_scoring_pool(group_events_page, user, group, ranked, limit, offset)
+        else:
+            data = await sync_to_async(group_events_page)(user, group, ranked, limit, offset)
+        await sync_to_async(set_cached)(key, data)
+    return json_response(data, status=status.HTTP_200_OK)
+
+
+@csrf_exempt
+@require_POST
+async def signup(request):
+    """
+    Same as POST /api/users/, with JSON bodies.
+    """
+    data = _json_body(request)
+    if data is None:
+        return json_response({"error": "A JSON object is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        interests_qs, interest_names = await sync_to_async(prepare_signup)(data)
+    except ValidationError as e:
+        return json_response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+    cluster_assignment = await aassign_new_user_to_cluster(data['user_id'], interest_names)
+    payload, code = await sync_to_async(complete_signup)(data, interests_qs, cluster_assignment)
+    return json_response(payload, status=code)
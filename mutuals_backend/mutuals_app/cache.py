@@ -0,0 +1,194 @@
+"""
+Cached API payloads.
+
+User detail payloads (get_user_by_user_id) are cached per user_id, under a
+key holding a token per user and a generation number. Signals give the users
+a change touches a new token; changes that reach many users at once (renamed
+interests or groups, bulk writes) bump the generation instead, which drops
+them all. The key is read before the user is loaded, so a payload built
+from rows an invalidation has since replaced is stored under a key nobody
+reads any more. Tokens and generation live in the cache itself, so the
+alias has to be shared by the workers (the file backend or a cache server);
+`manage.py check --deploy` warns about a per-process one.
+
+Rendered list responses (interests, groups, subgroups, events) and
+events-by-user payloads are keyed on the version stamps of the resources
+they show (see conditional.py). The signals that bump a stamp on every write
+therefore retire exactly the entries built from the old data; they are
+never served again and age out of the cache.
+
+Hits and misses are counted per endpoint in each worker (cache_stats).
+"""
+import hashlib
+import threading
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+
+from .conditional import resource_versions
+
+USER_DETAIL_GENERATION_KEY = "user-detail:generation"
+
+
+def user_detail_cache():
+    return caches[getattr(settings, "USER_DETAIL_CACHE_ALIAS", "default")]
+
+
+def _generation(cache):
+    generation = cache.get(USER_DETAIL_GENERATION_KEY)
+    if generation is None:
+        cache.add(USER_DETAIL_GENERATION_KEY, 0, timeout=None)
+        generation = cache.get(USER_DETAIL_GENERATION_KEY, 0)
+    return generation
+
+
+def _token_key(user_id):
+    return f"user-detail:token:{user_id}"
+
+
+def _timeout():
+    return getattr(settings, "USER_DETAIL_CACHE_TIMEOUT", 300)
+
+
+def user_detail_key(user_id):
+    """
+    Key of the user's cached details. Read it before loading the user, and
+    store the payload built from those rows under it.
+    """
+    cache = user_detail_cache()
+    found = cache.get_many([USER_DETAIL_GENERATION_KEY, _token_key(user_id)])
+    generation = found.get(USER_DETAIL_GENERATION_KEY)
+    if generation is None:
+        generation = _generation(cache)
+    return f"user-detail:{generation}:{user_id}:{found.get(_token_key(user_id), '')}"
+
+
+def get_user_detail(key):
+    return cache_stats.record("user-detail", user_detail_cache().get(key))
+
+
+def set_user_detail(key, data):
+    user_detail_cache().set(key, data, _timeout())
+
+
+def invalidate_user_details(user_ids):
+    # Tokens outlive the entries keyed on the previous ones, so a late
+    # write under an old token expires before that token could come back
+    tokens = {_token_key(user_id): uuid.uuid4().hex for user_id in user_ids}
+    if tokens:
+        user_detail_cache().set_many(tokens, 2 * _timeout())
+
+
+def invalidate_all_user_details():
+    cache = user_detail_cache()
+    try:
+        cache.incr(USER_DETAIL_GENERATION_KEY)
+    except ValueError:
+        # Not set yet (or evicted): anything cached was keyed on generation 0
+        cache.add(USER_DETAIL_GENERATION_KEY, 1, timeout=None)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_user_detail_cache(app_configs, **kwargs):
+    """
+    Invalidations only reach the worker that made them when the user
+    detail cache is per process.
+    """
+    alias = getattr(settings, "USER_DETAIL_CACHE_ALIAS", "default")
+    if isinstance(caches[alias], LocMemCache):
+        return [checks.Warning(
+            f"The user detail cache ({alias!r}) is per process, so other workers keep serving "
+            "details that changed until they expire.",
+            hint="Run a single worker, or set MUTUALS_CACHE_BACKEND=file or point the alias at a shared cache.",
+            id="mutuals_app.W001",
+        )]
+    return []
+
+
+class CacheStats:
+    """
+    Hit/miss counters per cached endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, name, value):
+        with self._lock:
+            counts = self._counts.setdefault(name, [0, 0])
+            counts[value is None] += 1
+        return value
+
+    def stats(self):
+        with self._lock:
+            counts = {name: tuple(c) for name, c in sorted(self._counts.items())}
+        result = {}
+        for name, (hits, misses) in counts.items():
+            lookups = hits + misses
+            result[name] = {"hits": hits, "misses": misses, "hit_ratio": hits / lookups if lookups else 0.0}
+        hits = sum(c[0] for c in counts.values())
+        lookups = hits + sum(c[1] for c in counts.values())
+        result["total"] = {"hits": hits, "misses": lookups - hits, "hit_ratio": hits / lookups if lookups else 0.0}
+        return result
+
+
+cache_stats = CacheStats()
+
+
+def response_cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def response_key(name, *parts):
+    """
+    Key for a cached response: the endpoint and everything it was built from
+    (version stamps, query string, negotiated format, ...).
+    """
+    return f"response:{name}:{hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()}"
+
+
+def get_cached(name, key):
+    return cache_stats.record(name, response_cache().get(key))
+
+
+def set_cached(key, value):
+    response_cache().set(key, value, getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300))
+
+
+def cached_response(resource):
+    """
+    Decorator for a list view: successful GETs are stored rendered, keyed on
+    the resource's version stamp, and served from the cache until it changes.
+    Goes under @versioned_resource so 304s are answered first.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method != "GET":
+                return view(request, *args, **kwargs)
+
+            key = response_key(
+                resource,
+                *resource_versions(request, resource),
+                request.get_full_path(),
+                request.META.get("HTTP_ACCEPT", ""),
+            )
+            cached = get_cached(resource, key)
+            if cached is not None:
+                status, headers, content = cached
+                return HttpResponse(content, status=status, headers=headers)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                if hasattr(response, "render"):
+                    response.render()
+                set_cached(key, (response.status_code, dict(response.headers), response.content))
+            return response
+        return wrapped
+    return decorator
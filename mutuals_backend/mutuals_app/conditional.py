@@ -0,0 +1,90 @@
+"""
+Conditional GET (ETag / Last-Modified) for the catalogue list endpoints.
+
+Each resource has a ResourceVersion row. Signals bump it on writes (API
+handlers, seeding, admin all go through model saves and deletes), and bulk
+writers call bump_versions() themselves. A GET reads the row and answers 304
+when the client's copy is current, without building the list.
+"""
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+# Resources whose payload embeds another's data also depend on it
+DEPENDENT_RESOURCES = {"groups": ("subgroups",)}
+
+
+def bump_versions(*resources):
+    from .models import ResourceVersion
+
+    names = set(resources)
+    for resource in resources:
+        names.update(DEPENDENT_RESOURCES.get(resource, ()))
+    for name in sorted(names):
+        updated = ResourceVersion.objects.filter(resource=name).update(
+            version=F("version") + 1, updated_at=timezone.now()
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    ResourceVersion.objects.create(resource=name, version=1)
+            except IntegrityError:  # Created concurrently
+                ResourceVersion.objects.filter(resource=name).update(
+                    version=F("version") + 1, updated_at=timezone.now()
+                )
+
+
+def _stamps(request, resources):
+    # Cached on the request: condition() asks for the ETag and Last-Modified
+    # separately, and the response cache keys on the same versions
+    request = getattr(request, "_request", request)  # DRF wraps the HttpRequest
+    stamps = request.__dict__.setdefault("_resource_versions", {})
+    missing = [resource for resource in resources if resource not in stamps]
+    if missing:
+        from .models import ResourceVersion
+        found = {
+            resource: (version, updated_at)
+            for resource, version, updated_at in ResourceVersion.objects.filter(
+                resource__in=missing
+            ).values_list("resource", "version", "updated_at")
+        }
+        for resource in missing:
+            stamps[resource] = found.get(resource, (0, None))
+    return [stamps[resource] for resource in resources]
+
+
+def _stamp(request, resource):
+    return _stamps(request, [resource])[0]
+
+
+def resource_versions(request, *resources):
+    """
+    Current version numbers of these resources, read in one query.
+    """
+    return tuple(version for version, _ in _stamps(request, resources))
+
+
+def versioned_resource(resource):
+    """
+    Decorator for a list view: ETag and Last-Modified come from the
+    resource's version stamp, and matching conditional GETs get a 304.
+    """
+    def etag(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return None
+        version, _ = _stamp(request, resource)
+        # The body also depends on the query string and the negotiated format
+        variant = hashlib.md5(
+            f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}".encode()
+        ).hexdigest()[:10]
+        return f"{resource}-{version}-{variant}"
+
+    def last_modified(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return None
+        return _stamp(request, resource)[1]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
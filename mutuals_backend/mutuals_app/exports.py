@@ -0,0 +1,145 @@
+"""
+Streaming bulk exports (users, groups, events) as CSV or NDJSON.
+
+Rows are read with QuerySet.iterator(chunk_size=EXPORT_CHUNK_SIZE) and
+encoded a chunk at a time into a StreamingHttpResponse, so memory stays flat
+however large the tables are. Under ASGI the response gets an async iterator
+that fetches each chunk in sync_to_async; Django would otherwise read a
+plain generator to the end before sending anything. The CSV layouts are those of the files the
+clustering notebook reads and seed_data.py loads: data/clustered_mutuals.csv
+for users (Cluster and Cluster_tag being the user's group), data/groups.json
+as columns for groups and data/mock_events.csv for events. The leading
+unnamed column is the pandas row index; NDJSON rows leave it out.
+"""
+import csv
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+USER_COLUMNS = [
+    "", "user_id", "name", "gender", "dob", "interests", "city", "occupation",
+    "budget", "age", "age_range", "Cluster", "Cluster_tag",
+]
+GROUP_COLUMNS = ["group_id", "name"]
+EVENT_COLUMNS = ["", "event_id", "event_name", "event_date", "location", "ticket_price", "venue_id", "tags"]
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def chunk_size():
+    return getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+
+
+def _number(value):
+    # Whole budgets are written as in the CSV (6376, not 6376.0)
+    return int(value) if value is not None and float(value).is_integer() else value
+
+
+def user_rows():
+    """
+    Users in pk order. Interest links are streamed alongside, also ordered
+    by user, and merged in (as clustering.load_profiles does).
+    """
+    from .models import Interest, User
+
+    interest_names = dict(Interest.objects.values_list("pk", "name"))
+    links = iter(
+        User.interests.through.objects.order_by("user_id", "pk")
+        .values_list("user_id", "interest_id")
+        .iterator(chunk_size=chunk_size())
+    )
+    users = (
+        User.objects.order_by("pk")
+        .values_list(
+            "pk", "user_id", "name", "gender", "dob", "city", "occupation",
+            "budget", "age", "age_range", "group__group_id", "group__name",
+        )
+        .iterator(chunk_size=chunk_size())
+    )
+
+    pending = next(links, None)
+    for index, (pk, user_id, name, gender, dob, city, occupation, budget, age, age_range, cluster, tag) in enumerate(users):
+        interests = []
+        while pending is not None and pending[0] <= pk:
+            if pending[0] == pk:
+                interests.append(interest_names[pending[1]])
+            pending = next(links, None)
+        yield [
+            index, user_id, name, gender, dob.isoformat() if dob else None, ", ".join(interests),
+            city, occupation, _number(budget), age, age_range, cluster, tag,
+        ]
+
+
+def group_rows():
+    from .models import Group
+
+    for row in Group.objects.order_by("group_id").values_list("group_id", "name").iterator(chunk_size=chunk_size()):
+        yield list(row)
+
+
+def event_rows():
+    from .models import Event
+
+    events = (
+        Event.objects.order_by("pk")
+        .values_list("event_id", "event_name", "event_date", "location", "ticket_price", "venue_id", "tags")
+        .iterator(chunk_size=chunk_size())
+    )
+    for index, (event_id, name, day, location, price, venue_id, tags) in enumerate(events):
+        yield [index, event_id, name, day.isoformat(), location, price, venue_id, tags]
+
+
+class _Echo:
+    # csv.writer target that hands back what it's given
+    def write(self, value):
+        return value
+
+
+def _csv_lines(columns, rows):
+    writer = csv.writer(_Echo(), lineterminator="\n")
+    yield writer.writerow(columns)
+    for row in rows:
+        # Event tags are written as Python lists, like the CSV
+        yield writer.writerow([repr(value) if isinstance(value, list) else value for value in row])
+
+
+def _ndjson_lines(columns, rows):
+    keep = [i for i, column in enumerate(columns) if column]
+    names = [columns[i] for i in keep]
+    for row in rows:
+        yield json.dumps(dict(zip(names, (row[i] for i in keep))), ensure_ascii=False) + "\n"
+
+
+def _batched(lines, size):
+    # One write per chunk of rows rather than per row
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+async def _async_batches(batches):
+    # Each chunk is read in the request's sync thread, which owns the cursor
+    batches = iter(batches)
+    while (batch := await sync_to_async(next)(batches, None)) is not None:
+        yield batch
+
+
+def export_response(name, columns, rows, fmt, asynchronous=False):
+    encode = _csv_lines if fmt == "csv" else _ndjson_lines
+    batches = _batched(encode(columns, rows), chunk_size())
+    response = StreamingHttpResponse(
+        _async_batches(batches) if asynchronous else batches,
+        content_type=FORMATS[fmt],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{name}.{fmt}"'
+    return response
@@ -0,0 +1,123 @@
+"""
+Fast path for the list endpoints (FAST_SERIALIZATION = True).
+
+Builds the same dicts as UserSerializer, EventSerializer and
+SubGroupSerializer, in the same key order, from values() rows instead of
+model instances and serializer fields. Related groups, subgroups and
+interests are fetched once per page and shared between rows.
+"""
+from rest_framework import serializers
+
+from .models import Group, SubGroup, User
+from .serializers import EVENT_DESCRIPTION
+
+_datetime = serializers.DateTimeField()
+
+
+def _date(value):
+    return value.isoformat() if value is not None else None
+
+
+def group_dicts(group_pks):
+    return {
+        row['id']: {
+            'id': row['id'],
+            'group_id': row['group_id'],
+            'name': row['name'],
+            'created_at': _datetime.to_representation(row['created_at']),
+        }
+        for row in Group.objects.filter(pk__in=group_pks).values('id', 'group_id', 'name', 'created_at')
+    }
+
+
+def subgroup_dicts(subgroup_pks, groups=None):
+    rows = list(
+        SubGroup.objects.filter(pk__in=subgroup_pks)
+        .values('id', 'subgroup_id', 'name', 'event', 'group_id', 'created_at')
+    )
+    return subgroup_rows_to_dicts(rows, groups)
+
+
+def subgroup_rows_to_dicts(rows, groups=None):
+    groups = dict(groups or {})
+    missing = {row['group_id'] for row in rows} - set(groups)
+    if missing:
+        groups.update(group_dicts(missing))
+    return {
+        row['id']: {
+            'id': row['id'],
+            'subgroup_id': row['subgroup_id'],
+            'name': row['name'],
+            'event': row['event'],
+            'group': groups[row['group_id']],
+            'created_at': _datetime.to_representation(row['created_at']),
+        }
+        for row in rows
+    }
+
+
+USER_VALUES = (
+    'id', 'name', 'user_id', 'gender', 'dob', 'city', 'occupation',
+    'budget', 'age', 'age_range', 'group_id', 'subgroup_id',
+)
+
+
+def user_dicts(rows):
+    """
+    UserSerializer output for rows of User.objects.values(*USER_VALUES).
+    Interests are listed in pk order.
+    """
+    subgroups = subgroup_dicts({row['subgroup_id'] for row in rows} - {None})
+    groups = {sg['group']['id']: sg['group'] for sg in subgroups.values()}
+    missing = {row['group_id'] for row in rows} - {None} - set(groups)
+    if missing:
+        groups.update(group_dicts(missing))
+
+    interests = {row['id']: [] for row in rows}
+    links = (
+        User.interests.through.objects.filter(user_id__in=interests)
+        .order_by('user_id', 'interest_id')
+        .values_list('user_id', 'interest_id', 'interest__name')
+    )
+    for user_pk, interest_pk, name in links:
+        interests[user_pk].append({'id': interest_pk, 'name': name})
+
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'user_id': row['user_id'],
+            'gender': row['gender'],
+            'dob': _date(row['dob']),
+            'city': row['city'],
+            'occupation': row['occupation'],
+            'budget': float(row['budget']),
+            'age': row['age'],
+            'age_range': row['age_range'],
+            'group': groups.get(row['group_id']),
+            'subgroup': subgroups.get(row['subgroup_id']),
+            'interests': interests[row['id']],
+        }
+        for row in rows
+    ]
+
+
+def event_dicts(events):
+    return [
+        {
+            'id': f"event_{row['event_id']}",
+            'name': row['event_name'],
+            'location': row['location'],
+            'ticketPrice': float(row['ticket_price']),
+            'date': _date(row['event_date']),
+            'tags': list(row['tags']),
+            'description': EVENT_DESCRIPTION,
+        }
+        for row in events.values('event_id', 'event_name', 'location', 'ticket_price', 'event_date', 'tags')
+    ]
+
+
+def subgroup_list(subgroups):
+    rows = list(subgroups.values('id', 'subgroup_id', 'name', 'event', 'group_id', 'created_at'))
+    by_pk = subgroup_rows_to_dicts(rows)
+    return [by_pk[row['id']] for row in rows]
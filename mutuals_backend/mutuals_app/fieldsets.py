@@ -0,0 +1,127 @@
+"""
+Sparse fieldsets for the users, subgroups and events endpoints.
+
+?fields=id,name,group returns only those fields. When ?fields= or ?expand=
+is given, related objects (a user's group, subgroup and interests, a
+subgroup's group) come as their ids unless named in ?expand=, e.g.
+?fields=id,name,group&expand=group. Without either parameter responses are
+unchanged, everything expanded.
+
+The query is trimmed to match: only() the columns behind the returned
+fields, joins only for expanded objects and a prefetch only when interests
+are returned (ids only unless expanded).
+"""
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+class Fieldset:
+    def __init__(self, fields=None, expand=()):
+        self.fields = fields  # None: all of them
+        self.expand = set(expand)
+
+    def trim(self, serializer):
+        """
+        Drops the fields not asked for from `serializer` and collapses the
+        related ones not expanded to their ids.
+        """
+        for name in list(serializer.fields):
+            field = serializer.fields[name]
+            if field.write_only or (self.fields is not None and name not in self.fields):
+                del serializer.fields[name]
+            elif name not in self.expand and _is_nested(field):
+                kwargs = {"source": field.source} if field.source != name else {}
+                serializer.fields[name] = serializers.PrimaryKeyRelatedField(
+                    many=isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField)),
+                    read_only=True,
+                    **kwargs,
+                )
+
+    def queryset(self, queryset, serializer_class):
+        """
+        `queryset` restricted to what serializer_class(fieldset=self) reads.
+        """
+        only, select, prefetch = _plan(serializer_class(fieldset=self), "")
+        queryset = queryset.only(*only)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+def _is_nested(field):
+    return isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField))
+
+
+def _plan(serializer, prefix):
+    """
+    (only() columns, select_related paths, prefetches) read by `serializer`,
+    with paths relative to the model `prefix` leads to.
+    """
+    columns = getattr(serializer, "sparse_sources", {})
+    only, select, prefetch = [prefix + serializer.Meta.model._meta.pk.name], [], []
+    for name, field in serializer.fields.items():
+        if name in columns:
+            only.extend(prefix + column for column in columns[name])
+        elif isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField)):
+            if prefix:
+                continue  # Under a join: fetched per object, as without a fieldset
+            # Prefetched in full when expanded, ids only otherwise
+            model = serializer.Meta.model._meta.get_field(field.source).related_model
+            if isinstance(field, serializers.ListSerializer):
+                child_only = _plan(field.child, "")[0]
+            else:
+                child_only = [model._meta.pk.name]
+            prefetch.append(Prefetch(field.source, queryset=model.objects.only(*child_only).order_by("pk")))
+        elif isinstance(field, serializers.BaseSerializer):
+            path = prefix + field.source
+            select.append(path)
+            nested_only, nested_select, _ = _plan(field, path + "__")
+            only.extend(nested_only)
+            select.extend(nested_select)
+        else:
+            # Plain fields and collapsed foreign keys (their own _id column)
+            only.append(prefix + field.source)
+    return only, select, prefetch
+
+
+def parse_fieldset(params, serializer_class):
+    """
+    The Fieldset asked for by ?fields= and ?expand=, or None. Raises
+    ValueError with a message for the client on unknown names.
+    """
+    fields_param, expand_param = params.get("fields"), params.get("expand")
+    if fields_param is None and expand_param is None:
+        return None
+
+    serializer = serializer_class()
+    readable = [name for name, field in serializer.fields.items() if not field.write_only]
+    nested = [name for name in readable if _is_nested(serializer.fields[name])]
+
+    fields = None
+    if fields_param is not None:
+        fields = [name.strip() for name in fields_param.split(",") if name.strip()]
+        unknown = [name for name in fields if name not in readable]
+        if unknown or not fields:
+            raise ValueError(f"fields must be a comma-separated list of: {', '.join(readable)}.")
+
+    expand = [name.strip() for name in (expand_param or "").split(",") if name.strip()]
+    if any(name not in nested for name in expand):
+        raise ValueError(f"expand takes a comma-separated list of: {', '.join(nested)}.")
+
+    return Fieldset(fields, expand)
+
+
+class SparseFieldsMixin:
+    """
+    Serializer taking a `fieldset` (see parse_fieldset) to trim its fields.
+    `sparse_sources` names the model columns behind fields whose source
+    isn't a column (method fields).
+    """
+    sparse_sources = {}
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fieldset is not None:
+            fieldset.trim(self)
@@ -0,0 +1,92 @@
+"""
+User ID allocation.
+
+IDs are "M" followed by at least 8 digits, numbered from an IdSequence row.
+Each worker reserves a block of numbers from the row in one short
+transaction and hands them out from memory, so a signup normally costs no
+query for its ID. Numbers left in a block when a worker exits are skipped.
+The 8-digit width keeps these IDs apart from the older random M1000-M9999
+ones and from the numeric IDs of the seeded users.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+USER_ID_SEQUENCE = "user_id"
+
+
+def format_user_id(number):
+    return f"M{number:08d}"
+
+
+class IdAllocator:
+    """
+    Hands out numbers from blocks reserved on a named IdSequence row.
+    """
+
+    def __init__(self, sequence, block_size=None):
+        self.sequence = sequence
+        self._block_size = block_size
+        self._lock = threading.Lock()
+        self._next = self._end = 0
+        self._pid = os.getpid()
+
+    @property
+    def block_size(self):
+        if self._block_size is not None:
+            return self._block_size
+        return getattr(settings, "USER_ID_BLOCK_SIZE", 100)
+
+    def _reserve(self, size):
+        from .models import IdSequence
+
+        with transaction.atomic():
+            updated = IdSequence.objects.filter(name=self.sequence).update(next_value=F("next_value") + size)
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        IdSequence.objects.create(name=self.sequence, next_value=1 + size)
+                except IntegrityError:  # Created concurrently
+                    IdSequence.objects.filter(name=self.sequence).update(next_value=F("next_value") + size)
+            end = IdSequence.objects.filter(name=self.sequence).values_list("next_value", flat=True).get()
+        return end - size, end
+
+    def allocate(self, count=1):
+        """
+        Returns `count` new numbers, reserving a block when the current one
+        runs out.
+
+        Inside a transaction only the numbers asked for are reserved, and
+        not kept: if the transaction rolls back, so does the reservation,
+        and a block kept in memory would be handed out twice.
+        """
+        if connection.in_atomic_block:
+            return list(range(*self._reserve(count)))
+
+        numbers = []
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: the parent may still hand out the rest of its block
+                self._next = self._end = 0
+                self._pid = os.getpid()
+            while len(numbers) < count:
+                if self._next >= self._end:
+                    self._next, self._end = self._reserve(max(self.block_size, count - len(numbers)))
+                take = min(count - len(numbers), self._end - self._next)
+                numbers.extend(range(self._next, self._next + take))
+                self._next += take
+        return numbers
+
+
+user_id_allocator = IdAllocator(USER_ID_SEQUENCE)
+
+
+def new_user_ids(count):
+    return [format_user_id(number) for number in user_id_allocator.allocate(count)]
+
+
+def new_user_id():
+    return new_user_ids(1)[0]
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from mutuals_app.ml_models.live_index import LiveInterestIndex, live_index_path
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the live cluster assignment index from the User table and saves its snapshot."
+
+    def handle(self, *args, **options):
+        index = LiveInterestIndex.build()
+        index.save(live_index_path())
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(index.rows)} users over {len(index.interest_pks)} interests "
+            f"into {live_index_path()}."
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from mutuals_app.ml_models.models import MODEL_PATH, convert_pickles
+
+
+class Command(BaseCommand):
+    help = "Converts the clustering pickles into the compact .npz/.json artifacts loaded at runtime."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=MODEL_PATH, help='Directory holding the pickles')
+
+    def handle(self, *args, **options):
+        index = convert_pickles(options['path'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Converted {len(index.user_ids)} users, {len(index.interests)} interests, "
+            f"{len(index.cluster_tags)} clusters."
+        ))
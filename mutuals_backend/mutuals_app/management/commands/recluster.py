@@ -0,0 +1,151 @@
+import json
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from mutuals_app.cache import invalidate_all_user_details
+from mutuals_app.conditional import bump_versions
+from mutuals_app.ml_models.clustering import recluster
+from mutuals_app.ml_models.live_index import discard_snapshot
+from mutuals_app.ml_models.models import MODEL_PATH, pack_group_into_subgroups
+from mutuals_app.ml_models.recommendations import schedule_refresh
+from mutuals_app.models import Group, SubGroup, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-runs the interest clustering over the users in the database, writes new "
+        "model artifacts and updates the Group rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=20000, help='Rows fetched per DB round trip')
+        parser.add_argument('--workers', type=int, default=None, help='Process pool size (default: CPU count)')
+        parser.add_argument('--resolutions', default='0.8,1.0,1.2', help='Comma-separated resolutions to sweep')
+        parser.add_argument('--seed', type=int, default=91, help='Random seed for community detection')
+        parser.add_argument('--knn', type=int, default=50, help='Neighbours kept per interest profile (0 keeps all)')
+        parser.add_argument('--output', default=MODEL_PATH, help='Directory for the model artifacts')
+        parser.add_argument('--groups-json', help='Also write the groups as JSON (same shape as data/groups.json)')
+        parser.add_argument('--update-users', action='store_true', help="Move users to their new groups")
+
+    def handle(self, *args, **options):
+        resolutions = [float(r) for r in options['resolutions'].split(',')]
+
+        try:
+            index, user_clusters, user_pks, timer = recluster(
+                chunk_size=options['chunk_size'],
+                workers=options['workers'],
+                resolutions=resolutions,
+                seed=options['seed'],
+                knn=options['knn'],
+                report=self.stdout.write,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        with timer.stage("write"):
+            groups = unique_group_names(index.cluster_tags)
+            moved = None
+            with transaction.atomic():
+                save_groups(groups)
+                if options['update_users']:
+                    moved = update_user_groups(user_pks, user_clusters, options['chunk_size'])
+
+            if options['groups_json']:
+                with open(options['groups_json'], 'w') as f:
+                    json.dump({str(k): v for k, v in groups.items()}, f, indent=4)
+
+            # Written last: running workers reload as soon as the .npz changes
+            index.save(options['output'])
+            if options['update_users']:
+                discard_snapshot()
+
+        total = sum(elapsed for _, elapsed in timer.stages)
+        if moved is not None:
+            self.stdout.write(f"Moved {moved} users to new groups and subgroups")
+        self.stdout.write(self.style.SUCCESS(f"Reclustered into {len(groups)} groups in {total:.2f}s"))
+
+
+def unique_group_names(cluster_tags):
+    """
+    Group.name is unique, but two clusters can share their top interests.
+    """
+    seen = {}
+    groups = {}
+    for cluster, tag in sorted(cluster_tags.items()):
+        seen[tag] = seen.get(tag, 0) + 1
+        groups[cluster] = tag if seen[tag] == 1 else f"{tag} ({seen[tag]})"
+    return groups
+
+
+def save_groups(groups):
+    existing = list(Group.objects.filter(group_id__in=groups))
+
+    # Retired groups keep their rows but give up a name a new cluster needs
+    retired = list(Group.objects.filter(name__in=groups.values()).exclude(group_id__in=groups))
+    for group in retired:
+        group.name = f"{group.name} (group {group.group_id})"
+    Group.objects.bulk_update(retired, ['name'])
+
+    # Park current names first so two groups can swap names without a clash
+    for group in existing:
+        group.name = f"__recluster_{group.group_id}"
+    Group.objects.bulk_update(existing, ['name'])
+    for group in existing:
+        group.name = groups[group.group_id]
+    Group.objects.bulk_update(existing, ['name'])
+
+    known = {group.group_id for group in existing}
+    Group.objects.bulk_create([
+        Group(group_id=group_id, name=name) for group_id, name in groups.items() if group_id not in known
+    ])
+
+    # bulk_update/bulk_create skip the signals that refresh recommendations,
+    # cached user details and the groups' version stamp
+    schedule_refresh(Group.objects.values_list('pk', flat=True))
+    transaction.on_commit(invalidate_all_user_details)
+    bump_versions('groups')
+
+
+def update_user_groups(user_pks, user_clusters, chunk_size):
+    """
+    Moves users to their new groups. A user who changes group leaves their
+    subgroup: the subgroups left behind get their aggregates recomputed (and
+    are deleted once empty), and the moved users are packed into new
+    subgroups of their group. Users the clustering left out (cluster 0:
+    no interests to cluster on) keep their group and subgroup. Returns the
+    number of users moved.
+    """
+    group_pks = dict(Group.objects.values_list('group_id', 'pk'))
+    moved_to = set()
+    moved = 0
+    for start in range(0, len(user_pks), chunk_size):
+        targets = {
+            pk: group_pks[cluster]
+            for pk, cluster in zip(user_pks[start:start + chunk_size].tolist(),
+                                   user_clusters[start:start + chunk_size].tolist())
+            if cluster in group_pks
+        }
+        moves = defaultdict(list)
+        left = set()
+        for pk, group_pk, subgroup_pk in User.objects.filter(pk__in=targets).values_list('pk', 'group_id', 'subgroup_id'):
+            if targets[pk] != group_pk:
+                moves[targets[pk]].append(pk)
+                left.add(subgroup_pk)
+        left.discard(None)
+
+        # Group and subgroup change in one statement, so no user is left in
+        # a subgroup of another group
+        for group_pk, pks in moves.items():
+            User.objects.filter(pk__in=pks).update(group_id=group_pk, subgroup=None)
+            moved += len(pks)
+        moved_to.update(moves.keys())
+        if left:
+            SubGroup.refresh_aggregates(left)
+            SubGroup.objects.filter(pk__in=left, member_count=0).delete()
+
+    for group in Group.objects.filter(pk__in=moved_to).order_by('group_id'):
+        users = User.objects.filter(group=group, subgroup=None).only('id', 'user_id', 'age', 'budget', 'subgroup')
+        pack_group_into_subgroups(group, users)
+    return moved
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from mutuals_app.ml_models.models import pack_group_into_subgroups
+from mutuals_app.models import Group, SubGroup, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the subgroups of each group from its current members, e.g. to "
+        "pack them tighter after many users moved between groups."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', type=int, nargs='+', help='group_id(s) to repack (default: all)')
+
+    def handle(self, *args, **options):
+        groups = Group.objects.order_by('group_id')
+        if options['group']:
+            groups = groups.filter(group_id__in=options['group'])
+            missing = set(options['group']) - set(groups.values_list('group_id', flat=True))
+            if missing:
+                raise CommandError(f"Unknown group_id(s): {', '.join(map(str, sorted(missing)))}")
+
+        total_users = total_subgroups = 0
+        for group in groups:
+            with transaction.atomic():
+                users = list(User.objects.filter(group=group).only('id', 'user_id', 'age', 'budget', 'subgroup'))
+                left = {user.subgroup_id for user in users if user.subgroup_id is not None}
+
+                # Empty the group's subgroups first so numbering restarts at 1
+                User.objects.filter(group=group).update(subgroup=None)
+                for user in users:
+                    user.subgroup = None
+                SubGroup.refresh_aggregates(left | set(group.subgroups.values_list('pk', flat=True)))
+                SubGroup.objects.filter(pk__in=left, member_count=0).delete()
+                group.subgroups.filter(member_count=0).delete()
+
+                subgroups = pack_group_into_subgroups(group, users)
+
+            total_users += len(users)
+            total_subgroups += len(subgroups)
+            self.stdout.write(f"{group.name}: {len(users)} users in {len(subgroups)} subgroups")
+
+        self.stdout.write(self.style.SUCCESS(f"Repacked {total_users} users into {total_subgroups} subgroups"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mutuals_app", "0002_event"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="model_version",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2 on 2026-10-18 11:35
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def backfill_aggregates(apps, schema_editor):
+    SubGroup = apps.get_model("mutuals_app", "SubGroup")
+    User = apps.get_model("mutuals_app", "User")
+    rows = (
+        User.objects.filter(subgroup__isnull=False)
+        .values("subgroup")
+        .annotate(
+            member_count=Count("pk"),
+            min_age=Min("age"), max_age=Max("age"),
+            min_budget=Min("budget"), max_budget=Max("budget"),
+        )
+    )
+    subgroups = []
+    for row in rows:
+        subgroup = SubGroup(pk=row.pop("subgroup"))
+        for field, value in row.items():
+            setattr(subgroup, field, value)
+        subgroups.append(subgroup)
+    SubGroup.objects.bulk_update(
+        subgroups, ["member_count", "min_age", "max_age", "min_budget", "max_budget"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mutuals_app", "0003_user_model_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="subgroup",
+            name="max_age",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="subgroup",
+            name="max_budget",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="subgroup",
+            name="member_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="subgroup",
+            name="min_age",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="subgroup",
+            name="min_budget",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="subgroup",
+            index=models.Index(
+                fields=["group", "member_count"], name="subgroup_open_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-18 11:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_tag_index(apps, schema_editor):
+    Event = apps.get_model("mutuals_app", "Event")
+    EventTag = apps.get_model("mutuals_app", "EventTag")
+    rows = []
+    for event in Event.objects.only("pk", "tags").iterator(chunk_size=2000):
+        tags = {str(tag).strip().lower() for tag in event.tags or []} - {""}
+        rows.extend(EventTag(event_id=event.pk, tag=tag) for tag in tags)
+    EventTag.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mutuals_app", "0004_subgroup_aggregates"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventTag",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("tag", models.CharField(db_index=True, max_length=100)),
+                (
+                    "event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tag_index",
+                        to="mutuals_app.event",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("event", "tag")},
+            },
+        ),
+        migrations.RunPython(build_tag_index, migrations.RunPython.noop),
+    ]
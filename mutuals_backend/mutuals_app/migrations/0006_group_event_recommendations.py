@@ -0,0 +1,79 @@
+# Generated by Django 5.2 on 2026-10-18 11:43
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copied from ml_models/recommendations.py as they were when this migration
+# was written, so later changes there don't alter what it builds
+GROUP_RECOMMENDATION_SIZE = 100
+TAG_STOP_WORDS = {"a", "an", "and", "for", "in", "of", "on", "or", "the", "to", "with"}
+
+
+def group_tag_words(group_name):
+    words = re.findall(r'\b\w+\b', group_name.lower())
+    return sorted(set(words) - TAG_STOP_WORDS)
+
+
+def build_recommendations(apps, schema_editor):
+    Event = apps.get_model("mutuals_app", "Event")
+    Group = apps.get_model("mutuals_app", "Group")
+    GroupEventRecommendation = apps.get_model("mutuals_app", "GroupEventRecommendation")
+    rows = []
+    for group in Group.objects.all():
+        event_pks = (
+            Event.objects.filter(tag_index__tag__in=group_tag_words(group.name))
+            .distinct().order_by("pk").values_list("pk", flat=True)[:GROUP_RECOMMENDATION_SIZE]
+        )
+        rows.extend(
+            GroupEventRecommendation(group_id=group.pk, event_id=event_pk, rank=rank)
+            for rank, event_pk in enumerate(event_pks)
+        )
+    GroupEventRecommendation.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mutuals_app", "0005_event_tag_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GroupEventRecommendation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.IntegerField()),
+                (
+                    "event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="group_recommendations",
+                        to="mutuals_app.event",
+                    ),
+                ),
+                (
+                    "group",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="event_recommendations",
+                        to="mutuals_app.group",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["group", "rank"],
+                "unique_together": {("group", "rank")},
+            },
+        ),
+        migrations.RunPython(build_recommendations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2 on 2026-10-18 11:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def tags_from_json(apps, schema_editor):
+    Event = apps.get_model("mutuals_app", "Event")
+    EventTag = apps.get_model("mutuals_app", "EventTag")
+    Tag = apps.get_model("mutuals_app", "Tag")
+
+    EventTag.objects.all().delete()
+    event_tags = {}
+    for event in Event.objects.only("pk", "tags").iterator(chunk_size=2000):
+        event_tags[event.pk] = {str(tag).strip().lower() for tag in event.tags or []} - {""}
+
+    names = set().union(*event_tags.values()) if event_tags else set()
+    Tag.objects.bulk_create([Tag(name=name) for name in sorted(names)], batch_size=1000)
+    tag_pks = dict(Tag.objects.values_list("name", "pk"))
+    EventTag.objects.bulk_create(
+        [EventTag(event_id=pk, tag_id=tag_pks[name]) for pk, tags in event_tags.items() for name in tags],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mutuals_app", "0006_group_event_recommendations"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tag",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        # The tag index rows are rebuilt from Event.tags below
+        migrations.AlterUniqueTogether(name="eventtag", unique_together=set()),
+        migrations.RemoveField(model_name="eventtag", name="tag"),
+        migrations.AddField(
+            model_name="eventtag",
+            name="tag",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="event_links",
+                to="mutuals_app.tag",
+            ),
+        ),
+        migrations.RunPython(tags_from_json, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="eventtag",
+            name="tag",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="event_links",
+                to="mutuals_app.tag",
+            ),
+        ),
+        migrations.AlterUniqueTogether(name="eventtag", unique_together={("event", "tag")}),
+        migrations.AddField(
+            model_name="event",
+            name="tag_set",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="events",
+                through="mutuals_app.EventTag",
+                to="mutuals_app.tag",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["event_date", "location"], name="event_date_location_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["location", "event_date"], name="event_location_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["ticket_price"], name="event_price_idx"),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mutuals_app", "0007_normalized_event_tags"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["group", "id"], name="user_group_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["city", "id"], name="user_city_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["age_range", "id"], name="user_age_range_id_idx"
+            ),
+        ),
+    ]
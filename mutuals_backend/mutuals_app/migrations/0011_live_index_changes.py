@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mutuals_app", "0010_id_sequences"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LiveIndexChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.BigIntegerField(unique=True)),
+                ("user_pk", models.BigIntegerField(null=True)),
+                ("interest_pk", models.BigIntegerField(null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
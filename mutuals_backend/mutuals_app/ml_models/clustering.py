@@ -0,0 +1,320 @@
+"""
+Offline re-clustering pipeline behind `manage.py recluster`.
+
+Reproduces mutuals_clustering.ipynb (bipartite users <-> interests graph,
+weighted user projection, community detection, top-2 interest tags) but
+from the database and in bounded memory:
+
+- users are streamed from the DB and collapsed into interest *profiles*
+  (users with the same interest set are indistinguishable in the projection),
+  so the graph has one node per distinct interest set instead of per user;
+- the projection between profiles is computed in row chunks in a process
+  pool and sparsified to each profile's strongest neighbours;
+- community detection runs one resolution per pool worker and keeps the
+  partition with the best modularity;
+- cluster tags are labelled in the pool as well.
+
+Memory therefore grows with the number of users only through a few flat
+arrays (user pks, ids and profile numbers), not through the graph.
+"""
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+from .models import InterestIndex
+
+# Upper bound on the dense (chunk x profiles) similarity block per task
+PROJECTION_BLOCK = 4_000_000
+
+
+class StageTimer:
+    """
+    Collects wall time and peak RSS per pipeline stage: of this process,
+    and of the largest pool worker that has exited (RUSAGE_CHILDREN only
+    counts children once they are waited for, i.e. after the pool shuts
+    down).
+    """
+
+    def __init__(self, report=print):
+        self.report = report
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        workers_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        self.stages.append((name, elapsed))
+        self.report(f"{name:<12} {elapsed:8.2f}s   peak RSS {peak_mb:,.0f} MB, exited workers {workers_mb:,.0f} MB")
+
+
+# ----------------------
+# Stage 1: stream users into interest profiles
+# ----------------------
+
+def load_profiles(chunk_size=20000):
+    """
+    Streams users and their interest links from the DB (both ordered by user)
+    and merges them into profiles.
+
+    Returns a dict with per-user arrays (`user_pks`, `user_ids`,
+    `user_profiles`, -1 for users without interests), the profile matrix
+    (`profiles`, profiles x interests, 0/1), the number of users per profile
+    (`counts`) and the interest names per column.
+    """
+    from mutuals_app.models import Interest, User
+
+    interest_rows = list(Interest.objects.order_by("pk").values_list("pk", "name"))
+    interest_cols = {pk: col for col, (pk, _) in enumerate(interest_rows)}
+
+    links = iter(
+        User.interests.through.objects.order_by("user_id")
+        .values_list("user_id", "interest_id")
+        .iterator(chunk_size=chunk_size)
+    )
+    users = (
+        User.objects.order_by("pk")
+        .values_list("pk", "user_id")
+        .iterator(chunk_size=chunk_size)
+    )
+
+    profile_ids = {}
+    user_pks, user_ids, user_profiles = [], [], []
+    pending = next(links, None)
+    for pk, user_id in users:
+        cols = []
+        while pending is not None and pending[0] <= pk:
+            if pending[0] == pk:
+                cols.append(interest_cols[pending[1]])
+            pending = next(links, None)
+        key = tuple(sorted(set(cols)))
+        user_pks.append(pk)
+        user_ids.append(user_id)
+        user_profiles.append(profile_ids.setdefault(key, len(profile_ids)) if key else -1)
+
+    profiles = np.zeros((len(profile_ids), len(interest_rows)), dtype=np.int32)
+    for key, pid in profile_ids.items():
+        profiles[pid, list(key)] = 1
+
+    user_profiles = np.asarray(user_profiles, dtype=np.int64)
+    counts = np.bincount(user_profiles[user_profiles >= 0], minlength=len(profile_ids))
+
+    return {
+        "user_pks": np.asarray(user_pks, dtype=np.int64),
+        "user_ids": np.asarray(user_ids, dtype=str),
+        "user_profiles": user_profiles,
+        "profiles": profiles,
+        "counts": counts.astype(np.int64),
+        "interests": [name for _, name in interest_rows],
+    }
+
+
+# ----------------------
+# Stage 2: sparse profile projection
+# ----------------------
+
+_shared = {}
+
+
+def _init_worker(profiles, counts, knn, interests):
+    # Sent once per worker process instead of with every task
+    _shared.update(profiles=profiles, counts=counts, knn=knn, interests=interests)
+
+
+def _project_rows(bounds):
+    """
+    Projected edges from profiles [start, stop) to every other profile.
+
+    Weight between profiles a and b is the user-level projection weight
+    summed over their users: shared interests x users(a) x users(b). Users
+    within one profile all share |a| interests, which becomes the self-loop.
+    Only each profile's `knn` heaviest neighbours are kept (0 keeps all).
+    """
+    start, stop = bounds
+    profiles, counts, knn = _shared["profiles"], _shared["counts"], _shared["knn"]
+
+    shared = profiles[start:stop] @ profiles.T
+    weights = shared * counts[start:stop, None] * counts[None, :]
+    local = np.arange(stop - start)
+    sizes = profiles[start:stop].sum(axis=1)
+    loops = sizes * counts[start:stop] * (counts[start:stop] - 1) // 2
+    weights[local, local + start] = 0
+
+    if knn and weights.shape[1] > knn:
+        keep = np.argpartition(-weights, knn - 1, axis=1)[:, :knn]
+        mask = np.zeros_like(weights, dtype=bool)
+        np.put_along_axis(mask, keep, True, axis=1)
+        weights = np.where(mask, weights, 0)
+
+    rows, cols = np.nonzero(weights)
+    rows = rows + start
+    return (
+        np.concatenate([np.minimum(rows, cols), start + local]),
+        np.concatenate([np.maximum(rows, cols), start + local]),
+        np.concatenate([weights[rows - start, cols], loops]),
+    )
+
+
+def project_profiles(profiles, counts, knn, pool):
+    n = len(profiles)
+    step = max(1, PROJECTION_BLOCK // max(n, 1))
+    parts = list(pool.map(_project_rows, [(s, min(s + step, n)) for s in range(0, n, step)]))
+
+    if not parts:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, np.int64)
+
+    a = np.concatenate([p[0] for p in parts])
+    b = np.concatenate([p[1] for p in parts])
+    w = np.concatenate([p[2] for p in parts])
+    keep = w > 0
+    a, b, w = a[keep], b[keep], w[keep]
+
+    # An edge kept from both ends appears twice with the same weight
+    edge_keys, first = np.unique(a * n + b, return_index=True)
+    return edge_keys // n, edge_keys % n, w[first]
+
+
+# ----------------------
+# Stage 3: community detection (resolution sweep)
+# ----------------------
+
+def _detect(job):
+    """
+    Community detection at one resolution. Uses leidenalg when installed
+    (as the notebook did), otherwise networkx's Louvain.
+    Returns (resolution, modularity, labels per profile).
+    """
+    import networkx as nx
+
+    resolution, seed, n, a, b, w = job
+    graph = nx.Graph()
+    graph.add_nodes_from(range(n))
+    graph.add_weighted_edges_from(zip(a.tolist(), b.tolist(), w.tolist()))
+
+    try:
+        import igraph as ig
+        import leidenalg
+    except ImportError:
+        communities = nx.community.louvain_communities(graph, weight="weight", resolution=resolution, seed=seed)
+    else:
+        g = ig.Graph(n=n, edges=list(zip(a.tolist(), b.tolist())))
+        g.es["weight"] = w.tolist()
+        partition = leidenalg.find_partition(
+            g, leidenalg.RBConfigurationVertexPartition,
+            weights="weight", resolution_parameter=resolution, seed=seed,
+        )
+        communities = [set(c) for c in partition]
+
+    modularity = nx.community.modularity(graph, communities, weight="weight")
+    labels = np.empty(n, dtype=np.int64)
+    for label, nodes in enumerate(communities):
+        labels[list(nodes)] = label
+    return resolution, modularity, labels
+
+
+def detect_communities(n, edges, resolutions, seed, pool):
+    a, b, w = edges
+    results = list(pool.map(_detect, [(r, seed, n, a, b, w) for r in resolutions]))
+    return max(results, key=lambda r: r[1]), results
+
+
+# ----------------------
+# Stage 4: tag labelling
+# ----------------------
+
+def _label(job):
+    """
+    Tag each cluster with its top-2 interests, as in the notebook.
+    """
+    cluster_ids, labels = job
+    profiles, counts, interests = _shared["profiles"], _shared["counts"], _shared["interests"]
+    tags = {}
+    for cluster in cluster_ids:
+        members = labels == cluster
+        totals = counts[members] @ profiles[members]
+        top = [col for col in np.argsort(-totals, kind="stable")[:2] if totals[col] > 0]
+        tags[cluster] = " & ".join(interests[col] for col in top)
+    return tags
+
+
+def label_clusters(labels, n_clusters, pool, workers):
+    tags = {}
+    ids = list(range(1, n_clusters + 1))
+    for part in pool.map(_label, [(ids[i::workers], labels) for i in range(workers)]):
+        tags.update(part)
+    return dict(sorted(tags.items()))
+
+
+# ----------------------
+# Pipeline
+# ----------------------
+
+def recluster(chunk_size=20000, workers=None, resolutions=(1.0,), seed=91, knn=50, report=print):
+    """
+    Runs the whole pipeline and returns (index, per-user cluster array,
+    user pks, timer). Clusters are numbered from 1 by decreasing size,
+    like the notebook's partition; users without interests get 0.
+    """
+    timer = StageTimer(report)
+    workers = workers or os.cpu_count() or 1
+
+    with timer.stage("load"):
+        data = load_profiles(chunk_size)
+    profiles, counts = data["profiles"], data["counts"]
+    report(f"{len(data['user_pks'])} users, {len(profiles)} interest profiles, {len(data['interests'])} interests")
+
+    if not len(profiles):
+        raise ValueError("No users with interests to cluster.")
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(profiles, counts, knn, data["interests"]),
+    ) as pool:
+        with timer.stage("projection"):
+            edges = project_profiles(profiles, counts, knn, pool)
+        report(f"{len(edges[0])} profile edges (knn={knn or 'all'})")
+
+        with timer.stage("communities"):
+            (resolution, modularity, labels), sweep = detect_communities(len(profiles), edges, resolutions, seed, pool)
+        for r, m, found in sweep:
+            report(f"  resolution {r:<5} modularity {m:.4f}  clusters {len(set(found.tolist()))}")
+
+        # Renumber clusters 1..k by decreasing number of users
+        sizes = np.bincount(labels, weights=counts)
+        order = np.argsort(-sizes, kind="stable")
+        renumber = np.empty_like(order)
+        renumber[order] = np.arange(1, len(order) + 1)
+        labels = renumber[labels]
+        n_clusters = len(order)
+
+        with timer.stage("tags"):
+            tags = label_clusters(labels, n_clusters, pool, workers)
+
+    with timer.stage("index"):
+        user_profiles = data["user_profiles"]
+        clustered = user_profiles >= 0
+        user_clusters = np.zeros(len(user_profiles), dtype=np.int64)
+        user_clusters[clustered] = labels[user_profiles[clustered]]
+
+        # interests x users CSR over the clustered users, rows in pk order
+        rows = np.flatnonzero(clustered)
+        member = profiles[user_profiles[rows]]
+        cols, user_rows = np.nonzero(member.T)
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(cols, minlength=profiles.shape[1]))])
+        index = InterestIndex(
+            data["user_ids"][rows],
+            user_clusters[rows],
+            data["interests"],
+            indptr.astype(np.int64),
+            user_rows.astype(np.int64),
+            tags,
+        )
+    report(f"best resolution {resolution} (modularity {modularity:.4f}), {n_clusters} clusters")
+    return index, user_clusters, data["user_pks"], timer
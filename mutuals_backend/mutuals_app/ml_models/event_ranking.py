@@ -0,0 +1,95 @@
+"""
+Ranked event recommendations.
+
+Candidates are the events sharing at least one tag with the user's group
+(found through the EventTag index). They are scored together in NumPy on
+
+- tag overlap: share of the group's tag words the event carries,
+- budget fit: 1 when the ticket is within the user's budget, falling off
+  with how far it is over,
+- city match: 1 when the event is in the user's city,
+- recency: 1 for an event today, decaying over the following weeks; past
+  events get 0,
+
+and only the requested page is sorted (argpartition, then argsort of the
+top offset + limit).
+"""
+import numpy as np
+from django.db.models import Count
+
+# Weight of each signal in the score
+TAG_WEIGHT = 3.0
+BUDGET_WEIGHT = 1.0
+CITY_WEIGHT = 1.0
+RECENCY_WEIGHT = 1.0
+
+# Days for the recency score of an upcoming event to fall to 1/e
+RECENCY_DAYS = 30.0
+
+
+def score_events(overlap, prices, cities, dates, n_words, budget, city, today):
+    """
+    Scores arrays describing candidate events (tag overlap counts, ticket
+    prices, lowercased cities, dates as numpy datetime64[D]).
+    """
+    tags = overlap / max(n_words, 1)
+
+    budget = max(float(budget), 0.0)
+    over = np.maximum(prices - budget, 0.0)
+    fit = np.where(over <= 0, 1.0, budget / np.maximum(budget + over, 1e-9))
+
+    same_city = (cities == city.strip().lower()).astype(np.float64)
+
+    days_ahead = (dates - np.datetime64(today, "D")).astype(np.float64)
+    recency = np.where(days_ahead >= 0, np.exp(-np.maximum(days_ahead, 0) / RECENCY_DAYS), 0.0)
+
+    return TAG_WEIGHT * tags + BUDGET_WEIGHT * fit + CITY_WEIGHT * same_city + RECENCY_WEIGHT * recency
+
+
+def top_k(scores, pks, k):
+    """
+    Positions of the k best scores, best first, ties broken by lower pk.
+    """
+    if k <= 0 or not len(scores):
+        return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        # Cut at the k-th best score but keep everything tied with it
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(len(scores))
+    order = np.lexsort((pks[candidates], -scores[candidates]))
+    return candidates[order[:k]]
+
+
+def rank_events(words, budget, city, today, limit, offset=0):
+    """
+    Returns [(event pk, score)] for one page of events ranked for a user
+    whose group has tag `words`.
+    """
+    from mutuals_app.models import EventTag
+
+    if not words:
+        return []
+
+    # One row per candidate event, with its number of matching tags
+    rows = list(
+        EventTag.objects.filter(tag__name__in=words)
+        .values("event_id")
+        .annotate(overlap=Count("pk"))
+        .order_by()
+        .values_list("event_id", "overlap", "event__ticket_price", "event__location", "event__event_date")
+    )
+    if not rows:
+        return []
+
+    pks, overlap, prices, cities, dates = zip(*rows)
+    pks = np.asarray(pks, dtype=np.int64)
+    overlap = np.asarray(overlap, dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    cities = np.char.lower(np.char.strip(np.asarray(cities, dtype=str)))
+    dates = np.asarray(dates, dtype="datetime64[D]")
+
+    scores = score_events(overlap, prices, cities, dates, len(words), budget, city, today)
+    best = top_k(scores, pks, offset + limit)[offset:]
+    return [(int(pks[i]), float(scores[i])) for i in best]
@@ -0,0 +1,603 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import MODEL_PATH, InterestIndex, model_registry
+
+try:
+    import fcntl
+except ImportError:  # Windows: snapshot writes aren't serialized between workers
+    fcntl = None
+
+LIVE_INDEX_FILE = "live_index.npz"
+
+# ResourceVersion bumped, and a LiveIndexChange logged, when existing users
+# change group or interests, or are deleted, or an interest is renamed or
+# deleted (see signals.py). New users don't bump it: refresh() catches them
+# up by pk.
+LIVE_INDEX_RESOURCE = "live-index"
+
+# Users or interests reloaded per query when replaying changes
+REPLAY_CHUNK_SIZE = 500
+
+# Grow the row/column arrays geometrically so appends are amortised O(1)
+MIN_CAPACITY = 1024
+
+
+class LiveInterestIndex(InterestIndex):
+    """
+    Neighbour index over the live User/Interest tables.
+
+    The artifact model only knows the users the notebook clustered; this one
+    starts from the database and is kept up to date by the User signals, so
+    every signup becomes a neighbour for the next one. Rows hold one user's
+    interests as a dense 0/1 vector (there are only a few dozen interests)
+    and are appended in the order users are seen, which is User.pk order
+    for a fresh build; deleted users leave an empty row until the next
+    compaction so the remaining rows keep their relative order.
+
+    Each process keeps its own copy. Users created by other workers (or by
+    bulk inserts, which send no signals) are picked up by refresh(), which
+    loads every user above the highest pk seen so far. Edits and deletes
+    bump the LIVE_INDEX_RESOURCE stamp and log the user or interest they
+    touched; the worker making them applies them directly and moves its
+    stamp on, and the others replay the logged changes above their stamp
+    with catch_up().
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._n = 0                                          # rows in use
+        self._pks = np.zeros(0, dtype=np.int64)              # row -> User.pk, -1 once deleted
+        self._clusters = np.zeros(0, dtype=np.int64)         # row -> group_id, -1 if none
+        self._members = np.zeros((0, 0), dtype=np.uint8)     # row x interest column
+        self.rows = {}                                       # User.pk -> row
+        self.interests = []                                  # column -> Interest name
+        self.interest_cols = {}                              # Interest name -> column
+        self.interest_pks = {}                               # Interest.pk -> column
+        self.group_clusters = {}                             # Group.pk -> group_id
+        self.cluster_tags = {}                               # group_id -> Group name
+        self.watermark = 0                                   # highest User.pk refresh() has read
+        self.generation = 0                                  # bumped on every change
+        self.stamp = 0                                       # LIVE_INDEX_RESOURCE version seen
+        self._applied = set()                                # versions above the stamp applied here
+        self.tombstones = 0
+        self.dirty = False
+        self.model_version = None                            # artifact model when built
+
+    # -- InterestIndex interface ------------------------------------------
+
+    @property
+    def user_ids(self):
+        return self._pks[:self._n]
+
+    @property
+    def user_clusters(self):
+        return self._clusters[:self._n]
+
+    @property
+    def version(self):
+        # Recorded on the users it assigns: the model whose clusters they join
+        return self.model_version
+
+    @property
+    def cache_version(self):
+        # Moves on when refresh() reads new users rather than at every signup,
+        # so cached assignments can lag the newest users by a refresh interval.
+        # The stamp and watermark come from the DB, so workers sharing a cache
+        # agree on them.
+        return f"live.{self.model_version}.{self.stamp}.{self.watermark}"
+
+    def has_clustered_users(self):
+        return bool((self.user_clusters >= 0).any())
+
+    def neighbours(self, interests, top_n=3):
+        with self._lock:
+            scores = self.batch_scores([interests])[0]
+            rows = self.top_neighbours(scores, top_n)
+            return [(self.user_ids[row].item(), int(scores[row])) for row in rows], rows
+
+    def batch_scores(self, interest_lists):
+        """
+        Shared-interest counts of every live user for each interest list,
+        as one (batch x interests) . (interests x users) product.
+        """
+        with self._lock:
+            query = np.zeros((len(interest_lists), len(self.interests)), dtype=np.int32)
+            for i, interests in enumerate(interest_lists):
+                query[i, self.query_cols(interests)] = 1
+            scores = query @ self._members[:self._n, :len(self.interests)].T
+            # Users without a group can't vote for a cluster
+            scores[:, self.user_clusters < 0] = 0
+            return scores
+
+    # -- Incremental updates ----------------------------------------------
+
+    def _grow(self, rows, cols):
+        row_cap, col_cap = self._members.shape
+        if rows <= row_cap and cols <= col_cap:
+            return
+        new_rows = max(rows, row_cap * 2, MIN_CAPACITY) if rows > row_cap else row_cap
+        new_cols = max(cols, col_cap * 2, 32) if cols > col_cap else col_cap
+        members = np.zeros((new_rows, new_cols), dtype=np.uint8)
+        members[:self._n, :col_cap] = self._members[:self._n]
+        self._members = members
+        if new_rows > row_cap:
+            self._pks = np.concatenate([self._pks, np.zeros(new_rows - row_cap, dtype=np.int64)])
+            self._clusters = np.concatenate([self._clusters, np.full(new_rows - row_cap, -1, dtype=np.int64)])
+
+    def _changed(self):
+        self.generation += 1
+        self.dirty = True
+
+    def _column(self, interest_pk, name=None):
+        col = self.interest_pks.get(interest_pk)
+        if col is None:
+            if name is None:
+                from mutuals_app.models import Interest
+                name = Interest.objects.values_list("name", flat=True).get(pk=interest_pk)
+            col = len(self.interests)
+            self._grow(self._n, col + 1)
+            self.interests.append(name)
+            self.interest_cols[name] = col
+            self.interest_pks[interest_pk] = col
+        return col
+
+    def _cluster(self, group_pk):
+        if group_pk is None:
+            return -1
+        if group_pk not in self.group_clusters:
+            self.load_groups()
+        return self.group_clusters.get(group_pk, -1)
+
+    def _row(self, user_pk):
+        row = self.rows.get(user_pk)
+        if row is None:
+            row = self._n
+            self._grow(row + 1, len(self.interests))
+            self._pks[row] = user_pk
+            self._clusters[row] = -1
+            self._members[row] = 0
+            self.rows[user_pk] = row
+            self._n += 1
+        return row
+
+    def set_group(self, user_pk, group_pk):
+        with self._lock:
+            row = self._row(user_pk)  # may reallocate, so index after it
+            self._clusters[row] = self._cluster(group_pk)
+            self._changed()
+
+    def add_interests(self, user_pk, interest_pks):
+        with self._lock:
+            row = self._row(user_pk)
+            cols = [self._column(pk) for pk in interest_pks]
+            self._members[row, cols] = 1
+            self._changed()
+
+    def remove_interests(self, user_pk, interest_pks):
+        with self._lock:
+            row = self.rows.get(user_pk)
+            cols = [self.interest_pks[pk] for pk in interest_pks if pk in self.interest_pks]
+            if row is not None:
+                self._members[row, cols] = 0
+                self._changed()
+
+    def clear_interests(self, user_pk):
+        with self._lock:
+            row = self.rows.get(user_pk)
+            if row is not None:
+                self._members[row] = 0
+                self._changed()
+
+    def remove_interest(self, interest_pk):
+        with self._lock:
+            col = self.interest_pks.pop(interest_pk, None)
+            if col is not None:
+                self._members[:, col] = 0
+                self.interest_cols.pop(self.interests[col], None)
+                self.interests[col] = ""
+                self._changed()
+
+    def clear_interest(self, interest_pk):
+        with self._lock:
+            col = self.interest_pks.get(interest_pk)
+            if col is not None:
+                self._members[:, col] = 0
+                self._changed()
+
+    def rename_interest(self, interest_pk, name):
+        with self._lock:
+            col = self.interest_pks.get(interest_pk)
+            if col is not None and self.interests[col] != name:
+                self.interest_cols.pop(self.interests[col], None)
+                self.interests[col] = name
+                self.interest_cols[name] = col
+                self._changed()
+
+    def remove_user(self, user_pk):
+        with self._lock:
+            row = self.rows.pop(user_pk, None)
+            if row is None:
+                return
+            self._pks[row] = -1
+            self._clusters[row] = -1
+            self._members[row] = 0
+            self.tombstones += 1
+            self._changed()
+            if self.tombstones > MIN_CAPACITY and self.tombstones * 4 > self._n:
+                self._compact()
+
+    def _compact(self):
+        keep = np.fromiter(sorted(self.rows.values()), dtype=np.int64)
+        self._pks[:keep.size] = self._pks[keep]
+        self._clusters[:keep.size] = self._clusters[keep]
+        self._members[:keep.size] = self._members[keep]
+        self._n = keep.size
+        self.rows = {pk.item(): row for row, pk in enumerate(self._pks[:self._n])}
+        self.tombstones = 0
+
+    # -- Loading from the database ----------------------------------------
+
+    def load_groups(self):
+        from mutuals_app.models import Group
+        with self._lock:
+            for pk, group_id, name in Group.objects.values_list("pk", "group_id", "name"):
+                self.group_clusters[pk] = group_id
+                self.cluster_tags[group_id] = name
+
+    def refresh(self, chunk_size=10000):
+        """
+        Load users created since the last refresh (pk above the watermark),
+        including bulk inserts and signups handled by other workers.
+        """
+        from mutuals_app.models import Interest, User
+
+        with self._lock:
+            self.load_groups()
+            for pk, name in Interest.objects.values_list("pk", "name"):
+                self._column(pk, name)
+
+            watermark = self.watermark
+            users = (
+                User.objects.filter(pk__gt=watermark)
+                .order_by("pk")
+                .values_list("pk", "group_id")
+                .iterator(chunk_size=chunk_size)
+            )
+            added = 0
+            for pk, group_pk in users:
+                row = self._row(pk)
+                self._clusters[row] = self._cluster(group_pk)
+                self.watermark = pk
+                added += 1
+            if not added:
+                return 0
+
+            links = (
+                User.interests.through.objects.filter(user_id__gt=watermark)
+                .values_list("user_id", "interest_id")
+                .iterator(chunk_size=chunk_size)
+            )
+            for user_pk, interest_pk in links:
+                row = self.rows.get(user_pk)
+                if row is not None:
+                    self._members[row, self._column(interest_pk)] = 1
+
+            self._changed()
+            return added
+
+    def _reload_users(self, user_pks):
+        """
+        Re-read the group and interests of these users, dropping the ones
+        that no longer exist. Users above the watermark are left to refresh().
+        """
+        from mutuals_app.models import User
+
+        user_pks = sorted(pk for pk in user_pks if pk <= self.watermark)
+        for start in range(0, len(user_pks), REPLAY_CHUNK_SIZE):
+            chunk = user_pks[start:start + REPLAY_CHUNK_SIZE]
+            groups = dict(User.objects.filter(pk__in=chunk).values_list("pk", "group_id"))
+            for pk in chunk:
+                if pk not in groups:
+                    self.remove_user(pk)
+                    continue
+                row = self._row(pk)
+                self._clusters[row] = self._cluster(groups[pk])
+                self._members[row] = 0
+            links = User.interests.through.objects.filter(user_id__in=groups).values_list("user_id", "interest_id")
+            for user_pk, interest_pk in links:
+                col = self._column(interest_pk)  # may reallocate, so index after it
+                self._members[self.rows[user_pk], col] = 1
+
+    def _reload_interests(self, interest_pks):
+        """
+        Re-read the name and users of these interests, dropping the ones
+        that no longer exist.
+        """
+        from mutuals_app.models import Interest, User
+
+        interest_pks = sorted(interest_pks)
+        for start in range(0, len(interest_pks), REPLAY_CHUNK_SIZE):
+            chunk = interest_pks[start:start + REPLAY_CHUNK_SIZE]
+            names = dict(Interest.objects.filter(pk__in=chunk).values_list("pk", "name"))
+            for pk in chunk:
+                if pk not in names:
+                    self.remove_interest(pk)
+                    continue
+                self.rename_interest(pk, names[pk])
+                self._members[:, self._column(pk, names[pk])] = 0
+            links = User.interests.through.objects.filter(interest_id__in=names).values_list("user_id", "interest_id")
+            for user_pk, interest_pk in links:
+                row = self.rows.get(user_pk)
+                if row is not None:
+                    self._members[row, self.interest_pks[interest_pk]] = 1
+
+    def catch_up(self):
+        """
+        Replay the changes logged since this index's stamp by other workers,
+        reloading the users and interests they touched. False if some of
+        them were already pruned from the log, in which case the index has
+        to be rebuilt instead.
+        """
+        from mutuals_app.models import LiveIndexChange
+
+        with self._lock:
+            stamp = live_index_stamp()
+            if stamp == self.stamp:
+                return True
+            changes = list(
+                LiveIndexChange.objects.filter(version__gt=self.stamp, version__lte=stamp)
+                .values_list("version", "user_pk", "interest_pk")
+            )
+            # Bumps are serialized by the ResourceVersion row lock, so the
+            # versions up to the current stamp are all committed
+            if stamp < self.stamp or len(changes) != stamp - self.stamp:
+                return False
+            user_pks, interest_pks = set(), set()
+            for version, user_pk, interest_pk in changes:
+                if version in self._applied:
+                    continue  # Made by this process, and applied at commit
+                if user_pk is not None:
+                    user_pks.add(user_pk)
+                if interest_pk is not None:
+                    interest_pks.add(interest_pk)
+            self._reload_users(user_pks)
+            self._reload_interests(interest_pks)
+            self.stamp = stamp
+            self._applied = {version for version in self._applied if version > stamp}
+            self._changed()
+            return True
+
+    def apply_change(self, version, update):
+        """
+        Apply `update(self)` for a change this process committed as
+        `version`, moving the stamp on once every version below it is in.
+        Skipped if catch_up() already replayed it from the database.
+        """
+        with self._lock:
+            if version <= self.stamp:
+                return
+            update(self)
+            self._applied.add(version)
+            while self.stamp + 1 in self._applied:
+                self.stamp += 1
+                self._applied.discard(self.stamp)
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        index.model_version = model_registry.version
+        # Read before the rows, so an edit made during the build is seen as newer
+        index.stamp = live_index_stamp()
+        index.refresh()
+        return index
+
+    def is_current(self):
+        """
+        False once the artifact model changed: the users were re-clustered,
+        and neither refresh() nor catch_up() can follow that.
+        """
+        return self.model_version == model_registry.version
+
+    # -- Persistence ------------------------------------------------------
+
+    def save(self, path):
+        """
+        Snapshot the index so a restarted worker can restore it and only
+        catch up on newer users instead of rebuilding from every row.
+
+        Workers share the file: each writes its own temporary file and only
+        replaces a snapshot of the same model if it has seen more (a later
+        stamp, or the same stamp and more users).
+        """
+        with self._lock:
+            n, k = self._n, len(self.interests)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                np.savez(
+                    f,
+                    pks=self._pks[:n],
+                    clusters=self._clusters[:n],
+                    members=np.packbits(self._members[:n, :k], axis=1),
+                    interest_pks=np.fromiter(self.interest_pks.keys(), dtype=np.int64, count=len(self.interest_pks)),
+                    interest_cols=np.fromiter(self.interest_pks.values(), dtype=np.int64, count=len(self.interest_pks)),
+                    interests=np.asarray(self.interests, dtype=str),
+                    meta=np.asarray([self.watermark, k, self.stamp], dtype=np.int64),
+                    model_version=np.asarray(self.model_version or "", dtype=str),
+                )
+            with _snapshot_lock(path):
+                model_version, stamp, watermark = snapshot_version(path)
+                if model_version == (self.model_version or "") and (stamp, watermark) >= (self.stamp, self.watermark):
+                    os.remove(tmp)
+                else:
+                    os.replace(tmp, path)
+            self.dirty = False
+
+    @classmethod
+    def restore(cls, path):
+        from mutuals_app.models import User
+
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+
+        index = cls()
+        watermark, k, stamp = arrays["meta"].tolist()
+        n = arrays["pks"].size
+        index._grow(n, k)
+        index._n = n
+        index._pks[:n] = arrays["pks"]
+        index._clusters[:n] = arrays["clusters"]
+        index._members[:n, :k] = np.unpackbits(arrays["members"], axis=1, count=k)
+        index.interests = arrays["interests"].tolist()
+        index.interest_cols = {name: col for col, name in enumerate(index.interests) if name}
+        index.interest_pks = dict(zip(arrays["interest_pks"].tolist(), arrays["interest_cols"].tolist()))
+        index.rows = {pk: row for row, pk in enumerate(index._pks[:n].tolist()) if pk >= 0}
+        index.tombstones = n - len(index.rows)
+        index.watermark = watermark
+        index.stamp = stamp
+        index.model_version = arrays["model_version"].item()
+
+        # A snapshot from an older model predates a re-clustering, and one
+        # older than the change log can't replay the edits since
+        if not index.is_current() or not index.catch_up():
+            return cls.build()
+
+        index.refresh()
+        # Users removed without a signal (e.g. a raw delete) can't be replayed
+        if len(index.rows) != User.objects.count():
+            return cls.build()
+        index.dirty = False
+        return index
+
+
+def live_index_path():
+    return getattr(settings, "CLUSTER_LIVE_INDEX_PATH", os.path.join(MODEL_PATH, LIVE_INDEX_FILE))
+
+
+def live_index_stamp():
+    from mutuals_app.models import ResourceVersion
+    return ResourceVersion.objects.filter(resource=LIVE_INDEX_RESOURCE).values_list("version", flat=True).first() or 0
+
+
+def record_change(user_pk=None, interest_pk=None):
+    """
+    Bump the live index stamp and log what changed under the new version,
+    for the other workers' catch_up(). Returns the version.
+    """
+    from mutuals_app.conditional import bump_versions
+    from mutuals_app.models import LiveIndexChange
+
+    with transaction.atomic():
+        bump_versions(LIVE_INDEX_RESOURCE)
+        # The bump locks the row until commit, so this is our own version
+        version = live_index_stamp()
+        LiveIndexChange.objects.create(version=version, user_pk=user_pk, interest_pk=interest_pk)
+    return version
+
+
+def prune_changes():
+    """
+    Drop logged changes older than CLUSTER_LIVE_INDEX_CHANGE_RETENTION
+    seconds; an index that hasn't caught up on them by then is rebuilt.
+    """
+    from mutuals_app.models import LiveIndexChange
+
+    retention = getattr(settings, "CLUSTER_LIVE_INDEX_CHANGE_RETENTION", 24 * 3600)
+    LiveIndexChange.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=retention)).delete()
+
+
+def snapshot_version(path):
+    """
+    (model version, stamp, watermark) of the snapshot at `path`, for
+    comparing with another worker's; ("", -1, -1) if there is none.
+    """
+    try:
+        with np.load(path) as data:
+            watermark, _, stamp = data["meta"].tolist()
+            return data["model_version"].item(), stamp, watermark
+    except Exception:  # Missing, unreadable, or from before the stamp was saved
+        return "", -1, -1
+
+
+@contextmanager
+def _snapshot_lock(path):
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+_live_index = None
+_live_index_lock = threading.Lock()
+_refreshed_at = 0.0
+
+
+def get_live_index():
+    """
+    Returns this process's live index, restoring the last snapshot (or
+    building from the database) on first use. Every
+    CLUSTER_LIVE_INDEX_REFRESH_INTERVAL seconds it also catches up on users
+    created and edits made elsewhere (or rebuilds after a re-clustering) and
+    re-saves the snapshot if anything changed.
+    """
+    global _live_index, _refreshed_at
+    if _live_index is None:
+        with _live_index_lock:
+            if _live_index is None:
+                path = live_index_path()
+                try:
+                    index = LiveInterestIndex.restore(path)
+                except Exception:
+                    index = LiveInterestIndex.build()
+                index.save(path)
+                _refreshed_at = time.monotonic()
+                _live_index = index
+        return _live_index
+
+    interval = getattr(settings, "CLUSTER_LIVE_INDEX_REFRESH_INTERVAL", 30)
+    if time.monotonic() - _refreshed_at >= interval and _live_index_lock.acquire(blocking=False):
+        try:
+            _refreshed_at = time.monotonic()
+            if not _live_index.is_current() or not _live_index.catch_up():
+                # Re-clustered, or too far behind the change log
+                _live_index = LiveInterestIndex.build()
+            else:
+                _live_index.refresh()
+            if _live_index.dirty:
+                _live_index.save(live_index_path())
+            prune_changes()
+        finally:
+            _live_index_lock.release()
+    return _live_index
+
+
+def loaded_live_index():
+    """
+    The live index if this process has built it, else None. Signal handlers
+    use this so that writes (e.g. seeding) never trigger a full build.
+    """
+    return _live_index
+
+
+def discard_snapshot():
+    """
+    Called after bulk changes that send no signals (e.g. recluster moving
+    users): the snapshot can't see them, so drop it and rebuild on next use.
+    """
+    try:
+        os.remove(live_index_path())
+    except FileNotFoundError:
+        pass
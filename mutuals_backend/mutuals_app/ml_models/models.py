@@ -1,138 +1,697 @@
 # myapp/utils/cluster_model.py
+import asyncio
+import hashlib
+import io
+import json
+import logging
 import pickle
 import os
 import random
-from collections import Counter
-import networkx as nx
-from django.db.models import Count, Max
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Max, Q
 from django.utils.crypto import get_random_string
 from django.utils.timezone import now
 
+logger = logging.getLogger(__name__)
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, ".")
 
-# Load saved partition (cluster mapping)
-with open(os.path.join(MODEL_PATH, "leiden_partition.pkl"), "rb") as f:
-    leiden_partition = pickle.load(f)
+# Compact artifacts, written by convert_pickles() / `manage.py convert_cluster_model`
+MODEL_FILE = "cluster_model.npz"
+TAGS_FILE = "cluster_tags.json"
+
+
+class InterestIndex:
+    """
+    Inverted interest -> users index over the clustered users.
+
+    Stored as plain CSR arrays (indptr/indices, one row per interest) so that
+    assigning a new user is a sparse dot product against the interest rows
+    instead of a full graph copy and projection per request.
+    """
+
+    def __init__(self, user_ids, user_clusters, interests, indptr, indices, cluster_tags, version=""):
+        self.version = version              # content hash of the artifacts
+        self.user_ids = user_ids            # row -> original user node
+        self.user_clusters = user_clusters  # row -> cluster id
+        self.interests = interests
+        self.interest_cols = {name: col for col, name in enumerate(interests)}
+        self.indptr = indptr                # interest -> slice of indices
+        self.indices = indices              # user rows, ascending per interest
+        self.cluster_tags = cluster_tags
+
+    @classmethod
+    def from_graph(cls, graph, partition, cluster_tags):
+        # Rows follow the partition order, which is the node order the
+        # projection used, so ties between equally weighted neighbours
+        # are broken exactly as before.
+        user_ids = list(partition.keys())
+        user_rows = {user_id: row for row, user_id in enumerate(user_ids)}
+        interests = [n for n, d in graph.nodes(data=True) if d.get("bipartite") == 1]
+
+        indptr = [0]
+        indices = []
+        for interest in interests:
+            rows = sorted(user_rows[n] for n in graph[interest] if n in user_rows)
+            indices.extend(rows)
+            indptr.append(len(indices))
+
+        return cls(
+            np.asarray(user_ids),
+            np.asarray([partition[u] for u in user_ids], dtype=np.int64),
+            interests,
+            np.asarray(indptr, dtype=np.int64),
+            np.asarray(indices, dtype=np.int64),
+            cluster_tags,
+        )
+
+    @classmethod
+    def load(cls, model_path=MODEL_PATH):
+        """
+        Load the index from the compact .npz / .json artifacts.
+        """
+        with open(os.path.join(model_path, MODEL_FILE), "rb") as f:
+            model_bytes = f.read()
+        with open(os.path.join(model_path, TAGS_FILE), "rb") as f:
+            tags_bytes = f.read()
+
+        with np.load(io.BytesIO(model_bytes)) as data:
+            arrays = {name: data[name] for name in data.files}
+        cluster_tags = {int(k): v for k, v in json.loads(tags_bytes).items()}
+
+        return cls(
+            arrays["user_ids"],
+            arrays["user_clusters"],
+            arrays["interests"].tolist(),
+            arrays["indptr"],
+            arrays["indices"],
+            cluster_tags,
+            version=hashlib.sha256(model_bytes + tags_bytes).hexdigest()[:12],
+        )
+
+    def save(self, model_path=MODEL_PATH):
+        """
+        Write the index as compact artifacts. Files are replaced atomically so
+        a concurrent load never sees a half-written model.
+        """
+        model_file = os.path.join(model_path, MODEL_FILE)
+        with open(model_file + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                user_ids=self.user_ids,
+                user_clusters=self.user_clusters,
+                interests=np.asarray(self.interests, dtype=str),
+                indptr=self.indptr,
+                indices=self.indices,
+            )
+        tags_file = os.path.join(model_path, TAGS_FILE)
+        with open(tags_file + ".tmp", "w") as f:
+            json.dump({str(k): v for k, v in self.cluster_tags.items()}, f, indent=4, sort_keys=True)
+
+        os.replace(tags_file + ".tmp", tags_file)
+        os.replace(model_file + ".tmp", model_file)
+
+    @property
+    def cache_version(self):
+        # Assignments cached under this version stay valid until it changes
+        return self.version
+
+    def query_cols(self, interests):
+        return np.asarray(
+            sorted({self.interest_cols[i] for i in interests if i in self.interest_cols}),
+            dtype=np.int64,
+        )
+
+    def gather(self, cols):
+        """
+        User rows of the given interest columns, concatenated, plus the
+        number of rows contributed by each column.
+        """
+        starts = self.indptr[cols]
+        lengths = self.indptr[cols + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.indices[offsets + np.arange(offsets.size)], lengths
+
+    def top_neighbours(self, scores, top_n):
+        """
+        Return the rows of the top-N weighted neighbours, heaviest first.
+        Equal weights keep the earlier row, like the stable sort did.
+        """
+        candidates = np.flatnonzero(scores)
+        if candidates.size == 0:
+            return candidates
+
+        n_users = len(self.user_ids)
+        # Fold weight and row position into one key so argpartition is exact
+        keys = scores[candidates].astype(np.int64) * n_users + (n_users - 1 - candidates)
+        if candidates.size > top_n:
+            picked = np.argpartition(-keys, top_n - 1)[:top_n]
+            candidates, keys = candidates[picked], keys[picked]
+        return candidates[np.argsort(-keys)]
+
+    def neighbours(self, interests, top_n=3):
+        rows, _ = self.gather(self.query_cols(interests))
+        scores = np.bincount(rows, minlength=len(self.user_ids))
+        rows = self.top_neighbours(scores, top_n)
+        return [(self.user_ids[row].item(), int(scores[row])) for row in rows], rows
+
+    def batch_scores(self, interest_lists):
+        """
+        Score a batch of interest lists against every clustered user in one
+        sparse (batch x interests) . (interests x users) product.
+        Returns a dense (batch x users) array.
+        """
+        n_users = len(self.user_ids)
+        query = [self.query_cols(interests) for interests in interest_lists]
+        owners = np.repeat(np.arange(len(query)), [cols.size for cols in query])
+        rows, lengths = self.gather(np.concatenate(query))
+        flat = np.repeat(owners, lengths) * n_users + rows
+        return np.bincount(flat, minlength=len(query) * n_users).reshape(len(query), n_users)
+
+    def cluster_for_rows(self, rows):
+        """
+        Majority cluster among the neighbour rows; ties go to the cluster of
+        the heavier neighbour, as Counter.most_common did.
+        """
+        if len(rows) == 0:
+            return {"cluster": None, "tag": "Unassigned", "model_version": self.version}
+        neighbor_clusters = [int(c) for c in self.user_clusters[rows]]
+        assigned_cluster = Counter(neighbor_clusters).most_common(1)[0][0]
+        return {
+            "cluster": assigned_cluster,
+            "tag": self.cluster_tags.get(assigned_cluster, "Unknown"),
+            "model_version": self.version,
+        }
+
+
+def convert_pickles(model_path=MODEL_PATH):
+    """
+    Build the compact artifacts from the notebook's pickles
+    (leiden_partition.pkl, cluster_tags.pkl, bipartite_graph.pkl).
+    """
+    import networkx  # noqa: F401 - needed to unpickle the bipartite graph
+
+    with open(os.path.join(model_path, "leiden_partition.pkl"), "rb") as f:
+        leiden_partition = pickle.load(f)
 
-# Load cluster tags
-with open(os.path.join(MODEL_PATH, "cluster_tags.pkl"), "rb") as f:
-    cluster_tags = pickle.load(f)
+    with open(os.path.join(model_path, "cluster_tags.pkl"), "rb") as f:
+        cluster_tags = pickle.load(f)
 
-with open(os.path.join(MODEL_PATH, "bipartite_graph.pkl"), "rb") as f:
+    with open(os.path.join(model_path, "bipartite_graph.pkl"), "rb") as f:
         bipartite_graph = pickle.load(f)
 
+    index = InterestIndex.from_graph(bipartite_graph, leiden_partition, cluster_tags)
+    index.save(model_path)
+    return index
+
+
+class ModelRegistry:
+    """
+    Holds the current clustering model and hot-swaps it when the artifacts
+    on disk change, so a re-clustering is picked up without restarting
+    workers.
+
+    Callers take one snapshot with get() and use it for the whole request;
+    a reload builds the new index in a background thread and replaces the
+    reference in a single assignment, so requests are never blocked on it.
+    """
+
+    def __init__(self, model_path=MODEL_PATH):
+        self.model_path = model_path
+        self._current = None
+        self._stamp = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def reload_interval(self):
+        # Seconds between checks of the artifact files; None disables reloading
+        return getattr(settings, "CLUSTER_MODEL_RELOAD_INTERVAL", 30)
+
+    def _artifact_stamp(self):
+        # The .npz is replaced last by InterestIndex.save(), so it marks a complete write
+        st = os.stat(os.path.join(self.model_path, MODEL_FILE))
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _load(self):
+        if not os.path.exists(os.path.join(self.model_path, MODEL_FILE)):
+            # Fresh pickles from the notebook that were never converted
+            convert_pickles(self.model_path)
+        stamp = self._artifact_stamp()
+        index = InterestIndex.load(self.model_path)
+        self._current, self._stamp = index, stamp
+        assignment_cache.clear()
+        return index
+
+    def _reload_if_changed(self):
+        try:
+            if self._artifact_stamp() != self._stamp:
+                self._load()
+        except Exception:
+            # Keep serving the previous model if the new artifacts are unreadable
+            logger.exception("Cluster model reload failed, keeping %s", self._current.version)
+        finally:
+            self._lock.release()
+
+    def get(self):
+        """
+        Returns the current model, loading it on first use rather than at
+        import so management commands and test runs don't pay for it.
+        """
+        current = self._current
+        if current is None:
+            with self._lock:
+                if self._current is None:
+                    self._load()
+                return self._current
+
+        interval = self.reload_interval
+        if interval is not None and time.monotonic() - self._checked_at >= interval:
+            # Only one thread checks; everyone else keeps the current snapshot
+            if self._lock.acquire(blocking=False):
+                self._checked_at = time.monotonic()
+                threading.Thread(target=self._reload_if_changed, daemon=True).start()
+        return current
+
+    def reload(self):
+        """
+        Load the artifacts now and swap them in (e.g. right after writing them).
+        """
+        with self._lock:
+            return self._load()
+
+    @property
+    def version(self):
+        return self.get().version
+
+
+model_registry = ModelRegistry()
+
+
+def get_assignment_index():
+    """
+    The index new users are scored against: the live index over the User
+    table (see live_index.py) when enabled and it has clustered users,
+    otherwise the artifact model the notebook produced.
+    """
+    if getattr(settings, "CLUSTER_LIVE_INDEX", True):
+        from .live_index import get_live_index
+        index = get_live_index()
+        if index.has_clustered_users():
+            return index
+    return model_registry.get()
+
+
+def warm_up():
+    """
+    Load the assignment index ahead of the first signup (run in a thread on
+    the first request, see signals.py). A failure is only logged: signups
+    load the index themselves.
+    """
+    try:
+        get_assignment_index()
+    except Exception:
+        logger.exception("Cluster model warm-up failed")
+    finally:
+        connection.close()
+
+
+class AssignmentCache:
+    """
+    Bounded LRU of cluster assignments keyed by (model version, top-N,
+    sorted interest columns). Signups with an interest set seen before under
+    the same model skip scoring entirely; there are only a few dozen
+    interests, so most of them do.
+
+    Entries live in process memory and, when CLUSTER_ASSIGNMENT_CACHE_ALIAS
+    names a Django cache, are shared through it as well. The model version
+    is part of the key and the local entries are dropped on every reload.
+    """
+
+    def __init__(self, maxsize=None):
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self):
+        if self._maxsize is not None:
+            return self._maxsize
+        return getattr(settings, "CLUSTER_ASSIGNMENT_CACHE_SIZE", 4096)
+
+    @property
+    def shared(self):
+        alias = getattr(settings, "CLUSTER_ASSIGNMENT_CACHE_ALIAS", None)
+        if alias is None:
+            return None
+        from django.core.cache import caches
+        return caches[alias]
+
+    @staticmethod
+    def key(index, interests, top_n):
+        cols = "-".join(map(str, index.query_cols(interests).tolist()))
+        return f"cluster-assignment:{index.cache_version}:{top_n}:{cols}"
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self._store(key, value)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return dict(value) if value is not None else None
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def set(self, key, value):
+        self._store(key, dict(value))
+        if self.shared is not None:
+            self.shared.set(key, dict(value))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+assignment_cache = AssignmentCache()
+
 
 def assign_new_user_to_cluster(new_user_id, new_user_interests):
     """
     Assign a new user to an existing cluster based on shared interests.
     """
-    # Load saved bipartite graph (users + interests) instead of just user graph
-    temp_graph = bipartite_graph.copy()
+    top_n = 3
+
+    interest_index = get_assignment_index()
+    cache_key = assignment_cache.key(interest_index, new_user_interests, top_n)
+    cached = assignment_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Weight of each clustered user = number of interests shared with the new user
+    top_neighbors, rows = interest_index.neighbours(new_user_interests, top_n)
+
+    logger.debug("Neighbours of %s: %s", new_user_id, top_neighbors)
+
+    assignment = interest_index.cluster_for_rows(rows)
+    assignment_cache.set(cache_key, assignment)
+    return assignment
+
+
+# Rows scored per sparse product; bounds the dense (batch x users) block
+BATCH_CHUNK_SIZE = 256
 
-    # Add new user node
-    temp_graph.add_node(new_user_id, bipartite=0)
 
-    for interest in new_user_interests:
-        # If interest is not already in the graph, skip or optionally add it
-        if not temp_graph.has_node(interest):
+def assign_new_users_to_clusters(new_users, top_n=3):
+    """
+    Batched assign_new_user_to_cluster.
+    Takes a list of (user_id, interests) and returns the assignments in the
+    same order. Interest sets already cached are not scored again; the rest
+    are deduplicated and scored a chunk at a time with one matrix product.
+    """
+    interest_index = get_assignment_index()
+    keys = [assignment_cache.key(interest_index, interests, top_n) for _, interests in new_users]
+
+    found = {}
+    pending = {}
+    for key, (_, interests) in zip(keys, new_users):
+        if key in found or key in pending:
             continue
-        temp_graph.add_edge(new_user_id, interest)
+        cached = assignment_cache.get(key)
+        if cached is not None:
+            found[key] = cached
+        else:
+            pending[key] = interests
 
-    # Project to user-user graph
-    projected = nx.bipartite.weighted_projected_graph(
-        temp_graph,
-        list(leiden_partition.keys()) + [new_user_id]
-    )
+    pending = list(pending.items())
+    for start in range(0, len(pending), BATCH_CHUNK_SIZE):
+        chunk = pending[start:start + BATCH_CHUNK_SIZE]
+        scores = interest_index.batch_scores([interests for _, interests in chunk])
+        for (key, _), row_scores in zip(chunk, scores):
+            rows = interest_index.top_neighbours(row_scores, top_n)
+            found[key] = interest_index.cluster_for_rows(rows)
+            assignment_cache.set(key, found[key])
 
-    if new_user_id not in projected:
-        return {"cluster": None, "tag": "Unassigned"}
+    return [dict(found[key]) for key in keys]
 
-    # Extract neighbors with their weights properly
-    neighbors = {
-        n: projected[new_user_id][n].get('weight', 0)
-        for n in projected[new_user_id]
-    }
 
-    top_n = 3
+# Threads scoring signups (and ranked event pages) for the async views.
+# Bounds the CPU that slow signups can take from the reads served by the same worker; threads rather
+# than processes because the live index they score against is kept current
+# in this process by signals.
+_scoring_pool = None
+_scoring_pool_lock = threading.Lock()
 
-    if not neighbors:
-        return {"cluster": None, "tag": "Unassigned"}
 
-    # Sort by similarity weight and select top-N
-    top_neighbors = sorted(neighbors.items(), key=lambda x: x[1], reverse=True)[:top_n]
-    print("Neighs", top_neighbors)
+def scoring_pool():
+    global _scoring_pool
+    with _scoring_pool_lock:
+        if _scoring_pool is None:
+            _scoring_pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, "CLUSTER_SCORING_WORKERS", 2),
+                thread_name_prefix="cluster-scoring",
+            )
+        return _scoring_pool
 
-    # Get the clusters of these top-N neighbors
-    neighbor_clusters = [
-        leiden_partition[n[0]] for n in top_neighbors if n[0] in leiden_partition
-    ]
 
-    if neighbor_clusters:
-        assigned_cluster = Counter(neighbor_clusters).most_common(1)[0][0]
-        tag = cluster_tags.get(assigned_cluster, "Unknown")
-    else:
-        assigned_cluster = None
-        tag = "Unassigned"
+def _in_pool(fn, args):
+    from django.db import close_old_connections
+    try:
+        return fn(*args)
+    finally:
+        # Loading or catching up the live index reads the DB from this thread
+        close_old_connections()
+
 
-    return {"cluster": assigned_cluster, "tag": tag}
+async def run_in_scoring_pool(fn, *args):
+    """
+    Awaits fn(*args) run in the scoring pool, leaving the event loop free
+    to serve other requests meanwhile.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(scoring_pool(), _in_pool, fn, args)
+
+
+async def aassign_new_user_to_cluster(new_user_id, new_user_interests):
+    return await run_in_scoring_pool(assign_new_user_to_cluster, new_user_id, new_user_interests)
 
 def generate_subgroup_name(base_name, group_id, subgroup_id):
     adjectives = ["Creative", "Dynamic", "Brave", "Inspired", "Innovative"]
     return f"{random.choice(adjectives)} Squad {group_id}-{subgroup_id}"
 
+SUBGROUP_SIZE = 5
+
+# Attempts at claiming or creating a subgroup before giving up; each retry
+# means another signup won the same seat or subgroup_id in the meantime
+SUBGROUP_PLACEMENT_RETRIES = 10
+
+
+class SubGroupPlacementError(Exception):
+    pass
+
+
+def subgroup_fits(user):
+    """
+    Subgroups with room for the user whose members are all within 5 years and
+    500 budget of them, read off the subgroup's stored min/max aggregates.
+    """
+    return Q(member_count__lt=SUBGROUP_SIZE) & (
+        Q(member_count=0)
+        | Q(
+            min_age__gte=user.age - 5, max_age__lte=user.age + 5,
+            min_budget__gte=user.budget - 500, max_budget__lte=user.budget + 500,  # tweak as needed
+        )
+    )
+
+
 # def assign_user_to_subgroup(user, group, SubGroupModel):
 def assign_user_to_subgroup(user, SubGroupModel, group):    
     """
     Assigns a user to a suitable subgroup under the user's group.
     If no suitable subgroup exists, creates a new one.
+
+    Safe with concurrent signups without locking the group: a seat is claimed
+    with a conditional UPDATE that re-checks the fit, and a new subgroup_id
+    is taken by inserting it. Losing either race just retries.
     """
-    # group = user.group
-    existing_subgroups = SubGroupModel.objects.filter(group=group).prefetch_related("users")
+    fits = subgroup_fits(user)
 
-    print("Existing GROUP >> ", group)
-    print("Existing subs >> ", existing_subgroups)
+    for _ in range(SUBGROUP_PLACEMENT_RETRIES):
+        subgroup = SubGroupModel.objects.filter(fits, group=group).order_by("id").first()
 
-    for subgroup in existing_subgroups:
-        members = subgroup.users.all()
+        if subgroup is not None:
+            with transaction.atomic():
+                if SubGroupModel.add_member(subgroup.pk, user.age, user.budget, only_if=fits):
+                    return _join_subgroup(user, subgroup)  # Assigned to existing subgroup
+            continue  # Filled up or moved out of range since the lookup
 
-        print("Existing members >> ", members)
+        # If no fit found, create new subgroup, with the user already counted
+        next_subgroup_id = (
+            SubGroupModel.objects.filter(group=group).aggregate(max_id=Max("subgroup_id"))["max_id"] or 0
+        ) + 1
 
+        name = generate_subgroup_name("Squad", group.group_id, next_subgroup_id)
 
-        # Skip if full
-        if members.count() >= 5:
-            continue
+        try:
+            with transaction.atomic():
+                new_subgroup = SubGroupModel.objects.create(
+                    subgroup_id=next_subgroup_id,
+                    group=group,
+                    name=name,
+                    member_count=1,
+                    min_age=user.age, max_age=user.age,
+                    min_budget=user.budget, max_budget=user.budget,
+                )
+                return _join_subgroup(user, new_subgroup)
+        except IntegrityError:
+            continue  # subgroup_id taken by a concurrent signup
 
-        # Heuristics: match by age_range, then budget and city
-        if all([
-            abs(user.age - m.age) <= 5 for m in members
-        ]) and all([
-            abs(user.budget - m.budget) <= 500 for m in members  # tweak as needed
-        ]):
-        # and all([
-        #     user.city.lower() == m.city.lower() for m in members
-        # ]):
-            user.subgroup = subgroup
-            user.save()
-            return subgroup  # Assigned to existing subgroup
-
-    # If no fit found, create new subgroup
-    next_subgroup_id = (
-        SubGroupModel.objects.filter(group=group).aggregate(max_id=Max("subgroup_id"))["max_id"] or 0
-    ) + 1
-
-    name = generate_subgroup_name("Squad", group.group_id, next_subgroup_id)
-
-    new_subgroup = SubGroupModel.objects.create(
-        subgroup_id=next_subgroup_id,
-        group=group,
-        name=name
+    raise SubGroupPlacementError(
+        f"Could not place user {user.user_id} in group {group.group_id} "
+        f"after {SUBGROUP_PLACEMENT_RETRIES} attempts."
     )
 
-    user.subgroup = new_subgroup
+
+def _join_subgroup(user, subgroup):
+    # The seat is already counted in the aggregates; tell the User signal
+    user.subgroup = subgroup
+    user._claimed_subgroup = subgroup.pk
     user.save()
+    return subgroup
+
+def pack_group_into_subgroups(group, users):
+    """
+    Packs `users` (members of `group`) into new subgroups of the group in
+    one pass, under the same rules as assign_user_to_subgroup, and writes
+    everything with a few bulk queries. Returns the new subgroups.
+
+    Users are sorted by age, so a subgroup stops taking members once its
+    youngest is more than 5 years younger than the next user; each user goes
+    into the first open subgroup whose budget range fits. Subgroups the users
+    leave get their aggregates recomputed, and are deleted once empty.
+    """
+    from mutuals_app.cache import invalidate_user_details
+    from mutuals_app.conditional import bump_versions
+    from mutuals_app.models import SubGroup, User
+
+    users = sorted(users, key=lambda u: (u.age, u.budget, u.pk))
+    buckets = []
+    open_buckets = []
+    for user in users:
+        open_buckets = [
+            b for b in open_buckets
+            if b["min_age"] >= user.age - 5 and len(b["members"]) < SUBGROUP_SIZE
+        ]
+        for bucket in open_buckets:
+            if bucket["min_budget"] >= user.budget - 500 and bucket["max_budget"] <= user.budget + 500:
+                break
+        else:
+            bucket = {"members": [], "min_age": user.age, "min_budget": user.budget, "max_budget": user.budget}
+            buckets.append(bucket)
+            open_buckets.append(bucket)
+        bucket["members"].append(user)
+        bucket["min_budget"] = min(bucket["min_budget"], user.budget)
+        bucket["max_budget"] = max(bucket["max_budget"], user.budget)
+
+    left = {user.subgroup_id for user in users if user.subgroup_id is not None}
+
+    with transaction.atomic():
+        first_id = (
+            SubGroup.objects.filter(group=group).aggregate(max_id=Max("subgroup_id"))["max_id"] or 0
+        ) + 1
+        subgroups = SubGroup.objects.bulk_create(
+            [
+                SubGroup(
+                    subgroup_id=first_id + i,
+                    group=group,
+                    name=generate_subgroup_name("Squad", group.group_id, first_id + i),
+                    member_count=len(b["members"]),
+                    min_age=b["members"][0].age,
+                    max_age=b["members"][-1].age,
+                    min_budget=b["min_budget"],
+                    max_budget=b["max_budget"],
+                )
+                for i, b in enumerate(buckets)
+            ],
+            batch_size=500,
+        )
+        if any(subgroup.pk is None for subgroup in subgroups):
+            # Backends that can't return ids from a bulk insert
+            pks = dict(
+                SubGroup.objects.filter(group=group, subgroup_id__gte=first_id).values_list("subgroup_id", "pk")
+            )
+            for subgroup in subgroups:
+                subgroup.pk = pks[subgroup.subgroup_id]
+
+        for subgroup, bucket in zip(subgroups, buckets):
+            for user in bucket["members"]:
+                user.subgroup = subgroup
+        # A plain executemany: bulk_update's CASE over every pk costs far
+        # more than the writes once groups get large
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                "UPDATE {} SET {} = %s WHERE {} = %s".format(
+                    quote(User._meta.db_table), quote(User._meta.get_field("subgroup").column), quote(User._meta.pk.column)
+                ),
+                [(user.subgroup_id, user.pk) for user in users],
+            )
+
+        if left:
+            SubGroup.refresh_aggregates(left)
+            SubGroup.objects.filter(pk__in=left, member_count=0).delete()
+
+        # The raw UPDATE skips the signals: drop the cached details of the
+        # packed users and of those still in the subgroups they left
+        user_ids = {user.__dict__["user_id"] for user in users if "user_id" in user.__dict__}
+        deferred = [user.pk for user in users if "user_id" not in user.__dict__]
+        left = list(left)
+        for start in range(0, max(len(deferred), len(left)), 500):
+            user_ids.update(
+                User.objects.filter(Q(pk__in=deferred[start:start + 500]) | Q(subgroup__in=left[start:start + 500]))
+                .values_list("user_id", flat=True)
+            )
+        transaction.on_commit(lambda: invalidate_user_details(user_ids))
+
+    # Record what the aggregates now reflect, as the User signals would
+    for user in users:
+        user._subgroup_state = (user.subgroup_id, user.age, user.budget)
+    if subgroups or left:
+        bump_versions("subgroups")
 
-    return new_subgroup
+    return subgroups
 
 # resp = assign_new_user_to_cluster('M0175', ['Cooking','Movies', 'Cars and automobiles'])
 # print(resp)
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""
+Materialized per-group event recommendations (GroupEventRecommendation).
+
+Every member of a group gets the same tag-matched events, so the list is
+stored per group and only recomputed for the groups an event or group change
+can affect. Signals schedule the refreshes; bulk loaders wrap themselves in
+batch_refresh() to refresh each affected group once at the end.
+"""
+import re
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+# Events stored per group; pages beyond it fall back to the tag index
+GROUP_RECOMMENDATION_SIZE = 100
+
+# Words in group names like "Cars and automobiles & Parenting and family"
+# that aren't interests and would only widen the tag lookup
+TAG_STOP_WORDS = {"a", "an", "and", "for", "in", "of", "on", "or", "the", "to", "with"}
+
+_batch = threading.local()
+
+
+def group_tag_words(group_name):
+    words = re.findall(r'\b\w+\b', group_name.lower())
+    return sorted(set(words) - TAG_STOP_WORDS)
+
+
+def matching_events(words):
+    """
+    Events carrying any of the tag words, in catalogue (pk) order.
+    """
+    from mutuals_app.models import Event
+
+    return Event.objects.filter(tag_index__tag__name__in=words).distinct().order_by('pk')
+
+
+def groups_for_tags(tags):
+    """
+    pks of the groups whose name shares a tag word with `tags`.
+    """
+    from mutuals_app.models import Group, normalize_tag
+
+    tags = {normalize_tag(tag) for tag in tags or []}
+    return {
+        pk for pk, name in Group.objects.values_list('pk', 'name')
+        if tags.intersection(group_tag_words(name))
+    }
+
+
+def refresh_group_recommendations(group_pks):
+    from mutuals_app.conditional import bump_versions
+    from mutuals_app.models import Group, GroupEventRecommendation
+
+    for group in Group.objects.filter(pk__in=group_pks).only('pk', 'name'):
+        event_pks = matching_events(group_tag_words(group.name)).values_list('pk', flat=True)
+        with transaction.atomic():
+            GroupEventRecommendation.objects.filter(group=group).delete()
+            GroupEventRecommendation.objects.bulk_create([
+                GroupEventRecommendation(group=group, event_id=event_pk, rank=rank)
+                for rank, event_pk in enumerate(event_pks[:GROUP_RECOMMENDATION_SIZE])
+            ])
+    # Retires the cached events-by-user pages
+    bump_versions('recommendations')
+
+
+def schedule_refresh(group_pks):
+    """
+    Refresh these groups after the current transaction commits, or at the end
+    of the enclosing batch_refresh().
+    """
+    group_pks = set(group_pks)
+    if not group_pks:
+        return
+    pending = getattr(_batch, "groups", None)
+    if pending is not None:
+        pending.update(group_pks)
+    else:
+        transaction.on_commit(lambda: refresh_group_recommendations(group_pks))
+
+
+@contextmanager
+def batch_refresh():
+    """
+    Collects the refreshes scheduled inside the block and runs each affected
+    group's once on exit.
+    """
+    if getattr(_batch, "groups", None) is not None:
+        yield  # Already batching further up
+        return
+    _batch.groups = set()
+    try:
+        yield
+    finally:
+        group_pks, _batch.groups = _batch.groups, None
+        if group_pks:
+            transaction.on_commit(lambda: refresh_group_recommendations(group_pks))
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, F, Max, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Least
 import jsonfield
 # from django.contrib.auth.models import AbstractUser  # Optional, for auth
 
@@ -21,12 +23,58 @@ class SubGroup(models.Model):
     event = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Aggregates over the members, kept up to date by signals on User
+    member_count = models.IntegerField(default=0)
+    min_age = models.IntegerField(null=True, blank=True)
+    max_age = models.IntegerField(null=True, blank=True)
+    min_budget = models.FloatField(null=True, blank=True)
+    max_budget = models.FloatField(null=True, blank=True)
+
     class Meta:
         unique_together = ("group", "subgroup_id")
+        indexes = [models.Index(fields=["group", "member_count"], name="subgroup_open_idx")]
 
     def __str__(self):
         return f"{self.name} (Group: {self.group.name})"
 
+    @classmethod
+    def add_member(cls, subgroup_pk, age, budget, only_if=None):
+        """
+        Fold one joining member into the aggregates with a single UPDATE.
+        With `only_if` (a Q), the UPDATE only applies while the subgroup still
+        matches it, which makes it a race-free seat claim. Returns whether the
+        member was added.
+        """
+        subgroups = cls.objects.filter(pk=subgroup_pk)
+        if only_if is not None:
+            subgroups = subgroups.filter(only_if)
+        return bool(subgroups.update(
+            member_count=F("member_count") + 1,
+            min_age=Coalesce(Least("min_age", Value(age)), Value(age)),
+            max_age=Coalesce(Greatest("max_age", Value(age)), Value(age)),
+            min_budget=Coalesce(Least("min_budget", Value(budget)), Value(budget)),
+            max_budget=Coalesce(Greatest("max_budget", Value(budget)), Value(budget)),
+        ))
+
+    @classmethod
+    def refresh_aggregates(cls, subgroup_pks):
+        """
+        Recompute the aggregates from the current members. Used when a member
+        leaves or changes, since a min/max can't be un-folded.
+        """
+        members = User.objects.filter(subgroup=OuterRef("pk")).order_by().values("subgroup")
+
+        def member_agg(agg):
+            return Subquery(members.annotate(value=agg).values("value")[:1])
+
+        cls.objects.filter(pk__in=subgroup_pks).update(
+            member_count=Coalesce(member_agg(Count("pk")), 0),
+            min_age=member_agg(Min("age")),
+            max_age=member_agg(Max("age")),
+            min_budget=member_agg(Min("budget")),
+            max_budget=member_agg(Max("budget")),
+        )
+
 class User(models.Model):
     name = models.CharField(max_length=100)
     user_id = models.CharField(unique=True)
@@ -40,10 +88,30 @@ class User(models.Model):
     group = models.ForeignKey(Group, on_delete=models.SET_NULL, null=True, blank=True, related_name='users')
     subgroup = models.ForeignKey(SubGroup, on_delete=models.SET_NULL, null=True, blank=True, related_name='users')
     interests = models.ManyToManyField(Interest, related_name='users')
+    model_version = models.CharField(max_length=64, blank=True, default='')  # clustering model that assigned the group
+
+    class Meta:
+        # Filters of the users list, each followed by its cursor ordering
+        indexes = [
+            models.Index(fields=["group", "id"], name="user_group_id_idx"),
+            models.Index(fields=["city", "id"], name="user_city_id_idx"),
+            models.Index(fields=["age_range", "id"], name="user_age_range_id_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+def normalize_tag(tag):
+    return str(tag).strip().lower()
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=100, unique=True)  # normalized, see normalize_tag
+
+    def __str__(self):
+        return self.name
+
+
 class Event(models.Model):
     event_id = models.IntegerField(unique=True)
     event_name = models.CharField(max_length=255)
@@ -52,6 +120,104 @@ class Event(models.Model):
     ticket_price = models.FloatField()
     venue_id = models.IntegerField()
     tags = jsonfield.JSONField()  # Stores tags as a list
+    # Deduplicated, lowercased copy of `tags` for DB-side lookups
+    tag_set = models.ManyToManyField(Tag, through='EventTag', related_name='events', blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["event_date", "location"], name="event_date_location_idx"),
+            models.Index(fields=["location", "event_date"], name="event_location_date_idx"),
+            models.Index(fields=["ticket_price"], name="event_price_idx"),
+        ]
 
     def __str__(self):
         return self.event_name
+
+    def sync_tag_index(self):
+        """
+        Point tag_set at this event's current tags, creating missing Tags.
+        """
+        names = {normalize_tag(tag) for tag in self.tags or []} - {""}
+        Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+        self.tag_set.set(Tag.objects.filter(name__in=names))
+
+
+class EventTag(models.Model):
+    """
+    Event <-> Tag link, the through table of Event.tag_set. Also serves as the
+    inverted tag index: kept in sync by signals so events can be looked up by
+    tag without scanning them.
+    """
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='event_links')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='tag_index')
+
+    class Meta:
+        unique_together = ("event", "tag")
+
+    def __str__(self):
+        return f"{self.tag_id} -> {self.event_id}"
+
+
+class GroupEventRecommendation(models.Model):
+    """
+    The events recommended to a group, in order: the first events (by pk)
+    carrying any tag word of the group name. Refreshed for the affected
+    groups when events or group names change, so reads are one index lookup.
+    """
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='event_recommendations')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='group_recommendations')
+    rank = models.IntegerField()
+
+    class Meta:
+        unique_together = ("group", "rank")
+        ordering = ["group", "rank"]
+
+    def __str__(self):
+        return f"{self.group_id} #{self.rank}: {self.event_id}"
+
+
+class ResourceVersion(models.Model):
+    """
+    Version stamp of a list endpoint's data ("interests", "groups",
+    "subgroups", "events"), bumped on every write to it. Conditional GETs
+    compare against it instead of rendering the list. Derived state uses
+    stamps too ("recommendations", and "live-index", which numbers the
+    LiveIndexChange log).
+    """
+    resource = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.resource} v{self.version}"
+
+
+class IdSequence(models.Model):
+    """
+    Next unreserved value of a named ID sequence ("user_id"). Workers
+    reserve blocks of values from it and hand them out from memory, see
+    ids.py.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name} @ {self.next_value}"
+
+
+class LiveIndexChange(models.Model):
+    """
+    Edits the live index can't catch up on by pk, one per bump of the
+    "live-index" ResourceVersion (`version`): an existing user's group or
+    interests changed, or the user was deleted (`user_pk`), or an interest
+    was renamed, deleted or unlinked (`interest_pk`). Workers replay the
+    changes above the version their index has seen, see live_index.py.
+    """
+    version = models.BigIntegerField(unique=True)
+    # Plain ids: the rows may be gone by the time the change is replayed
+    user_pk = models.BigIntegerField(null=True)
+    interest_pk = models.BigIntegerField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"v{self.version}: user {self.user_pk} interest {self.interest_pk}"
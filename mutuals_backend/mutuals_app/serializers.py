@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer, PrimaryKeyRelatedField, SlugRelatedField
 from .models import User, Interest, Group, SubGroup, Event
+from .fieldsets import SparseFieldsMixin
 
 class InterestSerializer(ModelSerializer):
     class Meta:
@@ -13,14 +14,14 @@ class GroupSerializer(ModelSerializer):
         fields = ['id', 'group_id', 'name', 'created_at']
 
 
-class SubGroupSerializer(ModelSerializer):
+class SubGroupSerializer(SparseFieldsMixin, ModelSerializer):
     group = GroupSerializer(read_only=True)
     class Meta:
         model = SubGroup
         fields = ['id', 'subgroup_id', 'name', 'event', 'group', 'created_at']
 
 
-class UserSerializer(ModelSerializer):
+class UserSerializer(SparseFieldsMixin, ModelSerializer):
     interests = InterestSerializer(many=True, read_only=True)
     interest_ids = PrimaryKeyRelatedField(
         queryset=Interest.objects.all(), many=True, write_only=True, source='interests'
@@ -74,7 +75,22 @@ class UserSerializer(ModelSerializer):
             instance.interests.set(interests)
         return instance
 
-class EventSerializer(ModelSerializer):
+class UserBatchSerializer(ModelSerializer):
+    """
+    Validates the plain columns of a batch signup. Group and interests are
+    resolved in bulk by the view, and user IDs are allocated once the whole
+    batch is valid.
+    """
+    class Meta:
+        model = User
+        fields = ['name', 'gender', 'dob', 'city', 'occupation', 'budget', 'age', 'age_range']
+
+EVENT_DESCRIPTION = (
+    "Join us for the biggest tech conference of the year featuring keynotes from "
+    "industry leaders, hands-on workshops, and networking opportunities with fellow tech enthusiasts."
+)
+
+class EventSerializer(SparseFieldsMixin, ModelSerializer):
     id = serializers.SerializerMethodField()
     name = serializers.CharField(source='event_name')
     location = serializers.CharField()
@@ -83,6 +99,8 @@ class EventSerializer(ModelSerializer):
     tags = serializers.ListField()
     description = serializers.SerializerMethodField()
 
+    sparse_sources = {'id': ['event_id'], 'description': []}
+
     class Meta:
         model = Event
         fields = ['id', 'name', 'location', 'ticketPrice', 'date', 'tags', 'description']
@@ -91,8 +109,5 @@ class EventSerializer(ModelSerializer):
         return f"event_{obj.event_id}"
 
     def get_description(self, obj):
-        return (
-            "Join us for the biggest tech conference of the year featuring keynotes from "
-            "industry leaders, hands-on workshops, and networking opportunities with fellow tech enthusiasts."
-        )
+        return EVENT_DESCRIPTION
         
\ No newline at end of file
@@ -0,0 +1,294 @@
+import threading
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from .ml_models.live_index import loaded_live_index, record_change
+from .ml_models.models import warm_up
+from .ml_models.recommendations import groups_for_tags, schedule_refresh
+from .cache import invalidate_all_user_details, invalidate_user_details
+from .conditional import bump_versions
+from .models import Event, Group, GroupEventRecommendation, Interest, SubGroup, User
+
+
+@receiver(request_started)
+def warm_up_on_first_request(sender, **kwargs):
+    # Load the clustering model in the background once the server takes
+    # traffic, rather than at import, when the database may not be ready
+    request_started.disconnect(warm_up_on_first_request)
+    if getattr(settings, "CLUSTER_MODEL_WARMUP", True):
+        threading.Thread(target=warm_up, daemon=True).start()
+
+
+def _update_live_index(update, user_pk=None, interest_pk=None):
+    """
+    Apply `update(index)` to this process's live index once the surrounding
+    transaction commits.
+
+    Changes to an existing user (`user_pk`) or interest (`interest_pk`) are
+    also logged under a new live index stamp, which this index moves on to
+    as it applies them; the other workers, and a snapshot restored later,
+    replay them from the log. New users reach them through refresh().
+    """
+    version = None
+    if user_pk is not None or interest_pk is not None:
+        version = record_change(user_pk=user_pk, interest_pk=interest_pk)
+
+    def apply():
+        index = loaded_live_index()
+        if index is None:
+            return
+        if version is None:
+            update(index)
+        else:
+            index.apply_change(version, update)
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    if update_fields is not None and not {"group", "group_id"} & update_fields:
+        return
+    group_pk = instance.group_id
+    if not created and group_pk == instance._live_group:
+        return
+    instance._live_group = group_pk
+    if created:
+        # Its interests are added with it, and other workers read both by
+        # pk; later edits of the same instance are logged as usual
+        instance._live_created = True
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: instance.__dict__.pop("_live_created", None))
+        if loaded_live_index() is None:
+            return  # New pks are caught up from the snapshot's watermark
+        _update_live_index(lambda index: index.set_group(instance.pk, group_pk))
+    else:
+        _update_live_index(lambda index: index.set_group(instance.pk, group_pk), user_pk=instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    _update_live_index(lambda index: index.remove_user(instance.pk), user_pk=instance.pk)
+
+
+@receiver(m2m_changed, sender=User.interests.through)
+def user_interests_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    pk_set = set(pk_set or ())
+
+    def update(index):
+        if not reverse:
+            if action == "post_add":
+                index.add_interests(instance.pk, pk_set)
+            elif action == "post_remove":
+                index.remove_interests(instance.pk, pk_set)
+            else:
+                index.clear_interests(instance.pk)
+        elif action == "post_clear":
+            index.clear_interest(instance.pk)
+        else:
+            # interest.users.add/remove(...): instance is the Interest
+            for user_pk in pk_set:
+                if action == "post_add":
+                    index.add_interests(user_pk, [instance.pk])
+                else:
+                    index.remove_interests(user_pk, [instance.pk])
+
+    if reverse:
+        _update_live_index(update, interest_pk=instance.pk)
+    elif instance.__dict__.pop("_live_created", False):
+        # Adding the interests of a user just created here isn't an edit
+        _update_live_index(update)
+    else:
+        _update_live_index(update, user_pk=instance.pk)
+
+
+@receiver(post_save, sender=Interest)
+def interest_saved(sender, instance, created, **kwargs):
+    if not created:
+        _update_live_index(lambda index: index.rename_interest(instance.pk, instance.name), interest_pk=instance.pk)
+
+
+@receiver(post_delete, sender=Interest)
+def interest_deleted(sender, instance, **kwargs):
+    _update_live_index(lambda index: index.remove_interest(instance.pk), interest_pk=instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    index = loaded_live_index()
+    if index is not None:
+        transaction.on_commit(index.load_groups)
+
+
+# ----------------------
+# Subgroup aggregates
+# ----------------------
+
+_UNLOADED = object()
+
+
+def _subgroup_state(instance):
+    # Read from __dict__ so deferred fields aren't loaded just to be remembered
+    return tuple(instance.__dict__.get(f) for f in ("subgroup_id", "age", "budget"))
+
+
+@receiver(post_init, sender=User)
+def user_loaded(sender, instance, **kwargs):
+    instance._subgroup_state = _subgroup_state(instance)
+    # Unknown if deferred, so a save counts as a move
+    instance._live_group = instance.__dict__.get("group_id", _UNLOADED)
+
+
+@receiver(post_save, sender=User)
+def user_subgroup_saved(sender, instance, created, **kwargs):
+    old_subgroup, old_age, old_budget = (None, None, None) if created else instance._subgroup_state
+    state = _subgroup_state(instance)
+    subgroup, age, budget = state
+    instance._subgroup_state = state
+    instance._previous_subgroup_id = old_subgroup
+    # assign_user_to_subgroup counts the seat itself when it claims it
+    claimed = instance.__dict__.pop("_claimed_subgroup", None)
+
+    if subgroup != old_subgroup:
+        if old_subgroup is not None:
+            SubGroup.refresh_aggregates([old_subgroup])
+        if subgroup is not None and subgroup != claimed:
+            SubGroup.add_member(subgroup, age, budget)
+    elif subgroup is not None and (age, budget) != (old_age, old_budget):
+        SubGroup.refresh_aggregates([subgroup])
+
+
+@receiver(post_delete, sender=User)
+def user_left_subgroup(sender, instance, **kwargs):
+    if instance.subgroup_id is not None:
+        SubGroup.refresh_aggregates([instance.subgroup_id])
+
+
+# ----------------------
+# Event tag index
+# ----------------------
+
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, **kwargs):
+    # Deletes cascade to the EventTag rows
+    instance.sync_tag_index()
+
+
+# ----------------------
+# Group event recommendations
+# ----------------------
+
+def _listing_groups(event):
+    return set(GroupEventRecommendation.objects.filter(event=event).values_list('group_id', flat=True))
+
+
+@receiver(post_save, sender=Event)
+def event_saved_recommendations(sender, instance, **kwargs):
+    # Groups it may now belong to, plus the ones listing it under its old tags
+    schedule_refresh(groups_for_tags(instance.tags) | _listing_groups(instance))
+
+
+@receiver(pre_delete, sender=Event)
+def event_deleting(sender, instance, **kwargs):
+    instance._listing_groups = _listing_groups(instance)
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted(sender, instance, **kwargs):
+    # The cascade removed its rows; the lists it was on can take the next event
+    schedule_refresh(getattr(instance, '_listing_groups', ()))
+
+
+@receiver(post_save, sender=Group)
+def group_saved_recommendations(sender, instance, **kwargs):
+    schedule_refresh([instance.pk])
+
+
+# ----------------------
+# Cached user details
+# ----------------------
+
+def _invalidate_members(user_ids, subgroup_pks):
+    """
+    After commit, drop the cached details of these users and of everyone in
+    these subgroups (whose member lists show them).
+    """
+    def invalidate():
+        subgroup_pks.discard(None)
+        members = set(user_ids)
+        if subgroup_pks:
+            members.update(User.objects.filter(subgroup__in=subgroup_pks).values_list('user_id', flat=True))
+        invalidate_user_details(members)
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=User)
+def user_saved_details(sender, instance, created, **kwargs):
+    if created and instance.subgroup_id is None:
+        return
+    _invalidate_members([instance.user_id], {instance.subgroup_id, getattr(instance, '_previous_subgroup_id', None)})
+
+
+@receiver(post_delete, sender=User)
+def user_deleted_details(sender, instance, **kwargs):
+    _invalidate_members([instance.user_id], {instance.subgroup_id})
+
+
+@receiver(m2m_changed, sender=User.interests.through)
+def user_interests_changed_details(sender, instance, action, reverse, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        transaction.on_commit(invalidate_all_user_details)
+    else:
+        _invalidate_members([instance.user_id], set())
+
+
+@receiver(post_save, sender=SubGroup)
+def subgroup_saved_details(sender, instance, created, **kwargs):
+    if not created:
+        _invalidate_members([], {instance.pk})
+
+
+@receiver(post_delete, sender=SubGroup)
+@receiver(post_save, sender=Interest)
+@receiver(post_delete, sender=Interest)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def renamed_for_many_users(sender, instance, **kwargs):
+    # Renamed or removed, and shown in the details of many users: drop them all
+    if not kwargs.get('created'):
+        transaction.on_commit(invalidate_all_user_details)
+
+
+# ----------------------
+# List version stamps (conditional GET)
+# ----------------------
+
+@receiver(post_save, sender=Interest)
+@receiver(post_delete, sender=Interest)
+def interests_changed_version(sender, **kwargs):
+    bump_versions('interests')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def groups_changed_version(sender, **kwargs):
+    bump_versions('groups')
+
+
+@receiver(post_save, sender=SubGroup)
+@receiver(post_delete, sender=SubGroup)
+def subgroups_changed_version(sender, **kwargs):
+    bump_versions('subgroups')
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def events_changed_version(sender, **kwargs):
+    bump_versions('events')
@@ -0,0 +1,48 @@
+import datetime
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from mutuals_app.ml_models import live_index
+from mutuals_app.ml_models.models import assignment_cache
+from mutuals_app.models import User
+
+
+class MutualsTestCase(TestCase):
+    """
+    Keeps the process-wide state the app builds up (live index, caches)
+    from leaking between tests, and the live index snapshot out of the repo.
+    """
+
+    def setUp(self):
+        super().setUp()
+        snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, snapshot_dir, ignore_errors=True)
+        settings = override_settings(
+            CLUSTER_LIVE_INDEX_PATH=f"{snapshot_dir}/live_index.npz",
+            CLUSTER_MODEL_WARMUP=False,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        live_index._live_index = None
+        self.addCleanup(setattr, live_index, "_live_index", None)
+        assignment_cache.clear()
+        for alias in ("default", "responses"):
+            caches[alias].clear()
+
+
+def create_user(n, group=None, interests=(), age=30, budget=2000, **fields):
+    """
+    Saves a user through the ORM, so its signals run as for a signup.
+    """
+    user = User.objects.create(**{
+        "name": f"User {n}", "user_id": f"U{n:04d}", "dob": datetime.date(2025 - age, 1, 1), "gender": "F",
+        "city": "Pune", "occupation": "Engineer", "budget": budget, "age": age, "age_range": "", "group": group,
+        **fields,
+    })
+    if interests:
+        user.interests.set(interests)
+    return user
@@ -0,0 +1,47 @@
+import datetime
+
+from mutuals_app.ml_models.models import assign_user_to_subgroup
+from mutuals_app.models import Event, Group, Interest, SubGroup
+
+from .base import MutualsTestCase, create_user
+
+
+class AsyncViewTests(MutualsTestCase):
+    def setUp(self):
+        super().setUp()
+        group = Group.objects.create(group_id=1, name="Music")
+        self.user = create_user(1, group, [Interest.objects.create(name="Music")], name="Zoë")
+        assign_user_to_subgroup(self.user, SubGroup, group)
+        Event.objects.create(
+            event_id=1, event_name="Fête", event_date=datetime.date(2026, 2, 1), location="Pune",
+            ticket_price=99.5, venue_id=1, tags=["Music"],
+        )
+
+    def assertSameResponse(self, sync, asynchronous):
+        self.assertEqual(asynchronous.status_code, sync.status_code)
+        self.assertEqual(asynchronous["Content-Type"], sync["Content-Type"])
+        self.assertEqual(asynchronous.content, sync.content)
+
+    def test_reads_match_the_drf_views(self):
+        for path in (f"user-detail/{self.user.user_id}/", "user-detail/nobody/", f"events/user/{self.user.user_id}/",
+                     f"events/user/{self.user.user_id}/?limit=0"):
+            with self.subTest(path=path):
+                sync = self.client.get(f"/api/{path}")
+                # The second read of each is served from the cache
+                for _ in range(2):
+                    self.assertSameResponse(sync, self.client.get(f"/api/async/{path}"))
+
+    def test_login_matches_the_drf_view(self):
+        for body in ({"user_id": self.user.user_id}, {"user_id": "nobody"}):
+            with self.subTest(body=body):
+                self.assertSameResponse(
+                    self.client.post("/api/login/", body, content_type="application/json"),
+                    self.client.post("/api/async/login/", body, content_type="application/json"),
+                )
+
+    def test_signup_rejects_malformed_input_like_the_drf_view(self):
+        for body in ({"name": "No dob"}, {"dob": "garbage"}, {"dob": "1990-01-01", "interests": 5}):
+            with self.subTest(body=body):
+                sync = self.client.post("/api/users/", body, content_type="application/json")
+                self.assertEqual(sync.status_code, 400)
+                self.assertSameResponse(sync, self.client.post("/api/async/users/", body, content_type="application/json"))
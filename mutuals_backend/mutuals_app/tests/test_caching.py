@@ -0,0 +1,111 @@
+import tempfile
+
+from django.test import override_settings
+
+from mutuals_app.cache import check_user_detail_cache, set_user_detail, user_detail_key
+from mutuals_app.ml_models.models import assign_user_to_subgroup
+from mutuals_app.models import Group, Interest, SubGroup
+
+from .base import MutualsTestCase, create_user
+
+
+class ConditionalGetTests(MutualsTestCase):
+    url = "/api/interests/"
+
+    def test_current_etag_gets_304(self):
+        Interest.objects.create(name="Music")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.client.post(self.url, {"name": "Sports"}, content_type="application/json")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([i["name"] for i in response.json()], ["Sports"])
+
+    def test_etag_varies_with_the_query_string(self):
+        self.assertNotEqual(self.client.get(self.url)["ETag"], self.client.get(self.url + "?format=json")["ETag"])
+
+    def test_group_writes_change_the_subgroups_etag(self):
+        etag = self.client.get("/api/subgroups/")["ETag"]
+        Group.objects.create(group_id=1, name="Music")
+        self.assertEqual(self.client.get("/api/subgroups/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ResponseCacheTests(MutualsTestCase):
+    url = "/api/groups/"
+
+    def test_cached_until_a_write(self):
+        Group.objects.create(group_id=1, name="Music")
+        first = self.client.get(self.url)
+        with self.assertNumQueries(1):  # the version stamp only
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.content, first.content)
+
+        Group.objects.create(group_id=2, name="Sports")
+        self.assertEqual([g["name"] for g in self.client.get(self.url).json()], ["Music", "Sports"])
+
+
+class UserDetailCacheTests(MutualsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.group = Group.objects.create(group_id=1, name="Music")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = create_user(1, self.group)
+            assign_user_to_subgroup(self.user, SubGroup, self.group)
+        self.url = f"/api/user-detail/{self.user.user_id}/"
+
+    def test_detail_is_cached(self):
+        first = self.client.get(self.url).json()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).json(), first)
+
+    def test_edits_invalidate_the_detail(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.refresh_from_db()
+            self.user.name = "Renamed"
+            self.user.save()
+        self.assertEqual(self.client.get(self.url).json()["name"], "Renamed")
+
+    def test_new_subgroup_member_invalidates_the_others(self):
+        before = self.client.get(self.url).json()
+        with self.captureOnCommitCallbacks(execute=True):
+            other = create_user(2, self.group)
+            assign_user_to_subgroup(other, SubGroup, self.group)
+
+        after = self.client.get(self.url).json()
+        self.assertNotEqual(after, before)
+        self.assertIn(other.name, str(after))
+
+    def test_interest_changes_invalidate_the_detail(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.interests.add(Interest.objects.create(name="Cooking"))
+        self.assertIn("Cooking", str(self.client.get(self.url).json()))
+
+    def test_payload_read_before_an_edit_is_not_served_after_it(self):
+        # A request loads the user, then an edit commits before it stores them
+        key = user_detail_key(self.user.user_id)
+        stale = self.client.get(self.url).json()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.refresh_from_db()
+            self.user.name = "Renamed"
+            self.user.save()
+        set_user_detail(key, stale)
+        self.assertEqual(self.client.get(self.url).json()["name"], "Renamed")
+
+    def test_per_process_cache_is_reported(self):
+        self.assertEqual([w.id for w in check_user_detail_cache(None)], ["mutuals_app.W001"])
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location},
+        }):
+            self.assertEqual(check_user_detail_cache(None), [])
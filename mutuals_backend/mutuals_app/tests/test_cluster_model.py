@@ -0,0 +1,86 @@
+import os
+import pickle
+from collections import Counter
+from unittest import mock
+
+import networkx as nx
+from django.db import OperationalError
+from django.test import SimpleTestCase
+
+from mutuals_app.ml_models import models as ml_models
+from mutuals_app.ml_models.models import MODEL_PATH, InterestIndex, ModelRegistry
+
+
+def pickle_neighbours(graph, partition, interests, top_n=3):
+    # The original assign_new_user_to_cluster: project the bipartite graph
+    # with the new user added and take its heaviest neighbours
+    graph = graph.copy()
+    graph.add_node("new-user", bipartite=0)
+    for interest in interests:
+        if graph.has_node(interest):
+            graph.add_edge("new-user", interest)
+    projected = nx.bipartite.weighted_projected_graph(graph, list(partition.keys()) + ["new-user"])
+    neighbours = {n: projected["new-user"][n].get("weight", 0) for n in projected["new-user"]}
+    return sorted(neighbours.items(), key=lambda x: x[1], reverse=True)[:top_n]
+
+
+class InterestIndexTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with open(os.path.join(MODEL_PATH, "leiden_partition.pkl"), "rb") as f:
+            cls.partition = pickle.load(f)
+        with open(os.path.join(MODEL_PATH, "bipartite_graph.pkl"), "rb") as f:
+            cls.graph = pickle.load(f)
+        cls.index = InterestIndex.load()
+
+    def interest_sets(self):
+        # Each one is a full projection of the pickled graph, so keep it short
+        interests = list(self.index.interests)
+        return [
+            [interests[0]],
+            interests[3:5],
+            interests[7:10],
+            [interests[12], "Not an interest"],
+            [],
+        ]
+
+    def test_npz_neighbours_match_pickle_projection(self):
+        for interests in self.interest_sets():
+            with self.subTest(interests=interests):
+                expected = pickle_neighbours(self.graph, self.partition, interests)
+                neighbours, rows = self.index.neighbours(interests)
+                self.assertEqual(neighbours, expected)
+
+                assignment = self.index.cluster_for_rows(rows)
+                if expected:
+                    clusters = [self.partition[user] for user, _ in expected]
+                    self.assertEqual(assignment["cluster"], Counter(clusters).most_common(1)[0][0])
+                else:
+                    self.assertIsNone(assignment["cluster"])
+
+    def test_batch_scores_match_single_scoring(self):
+        sets = self.interest_sets()
+        scores = self.index.batch_scores(sets)
+        for interests, row_scores in zip(sets, scores):
+            with self.subTest(interests=interests):
+                _, rows = self.index.neighbours(interests)
+                self.assertEqual(self.index.top_neighbours(row_scores, 3).tolist(), rows.tolist())
+
+
+class ModelLoadingTests(SimpleTestCase):
+    def test_warm_up_logs_database_errors(self):
+        with mock.patch.object(ml_models, "get_assignment_index", side_effect=OperationalError("no such table")), \
+                self.assertLogs(ml_models.logger, "ERROR") as logs:
+            ml_models.warm_up()
+        self.assertIn("warm-up failed", logs.output[0])
+
+    def test_failed_reload_keeps_current_model(self):
+        registry = ModelRegistry()
+        current = registry.get()
+        registry._lock.acquire()
+        with mock.patch.object(registry, "_artifact_stamp", side_effect=OSError("gone")), \
+                self.assertLogs(ml_models.logger, "ERROR") as logs:
+            registry._reload_if_changed()
+        self.assertIs(registry.get(), current)
+        self.assertIn(current.version, logs.output[0])
@@ -0,0 +1,195 @@
+import datetime
+from functools import partial
+
+from django.test import RequestFactory
+from django.utils.timezone import localdate
+
+from mutuals_app.models import Event, EventTag, Group, GroupEventRecommendation
+from mutuals_app.views import group_events_key
+
+from .base import MutualsTestCase, create_user
+
+
+class EventTestCase(MutualsTestCase):
+    def create_event(self, n, tags):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Event.objects.create(
+                event_id=n, event_name=f"Event {n}", event_date=datetime.date(2026, 1, n), location="Pune",
+                ticket_price=500, venue_id=1, tags=tags,
+            )
+
+    def recommended(self, group):
+        return list(GroupEventRecommendation.objects.filter(group=group).values_list("event__event_id", flat=True))
+
+
+class TagIndexTests(EventTestCase):
+    def indexed_tags(self, event):
+        return set(EventTag.objects.filter(event=event).values_list("tag__name", flat=True))
+
+    def test_tags_are_indexed_normalized(self):
+        event = self.create_event(1, ["Music", " music ", "Sports", ""])
+        self.assertEqual(self.indexed_tags(event), {"music", "sports"})
+
+    def test_index_follows_edits_and_deletes(self):
+        event = self.create_event(1, ["Music", "Sports"])
+        event.tags = ["Art"]
+        event.save()
+        self.assertEqual(self.indexed_tags(event), {"art"})
+
+        event.delete()
+        self.assertFalse(EventTag.objects.exists())
+
+
+class RecommendationRefreshTests(EventTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group = Group.objects.create(group_id=1, name="Music and Sports")
+        self.user = create_user(1, self.group)
+
+    def test_new_events_are_recommended_in_catalogue_order(self):
+        self.create_event(2, ["Sports"])
+        self.create_event(1, ["Art"])
+        self.create_event(3, ["music"])
+        self.assertEqual(self.recommended(self.group), [2, 3])
+
+    def test_event_edits_and_deletes_refresh_the_list(self):
+        first = self.create_event(1, ["Music"])
+        second = self.create_event(2, ["Sports"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.tags = ["Art"]
+            first.save()
+        self.assertEqual(self.recommended(self.group), [2])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self.recommended(self.group), [])
+
+    def test_group_rename_refreshes_the_list(self):
+        self.create_event(1, ["Music"])
+        self.create_event(2, ["Art"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.name = "Art"
+            self.group.save()
+        self.assertEqual(self.recommended(self.group), [2])
+
+    def test_endpoint_reflects_edits(self):
+        event = self.create_event(1, ["Music"])
+        url = f"/api/events/user/{self.user.user_id}/"
+        self.assertEqual([e["name"] for e in self.client.get(url).json()], ["Event 1"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            event.tags = ["Art"]
+            event.save()
+        self.assertEqual(self.client.get(url).json(), [])
+
+
+class RankedEventTests(EventTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group = Group.objects.create(group_id=1, name="Music and Sports")
+        self.user = create_user(1, self.group, budget=2000)
+        self.today = localdate()
+        # Scores (tags x3 + budget + city + recency): 6, 4.5, 3.5, 4.5, 4
+        self.add_event(1, ["Music", "Sports"])
+        self.add_event(2, ["Music"])
+        self.add_event(3, ["Music"], location="Mumbai")
+        self.add_event(4, ["Music"])  # ties with 2, which has the lower pk
+        self.add_event(5, ["Art"])
+        self.add_event(6, ["Music"], ticket_price=4000)
+
+    def add_event(self, n, tags, location="Pune", ticket_price=500):
+        with self.captureOnCommitCallbacks(execute=True):
+            Event.objects.create(
+                event_id=n, event_name=f"Event {n}", event_date=self.today, location=location,
+                ticket_price=ticket_price, venue_id=1, tags=tags,
+            )
+
+    def get(self, query, user=None):
+        response = self.client.get(f"/api/events/user/{(user or self.user).user_id}/?{query}")
+        self.assertEqual(response.status_code, 200, response.content)
+        return [(event["id"], event.get("score")) for event in response.json()]
+
+    def test_events_are_ordered_by_score_then_pk(self):
+        self.assertEqual(self.get("mode=ranked&limit=10"), [
+            ("event_1", 6.0), ("event_2", 4.5), ("event_4", 4.5), ("event_6", 4.0), ("event_3", 3.5),
+        ])
+
+    def test_limit_and_offset_page_through_the_ranking(self):
+        self.assertEqual(self.get("mode=ranked"), [("event_1", 6.0), ("event_2", 4.5), ("event_4", 4.5)])
+        self.assertEqual(self.get("mode=ranked&limit=2&offset=2"), [("event_4", 4.5), ("event_6", 4.0)])
+        self.assertEqual(self.get("mode=ranked&offset=5"), [])
+        for query in ("mode=ranked&limit=0", "mode=ranked&offset=-1", "mode=ranked&limit=x"):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f"/api/events/user/{self.user.user_id}/?{query}").status_code, 400)
+
+    def test_each_mode_is_cached_separately(self):
+        default = self.get("limit=10")
+        self.assertEqual(default, [(f"event_{n}", None) for n in (1, 2, 3, 4, 6)])
+        self.assertEqual(len(self.get("mode=ranked&limit=10")), 5)
+        self.assertEqual(self.get("limit=10"), default)
+
+        # Ranked pages depend on the user's budget, catalogue ones only on the group
+        other = create_user(2, self.group, budget=4000)
+        self.assertEqual(self.get("limit=10", other), default)
+        self.assertEqual([score for _, score in self.get("mode=ranked&limit=10", other)], [6.0, 4.5, 4.5, 4.5, 3.5])
+        self.assertEqual([score for _, score in self.get("mode=ranked&limit=10")], [6.0, 4.5, 4.5, 4.0, 3.5])
+
+        request = RequestFactory().get("/")
+        key = partial(group_events_key, request, limit=10, offset=0)
+        self.assertNotEqual(key(self.user, ranked=True), key(self.user, ranked=False))
+        self.assertEqual(key(self.user, ranked=False), key(other, ranked=False))
+        self.assertNotEqual(key(self.user, ranked=True), key(other, ranked=True))
+        self.assertEqual(key(self.user, ranked=True), key(create_user(3, self.group, budget=2000), ranked=True))
+
+
+class EventFilterTests(EventTestCase):
+    def setUp(self):
+        super().setUp()
+        for n, tags, location, price in (
+            (1, ["Music"], "Pune", 300),
+            (2, ["Sports"], "Mumbai", 500),
+            (3, ["Music", "Art"], "Mumbai", 800),
+            (4, ["Art"], "Pune", 1200),
+        ):
+            event = self.create_event(n, tags)
+            event.location, event.ticket_price = location, price
+            event.save()
+
+    def get(self, query):
+        response = self.client.get(f"/api/events/?{query}")
+        self.assertEqual(response.status_code, 200, response.content)
+        return [event["id"] for event in response.json()]
+
+    def test_filters(self):
+        for query, expected in (
+            ("", [1, 2, 3, 4]),
+            ("tag=music", [1, 3]),
+            ("tag=Music&tag= art ", [1, 3, 4]),
+            ("tag=", [1, 2, 3, 4]),
+            ("city=Mumbai", [2, 3]),
+            ("city=Delhi", []),
+            ("from=2026-01-02", [2, 3, 4]),
+            ("to=2026-01-03", [1, 2, 3]),
+            ("from=2026-01-02&to=2026-01-02", [2]),
+            ("max_price=800", [1, 2, 3]),
+            ("max_price=299.99", []),
+            ("tag=music&city=Mumbai&from=2026-01-01&to=2026-01-31&max_price=1000", [3]),
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(self.get(query), [f"event_{n}" for n in expected])
+
+    def test_malformed_filters_are_rejected(self):
+        for query, param in (
+            ("from=2026-13-01", "from"),
+            ("to=01/02/2026", "to"),
+            ("from=yesterday&to=2026-01-02", "from"),
+            ("max_price=cheap", "max_price"),
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(f"/api/events/?{query}")
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(param, response.json()["error"])
@@ -0,0 +1,82 @@
+import csv
+import datetime
+import io
+import json
+
+from django.test import override_settings
+
+from mutuals_app.models import Event, Group, Interest
+
+from .base import MutualsTestCase, create_user
+
+NAMES = ['Zoë "Z", Smith', "Line\nbreak", "Plain"]
+
+
+# Small chunks, so the rows span several of them
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(MutualsTestCase):
+    def setUp(self):
+        super().setUp()
+        group = Group.objects.create(group_id=3, name="Music, Art")
+        interests = [Interest.objects.create(name=name) for name in ("Music", "Café culture")]
+        for n, name in enumerate(NAMES):
+            create_user(n, group if n else None, interests[:n], name=name, budget=1500 + n / 2)
+        Event.objects.create(
+            event_id=1, event_name="Fête", event_date=datetime.date(2026, 2, 1), location="Pune",
+            ticket_price=99.5, venue_id=1, tags=["Music", "Café culture"],
+        )
+
+    def check_headers(self, response, name, fmt, content_type):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], content_type)
+        self.assertEqual(response["Content-Disposition"], f'attachment; filename="{name}.{fmt}"')
+
+    def check_users_csv(self, body):
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0][:3], ["", "user_id", "name"])
+        self.assertEqual(len(rows), len(NAMES) + 1)
+        self.assertEqual([row[2] for row in rows[1:]], NAMES)
+        self.assertEqual([row[5] for row in rows[1:]], ["", "Music", "Music, Café culture"])
+        self.assertEqual([row[8] for row in rows[1:]], ["1500", "1500.5", "1501"])
+        self.assertEqual([row[12] for row in rows[1:]], ["", "Music, Art", "Music, Art"])
+
+    def test_users_csv(self):
+        response = self.client.get("/api/export/users/")
+        self.check_headers(response, "users", "csv", "text/csv; charset=utf-8")
+        self.assertFalse(response.is_async)
+        self.check_users_csv(b"".join(response.streaming_content).decode())
+
+    def test_users_ndjson(self):
+        response = self.client.get("/api/export/users/?format=ndjson")
+        self.check_headers(response, "users", "ndjson", "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), len(NAMES))
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row["name"] for row in rows], NAMES)
+        self.assertNotIn("", rows[0])
+        self.assertEqual(rows[2]["interests"], "Music, Café culture")
+
+    def test_events_and_groups(self):
+        rows = list(csv.reader(io.StringIO(b"".join(self.client.get("/api/export/events/").streaming_content).decode())))
+        self.assertEqual(rows[1], ["0", "1", "Fête", "2026-02-01", "Pune", "99.5", "1", "['Music', 'Café culture']"])
+
+        event = json.loads(b"".join(self.client.get("/api/export/events/?format=ndjson").streaming_content))
+        self.assertEqual(event["tags"], ["Music", "Café culture"])
+
+        rows = list(csv.reader(io.StringIO(b"".join(self.client.get("/api/export/groups/").streaming_content).decode())))
+        self.assertEqual(rows, [["group_id", "name"], ["3", "Music, Art"]])
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get("/api/export/users/?format=xml")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("format", response.json()["error"])
+
+    async def test_asgi_gets_an_async_stream(self):
+        response = await self.async_client.get("/api/export/users/")
+        self.check_headers(response, "users", "csv", "text/csv; charset=utf-8")
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        # Two lines per chunk: the header and a row, then the other two rows
+        self.assertEqual(len(chunks), 2)
+        self.check_users_csv(b"".join(chunks).decode())
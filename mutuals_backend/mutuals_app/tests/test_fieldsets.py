@@ -0,0 +1,66 @@
+import datetime
+
+from mutuals_app.ml_models.models import assign_user_to_subgroup
+from mutuals_app.models import Event, Group, Interest, SubGroup
+
+from .base import MutualsTestCase, create_user
+
+
+class FieldsetTests(MutualsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.group = Group.objects.create(group_id=1, name="Music")
+        self.interest = Interest.objects.create(name="Music")
+        self.user = create_user(1, self.group, [self.interest])
+        assign_user_to_subgroup(self.user, SubGroup, self.group)
+        Event.objects.create(
+            event_id=1, event_name="Fête", event_date=datetime.date(2026, 2, 1), location="Pune",
+            ticket_price=99.5, venue_id=1, tags=["Music"],
+        )
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_fields_limit_the_output(self):
+        user = self.get("/api/users/?fields=id,name")["results"][0]
+        self.assertEqual(user, {"id": self.user.pk, "name": self.user.name})
+
+        event = self.get("/api/events/?fields=id,name")[0]
+        self.assertEqual(event, {"id": "event_1", "name": "Fête"})
+
+    def test_related_objects_collapse_to_ids_unless_expanded(self):
+        user = self.get("/api/users/?fields=group")["results"][0]
+        self.assertEqual(user, {"group": self.group.pk})
+
+        user = self.get("/api/users/?fields=group,interests&expand=group")["results"][0]
+        self.assertEqual(user["group"]["name"], "Music")
+        self.assertEqual(user["interests"], [self.interest.pk])
+
+        subgroup = self.get("/api/subgroups/?fields=id,group")[0]
+        self.assertEqual(subgroup["group"], self.group.pk)
+
+    def test_expanded_output_matches_the_full_response(self):
+        full = self.get("/api/users/")["results"][0]
+        fields = ",".join(full)
+        sparse = self.get(f"/api/users/?fields={fields}&expand=group,subgroup,interests")["results"][0]
+        self.assertEqual(sparse, full)
+
+        detail = self.get(f"/api/users/{self.user.pk}/?fields=name,age")
+        self.assertEqual(detail, {"name": full["name"], "age": full["age"]})
+
+    def test_unknown_names_are_rejected(self):
+        for url in (
+            "/api/users/?fields=id,password",
+            "/api/users/?fields=interest_ids",
+            "/api/users/?fields=",
+            "/api/users/?expand=name",
+            "/api/subgroups/?expand=users",
+            "/api/events/?fields=price",
+            f"/api/users/{self.user.pk}/?fields=nope",
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
@@ -0,0 +1,61 @@
+import threading
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+
+from mutuals_app.ids import IdAllocator, format_user_id, new_user_ids
+from mutuals_app.models import IdSequence
+
+
+# Outside a transaction, so allocators hand out numbers from their blocks
+class IdAllocatorTests(TransactionTestCase):
+    def test_ids_are_unique_across_blocks_and_allocators(self):
+        first, second = IdAllocator("test", block_size=7), IdAllocator("test", block_size=7)
+        numbers = []
+        for count in (1, 3, 10, 2, 7):
+            numbers += first.allocate(count) + second.allocate(count)
+        self.assertEqual(len(numbers), len(set(numbers)))
+        self.assertGreater(IdSequence.objects.get(name="test").next_value, max(numbers))
+
+    def test_rolled_back_reservations_are_not_reused(self):
+        allocator = IdAllocator("test", block_size=5)
+        kept = allocator.allocate(2)
+        try:
+            with transaction.atomic():
+                inside = allocator.allocate(3)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertTrue(set(inside).isdisjoint(kept))
+        after = allocator.allocate(6)
+        self.assertEqual(len(set(kept + after)), 8)
+
+    def test_user_ids_are_formatted(self):
+        ids = new_user_ids(3)
+        self.assertEqual(len(set(ids)), 3)
+        self.assertTrue(all(user_id.startswith("M") and len(user_id) >= 9 for user_id in ids))
+        self.assertEqual(format_user_id(42), "M00000042")
+
+    def test_threads_get_distinct_ids(self):
+        allocator = IdAllocator("threads", block_size=4)
+        results, errors = [], []
+
+        def work():
+            # One allocator shared by the threads, as in a threaded worker
+            try:
+                for _ in range(25):
+                    results.extend(allocator.allocate(1))
+            except Exception as exc:  # reported below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 100)
+        self.assertEqual(len(set(results)), 100)
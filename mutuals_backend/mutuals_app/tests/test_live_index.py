@@ -0,0 +1,192 @@
+import glob
+
+from django.test import override_settings
+
+from mutuals_app.ml_models import live_index
+from mutuals_app.ml_models.live_index import (
+    LiveInterestIndex, live_index_path, live_index_stamp, prune_changes, snapshot_version,
+)
+from mutuals_app.ml_models.models import (
+    AssignmentCache, InterestIndex, assign_new_user_to_cluster, assignment_cache, model_registry,
+)
+from mutuals_app.models import Group, Interest, LiveIndexChange
+
+from .base import MutualsTestCase, create_user
+
+
+class LiveIndexTests(MutualsTestCase):
+    def setUp(self):
+        super().setUp()
+        names = InterestIndex.load().interests[:4]
+        self.interests = [Interest.objects.create(name=name) for name in names]
+        self.group = Group.objects.create(group_id=7, name="Group 7")
+
+    def create_user(self, n, interests):
+        return create_user(n, self.group, interests)
+
+    def interest_names(self, index, user):
+        row = index.rows[user.pk]
+        return {name for col, name in enumerate(index.interests) if index._members[row, col]}
+
+    def test_assignments_carry_the_artifact_model_version(self):
+        self.create_user(1, self.interests[:2])
+        index = LiveInterestIndex.build()
+        _, rows = index.neighbours([self.interests[0].name])
+
+        assignment = index.cluster_for_rows(rows)
+        self.assertEqual(assignment["cluster"], 7)
+        self.assertEqual(assignment["model_version"], model_registry.version)
+
+    @override_settings(CLUSTER_LIVE_INDEX_REFRESH_INTERVAL=0)
+    def test_edits_made_by_another_worker_are_replayed(self):
+        user = self.create_user(1, self.interests[:2])
+        gone = self.create_user(2, self.interests[2:])
+        renamed = self.interests[1]
+        index = LiveInterestIndex.build()
+
+        # This process has no index loaded, as if the edits came from another worker
+        with self.captureOnCommitCallbacks(execute=True):
+            user.interests.set(self.interests[1:2] + self.interests[3:])
+            gone.delete()
+            renamed.name = "Renamed"
+            renamed.save()
+
+        live_index._live_index, live_index._refreshed_at = index, 0.0
+        refreshed = live_index.get_live_index()
+        self.assertIs(refreshed, index)
+        self.assertEqual(index.stamp, live_index_stamp())
+        self.assertEqual(self.interest_names(index, user), {"Renamed", self.interests[3].name})
+        self.assertNotIn(gone.pk, index.rows)
+
+    def test_edits_made_here_move_the_stamp_on(self):
+        user = self.create_user(1, self.interests[:2])
+        index = live_index._live_index = LiveInterestIndex.build()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.interests.remove(self.interests[0])
+        self.assertEqual(index.stamp, live_index_stamp())
+        self.assertEqual(LiveIndexChange.objects.get(version=index.stamp).user_pk, user.pk)
+        self.assertEqual(self.interest_names(index, user), {self.interests[1].name})
+        self.assertTrue(index.catch_up())
+        self.assertEqual(self.interest_names(index, user), {self.interests[1].name})
+
+    def test_interests_added_at_creation_are_not_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = self.create_user(1, self.interests[:2])
+        self.assertFalse(LiveIndexChange.objects.exists())
+
+        # The same instance edited later is logged (a removal and an addition)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.interests.set(self.interests[2:])
+        self.assertEqual(list(LiveIndexChange.objects.values_list("user_pk", flat=True)), [user.pk, user.pk])
+
+    def test_index_behind_the_pruned_log_is_rebuilt(self):
+        user = self.create_user(1, self.interests[:2])
+        index = LiveInterestIndex.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            user.interests.set(self.interests[3:])
+
+        with override_settings(CLUSTER_LIVE_INDEX_CHANGE_RETENTION=-1):
+            prune_changes()
+        self.assertFalse(index.catch_up())
+
+        live_index._live_index, live_index._refreshed_at = index, 0.0
+        with override_settings(CLUSTER_LIVE_INDEX_REFRESH_INTERVAL=0):
+            rebuilt = live_index.get_live_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(self.interest_names(rebuilt, user), {self.interests[3].name})
+
+    def test_new_users_do_not_force_a_rebuild(self):
+        self.create_user(1, self.interests[:2])
+        index = LiveInterestIndex.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            user = self.create_user(2, self.interests[2:])
+
+        self.assertTrue(index.is_current())
+        index.refresh()
+        self.assertEqual(self.interest_names(index, user), {i.name for i in self.interests[2:]})
+
+    def test_older_snapshot_does_not_replace_newer(self):
+        path = live_index_path()
+        self.create_user(1, self.interests[:2])
+        older = LiveInterestIndex.build()
+        self.create_user(2, self.interests[2:])
+        newer = LiveInterestIndex.build()
+
+        newer.save(path)
+        older.save(path)
+        self.assertEqual(snapshot_version(path), (model_registry.version, newer.stamp, newer.watermark))
+        self.assertEqual(glob.glob(path + ".*.tmp"), [])
+
+        restored = LiveInterestIndex.restore(path)
+        self.assertEqual(set(restored.rows), set(newer.rows))
+
+
+class AssignmentCacheTests(MutualsTestCase):
+    def setUp(self):
+        super().setUp()
+        names = InterestIndex.load().interests[:4]
+        self.interests = [Interest.objects.create(name=name) for name in names]
+        self.group = Group.objects.create(group_id=7, name="Group 7")
+        self.user = create_user(1, self.group, self.interests[:2])
+
+    def test_hits_misses_and_lru_eviction(self):
+        cache = AssignmentCache(maxsize=2)
+        index = InterestIndex.load()
+        first, second, third = (cache.key(index, [name], 3) for name in index.interests[:3])
+        self.assertNotEqual(first, second)
+        # Same interest set in another order or with unknown names: same key
+        self.assertEqual(cache.key(index, index.interests[1::-1], 3), cache.key(index, index.interests[:2], 3))
+        self.assertEqual(cache.key(index, [index.interests[0], "Not an interest"], 3), first)
+
+        self.assertIsNone(cache.get(first))
+        cache.set(first, {"cluster": 1})
+        cache.set(second, {"cluster": 2})
+        self.assertEqual(cache.get(first), {"cluster": 1})  # now the most recently used
+
+        cache.set(third, {"cluster": 3})
+        self.assertIsNone(cache.get(second))
+        self.assertEqual(cache.get(first), {"cluster": 1})
+        self.assertEqual(cache.get(third), {"cluster": 3})
+
+        # Callers get copies, so they can't change the cached entry
+        cache.get(first)["cluster"] = 9
+        self.assertEqual(cache.get(first), {"cluster": 1})
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"], stats["maxsize"]), (5, 2, 2, 2))
+
+    def test_key_moves_on_with_the_model_and_the_live_index(self):
+        index = LiveInterestIndex.build()
+        key = AssignmentCache.key(index, [self.interests[0].name], 3)
+
+        # An edit logged by another worker, replayed here
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.interests.set(self.interests[2:])
+        self.assertTrue(index.catch_up())
+        edited = AssignmentCache.key(index, [self.interests[0].name], 3)
+        self.assertNotEqual(edited, key)
+
+        # A user created elsewhere, read by refresh()
+        create_user(2, self.group, self.interests[:1])
+        index.refresh()
+        created = AssignmentCache.key(index, [self.interests[0].name], 3)
+        self.assertNotIn(created, (key, edited))
+
+        index.model_version = "re-clustered"
+        self.assertNotIn(AssignmentCache.key(index, [self.interests[0].name], 3), (key, edited, created))
+
+    @override_settings(CLUSTER_LIVE_INDEX_REFRESH_INTERVAL=0)
+    def test_signups_miss_after_the_live_index_changes(self):
+        interests = [self.interests[0].name]
+        hits, misses = assignment_cache.hits, assignment_cache.misses
+        assignment = assign_new_user_to_cluster("new", interests)
+        self.assertEqual(assignment["cluster"], 7)
+        self.assertEqual(assign_new_user_to_cluster("new", interests), assignment)
+        self.assertEqual((assignment_cache.hits - hits, assignment_cache.misses - misses), (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.interests.set(self.interests[2:])
+        assignment = assign_new_user_to_cluster("new", interests)
+        self.assertEqual((assignment_cache.hits - hits, assignment_cache.misses - misses), (1, 2))
+        # Nobody in the group shares the interest any more
+        self.assertIsNone(assignment["cluster"])
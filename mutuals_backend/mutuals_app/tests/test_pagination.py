@@ -0,0 +1,64 @@
+from django.test import override_settings
+
+from mutuals_app.models import Group
+
+from .base import MutualsTestCase, create_user
+
+
+class UserCursorTests(MutualsTestCase):
+    def setUp(self):
+        super().setUp()
+        groups = [Group.objects.create(group_id=n, name=f"Group {n}") for n in (1, 2)]
+        self.users = [
+            create_user(n, groups[n % 2], city=("Pune", "Mumbai")[n % 3 == 0], age_range=("18-25", "26-35")[n % 4 == 0])
+            for n in range(23)
+        ]
+
+    def walk(self, query):
+        """
+        Follows the `next` links from the first page; returns the user pks in
+        the order served and the number of pages.
+        """
+        url, pks, pages = f"/api/users/?{query}", [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            body = response.json()
+            pks += [user["id"] for user in body["results"]]
+            url = body["next"]
+            pages += 1
+        return pks, pages
+
+    def test_next_links_walk_every_filtered_user_once(self):
+        for query, keep in (
+            ("", lambda user: True),
+            ("group_id=1", lambda user: user.group.group_id == 1),
+            ("city=Mumbai", lambda user: user.city == "Mumbai"),
+            ("age_range=26-35", lambda user: user.age_range == "26-35"),
+            ("group_id=2&city=Pune&age_range=18-25",
+             lambda user: (user.group.group_id, user.city, user.age_range) == (2, "Pune", "18-25")),
+        ):
+            expected = [user.pk for user in self.users if keep(user)]
+            for fast in (False, True):
+                with self.subTest(query=query, fast=fast), override_settings(FAST_SERIALIZATION=fast):
+                    pks, pages = self.walk(f"{query}&page_size=4")
+                    self.assertEqual(pks, expected)
+                    self.assertEqual(pages, max(-(-len(expected) // 4), 1))
+
+    def test_previous_link_returns_the_earlier_page(self):
+        first = self.client.get("/api/users/?group_id=1&page_size=3").json()
+        second = self.client.get(first["next"]).json()
+        self.assertIn("group_id=1", second["next"])
+        back = self.client.get(second["previous"]).json()
+        self.assertEqual([user["id"] for user in back["results"]], [user["id"] for user in first["results"]])
+
+    def test_bad_cursor_is_rejected(self):
+        for cursor in ("garbage", "bz14JnA9MQ=="):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f"/api/users/?cursor={cursor}")
+                self.assertEqual(response.status_code, 404)
+                self.assertIn("cursor", response.json()["detail"].lower())
+
+    def test_bad_group_id_is_rejected(self):
+        response = self.client.get("/api/users/?group_id=one")
+        self.assertEqual(response.status_code, 400)
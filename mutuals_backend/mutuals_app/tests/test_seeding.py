@@ -0,0 +1,102 @@
+import contextlib
+import io
+import os
+import tempfile
+
+import seed_data
+from mutuals_app.models import Group, Interest, SubGroup, User
+
+from .base import MutualsTestCase, create_user
+from .test_subgroups import SubgroupInvariantsMixin
+
+# clustered_mutuals.csv layout: U03 has an unknown interest, U04 an unreadable
+# dob, U05 is repeated within its chunk, U07 has no Cluster and U09 is
+# already in the database
+USERS_CSV = """\
+,user_id,name,gender,dob,interests,city,occupation,budget,age,age_range,Cluster,Cluster_tag
+0,U01,Ann,Female,1990-01-01,"Music, Sports",Pune,Engineer,2000,35,26-35,1,Music
+1,U02,Ben,Male,1991-02-01,Music,Pune,Engineer,2100,34,26-35,1,Music
+2,U03,"Cat, Jr.",Female,1960-03-01,"Music, Knitting",Mumbai,Teacher,6000,65,56-65,5,Group 5
+3,U04,Dan,Male,not a date,Music,Pune,Engineer,2000,35,26-35,1,Music
+4,U05,Eve,Female,1992-04-01,Sports,Pune,Engineer,2200,33,26-35,1,Music
+4,U05,Eve again,Female,1992-04-01,Music,Pune,Engineer,2200,33,26-35,1,Music
+5,U06,Fay,Female,1961-05-01,Sports,Mumbai,Teacher,6400,64,56-65,5,Group 5
+6,U07,Gus,Male,1993-06-01,,Delhi,Chef,1500,32,26-35,,
+7,U08,Hal,Male,1989-07-01,"Sports, Music",Pune,Engineer,2050,36,36-45,1,Music
+8,U09,Ivy,Female,1988-08-01,Music,Pune,Engineer,2000,37,36-45,1,Music
+"""
+
+
+class BulkSeedingTests(SubgroupInvariantsMixin, MutualsTestCase):
+    def setUp(self):
+        super().setUp()
+        for name in ("Music", "Sports"):
+            Interest.objects.create(name=name)
+        Group.objects.create(group_id=1, name="Music")
+        create_user(9, None, user_id="U09", name="Ivy (seeded)")
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        self.path = os.path.join(directory, "users.csv")
+        with open(self.path, "w") as f:
+            f.write(USERS_CSV)
+        self.addCleanup(os.remove, self.path)
+
+    def seed(self, **options):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            times = seed_data.load_users_bulk(self.path, chunk_size=3, **options)
+        self.assertIn("Created 7 users (1 already seeded, 2 invalid), 8 interest links", out.getvalue())
+        return times
+
+    def assertSeeded(self):
+        users = {user.user_id: user for user in User.objects.select_related("group").prefetch_related("interests")}
+        self.assertEqual(sorted(users), ["U01", "U02", "U03", "U05", "U06", "U07", "U08", "U09"])
+        self.assertEqual(users["U05"].name, "Eve")
+        self.assertEqual(users["U03"].name, "Cat, Jr.")
+        self.assertEqual(users["U09"].name, "Ivy (seeded)")
+
+        interests = {user_id: {i.name for i in user.interests.all()} for user_id, user in users.items()}
+        self.assertEqual(interests, {
+            "U01": {"Music", "Sports"}, "U02": {"Music"}, "U03": {"Music"}, "U05": {"Sports"},
+            "U06": {"Sports"}, "U07": set(), "U08": {"Music", "Sports"}, "U09": set(),
+        })
+        self.assertFalse(Interest.objects.filter(name="Knitting").exists())
+
+        # Cluster 5 had no group yet
+        self.assertEqual(Group.objects.get(group_id=5).name, "Group 5")
+        groups = {user_id: user.group.group_id if user.group else None for user_id, user in users.items()}
+        self.assertEqual(groups, {
+            "U01": 1, "U02": 1, "U03": 5, "U05": 1, "U06": 5, "U07": None, "U08": 1, "U09": None,
+        })
+        self.assertEqual(users["U01"].budget, 2000.0)
+        self.assertEqual(str(users["U01"].dob), "1990-01-01")
+
+        # Every grouped user is packed, and nobody else
+        self.assertFalse(User.objects.filter(group__isnull=False, subgroup__isnull=True).exists())
+        self.assertFalse(User.objects.filter(group__isnull=True, subgroup__isnull=False).exists())
+        self.assertEqual(SubGroup.objects.filter(group__group_id=5).count(), 1)
+        self.assertSubgroupInvariants(User.objects.filter(group__isnull=False))
+
+    def test_chunked_load(self):
+        times = self.seed(workers=0)
+        self.assertSeeded()
+        self.assertTrue({"lookups", "parse", "prepare", "insert", "subgroups"} <= times.times.keys())
+
+    def test_process_pool_load(self):
+        times = self.seed(workers=2, read_ahead=1)
+        self.assertSeeded()
+        self.assertIn("wait", times.times)
+
+    def test_packing_is_bounded_by_the_chunk_size(self):
+        self.seed(workers=0)
+        # Group 1 has four new users, packed three and then one at a time
+        self.assertEqual(
+            sorted(SubGroup.objects.filter(group__group_id=1).values_list("member_count", flat=True)), [1, 3],
+        )
+
+    def test_loading_twice_adds_nothing(self):
+        self.seed(workers=0)
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            seed_data.load_users_bulk(self.path, chunk_size=3, workers=0)
+        self.assertIn("Created 0 users (8 already seeded, 2 invalid), 0 interest links and 0 subgroups", out.getvalue())
+        self.assertSeeded()
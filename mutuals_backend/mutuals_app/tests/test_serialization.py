@@ -0,0 +1,39 @@
+import datetime
+
+from django.core.cache import caches
+from django.test import override_settings
+
+from mutuals_app.ml_models.models import assign_user_to_subgroup
+from mutuals_app.models import Event, Group, Interest, SubGroup
+
+from .base import MutualsTestCase, create_user
+
+
+class FastSerializationTests(MutualsTestCase):
+    def setUp(self):
+        super().setUp()
+        interests = [Interest.objects.create(name=name) for name in ("Music", "Café culture", "Sports")]
+        groups = [Group.objects.create(group_id=n, name=f"Group {n} – “quoted”") for n in (1, 2)]
+        for n in range(8):
+            user = create_user(n, groups[n % 2], interests[n % 3:], age=25 + n, budget=1000.5 + 37.25 * n,
+                               name=f"Zoë {n} ")
+            assign_user_to_subgroup(user, SubGroup, user.group)
+        create_user(9, None)  # no group or subgroup
+        for n in range(1, 4):
+            Event.objects.create(
+                event_id=n, event_name=f"Fête {n}", event_date=datetime.date(2026, 2, n), location="Pune",
+                ticket_price=n * 99.99, venue_id=n, tags=["Music", "Café culture"][:n],
+            )
+
+    def get(self, url, fast):
+        for alias in ("default", "responses"):
+            caches[alias].clear()
+        with override_settings(FAST_SERIALIZATION=fast):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def test_fast_output_is_byte_identical(self):
+        for url in ("/api/users/", "/api/users/?page_size=3&group_id=1", "/api/subgroups/", "/api/events/"):
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url, fast=True), self.get(url, fast=False))
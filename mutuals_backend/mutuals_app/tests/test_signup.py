@@ -0,0 +1,103 @@
+from mutuals_app.ml_models.models import InterestIndex
+from mutuals_app.models import Group, Interest, SubGroup, User
+
+from .base import MutualsTestCase
+
+
+class SignupTestCase(MutualsTestCase):
+    def setUp(self):
+        super().setUp()
+        names = InterestIndex.load().interests[:6]
+        self.interests = [Interest.objects.create(name=name) for name in names]
+
+    def record(self, n, **overrides):
+        record = {
+            "name": f"User {n}",
+            "gender": "F",
+            "dob": "1995-04-12",
+            "city": "Pune",
+            "occupation": "Engineer",
+            "budget": 2000,
+            "interests": [interest.pk for interest in self.interests[n % 3:n % 3 + 3]],
+        }
+        record.update(overrides)
+        return record
+
+
+class SingleSignupTests(SignupTestCase):
+    url = "/api/users/"
+
+    def test_registration_form_payload_is_accepted(self):
+        # The form sends its interest IDs as strings, under both keys
+        ids = [str(interest.pk) for interest in self.interests[:3]]
+        record = self.record(0, interests=ids, interest_ids=ids)
+        response = self.client.post(self.url, record, content_type="application/json")
+
+        self.assertEqual(response.status_code, 201, response.content)
+        user = User.objects.get(user_id=response.json()["user_id"])
+        self.assertEqual(sorted(user.interests.values_list("pk", flat=True)), sorted(map(int, ids)))
+        self.assertIsNotNone(user.group_id)
+        self.assertIsNotNone(user.subgroup_id)
+
+    def test_malformed_input_is_rejected(self):
+        for overrides in ({"dob": "garbage"}, {"interests": 5}, {"interests": ["music"]}):
+            with self.subTest(overrides=overrides):
+                response = self.client.post(self.url, self.record(0, **overrides), content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(next(iter(overrides)), response.json())
+        self.assertFalse(User.objects.exists())
+
+
+class BatchSignupTests(SignupTestCase):
+    url = "/api/users/batch/"
+
+    def test_valid_batch_creates_users_groups_and_subgroups(self):
+        records = [self.record(n) for n in range(3)]
+        response = self.client.post(self.url, records, content_type="application/json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()), 3)
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(len({user["user_id"] for user in response.json()}), 3)
+        self.assertFalse(User.objects.filter(group=None).exists())
+        self.assertFalse(User.objects.filter(subgroup=None).exists())
+
+    def test_interest_ids_are_accepted(self):
+        record = self.record(0)
+        record["interest_ids"] = record.pop("interests")
+        response = self.client.post(self.url, [record], content_type="application/json")
+
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get()
+        self.assertEqual(set(user.interests.values_list("pk", flat=True)), set(record["interest_ids"]))
+
+    def test_invalid_record_writes_nothing(self):
+        records = [self.record(0), self.record(1, interests=5), self.record(2, dob="garbage")]
+        response = self.client.post(self.url, records, content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertIn("interests", errors[1])
+        self.assertIn("dob", errors[2])
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Group.objects.exists())
+        self.assertFalse(SubGroup.objects.exists())
+
+    def test_numeric_string_interest_ids_are_accepted(self):
+        records = [self.record(n) for n in range(2)]
+        for record in records:
+            record["interests"] = [str(pk) for pk in record["interests"]]
+        response = self.client.post(self.url, records, content_type="application/json")
+
+        self.assertEqual(response.status_code, 201, response.content)
+        for record, user in zip(records, response.json()):
+            self.assertEqual(sorted(i["id"] for i in user["interests"]), sorted(map(int, record["interests"])))
+
+    def test_malformed_or_unknown_interest_ids_are_rejected(self):
+        for interests in (["music"], ["1.5"], [1.5], [True], {"id": 1}, [999999], ["999999"]):
+            with self.subTest(interests=interests):
+                response = self.client.post(self.url, [self.record(0, interests=interests)], content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("interests", response.json()[0])
+        self.assertFalse(User.objects.exists())
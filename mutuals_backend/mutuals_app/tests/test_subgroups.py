@@ -0,0 +1,160 @@
+import os
+import random
+import subprocess
+import sys
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, F, Max, Min
+from django.test import SimpleTestCase
+
+from mutuals_app.cache import get_user_detail, set_user_detail, user_detail_key
+from mutuals_app.management.commands.recluster import update_user_groups
+from mutuals_app.ml_models.models import assign_user_to_subgroup, pack_group_into_subgroups
+from mutuals_app.models import Group, ResourceVersion, SubGroup, User
+
+from .base import MutualsTestCase, create_user
+
+
+class SubgroupInvariantsMixin:
+    def assertSubgroupInvariants(self, users=None):
+        # `users`: the ones that should all be in a subgroup of their group
+        subgroups = SubGroup.objects.annotate(
+            n=Count("users"), lo_age=Min("users__age"), hi_age=Max("users__age"),
+            lo_budget=Min("users__budget"), hi_budget=Max("users__budget"),
+        )
+        for sg in subgroups:
+            with self.subTest(subgroup=sg.pk):
+                self.assertLessEqual(sg.n, 5)
+                self.assertEqual(
+                    (sg.member_count, sg.min_age, sg.max_age, sg.min_budget, sg.max_budget),
+                    (sg.n, sg.lo_age, sg.hi_age, sg.lo_budget, sg.hi_budget),
+                )
+                if sg.n:
+                    self.assertLessEqual(sg.hi_age - sg.lo_age, 5)
+                    self.assertLessEqual(sg.hi_budget - sg.lo_budget, 500)
+        self.assertFalse((User.objects.all() if users is None else users).exclude(subgroup__group=F("group")).exists())
+
+
+class SubgroupPlacementTests(SubgroupInvariantsMixin, MutualsTestCase):
+    def test_placement_keeps_subgroup_invariants(self):
+        group = Group.objects.create(group_id=1, name="Group 1")
+        rng = random.Random(8)
+        for n in range(60):
+            user = create_user(n, group, age=rng.randint(20, 40), budget=rng.choice(range(0, 3000, 250)))
+            assign_user_to_subgroup(user, SubGroup, group)
+
+        self.assertFalse(User.objects.filter(subgroup=None).exists())
+        self.assertSubgroupInvariants()
+
+    def test_aggregates_follow_member_edits_and_deletes(self):
+        group = Group.objects.create(group_id=1, name="Group 1")
+        users = [create_user(n, group, age=30 + n, budget=1000 + 100 * n) for n in range(3)]
+        for user in users:
+            assign_user_to_subgroup(user, SubGroup, group)
+        self.assertEqual(SubGroup.objects.count(), 1)
+
+        users[0].refresh_from_db()
+        users[0].budget = 1150
+        users[0].save()
+        users[2].refresh_from_db()
+        users[2].delete()
+
+        self.assertSubgroupInvariants()
+        subgroup = SubGroup.objects.get()
+        self.assertEqual((subgroup.member_count, subgroup.max_age, subgroup.min_budget), (2, 31, 1100))
+
+
+class PackingTests(SubgroupInvariantsMixin, MutualsTestCase):
+    def test_packing_keeps_invariants_and_drops_emptied_subgroups(self):
+        group = Group.objects.create(group_id=1, name="Group 1")
+        rng = random.Random(10)
+        for n in range(40):
+            user = create_user(n, group, age=rng.randint(20, 40), budget=rng.choice(range(0, 3000, 250)))
+            assign_user_to_subgroup(user, SubGroup, group)
+        old = set(SubGroup.objects.values_list("pk", flat=True))
+        set_user_detail(user_detail_key("U0001"), {"cached": True})
+        version = ResourceVersion.objects.get(resource="subgroups").version
+
+        # user_id deferred, as a caller might load them
+        users = list(User.objects.filter(group=group).only("id", "age", "budget", "subgroup"))
+        with self.captureOnCommitCallbacks(execute=True):
+            subgroups = pack_group_into_subgroups(group, users)
+
+        self.assertSubgroupInvariants()
+        self.assertEqual(set(SubGroup.objects.values_list("pk", flat=True)), {sg.pk for sg in subgroups})
+        self.assertFalse(SubGroup.objects.filter(pk__in=old).exists())
+        self.assertIsNone(get_user_detail(user_detail_key("U0001")))
+        self.assertGreater(ResourceVersion.objects.get(resource="subgroups").version, version)
+
+    def test_members_left_behind_are_invalidated(self):
+        group = Group.objects.create(group_id=1, name="Group 1")
+        users = [create_user(n, group, age=30 + n) for n in range(3)]
+        for user in users:
+            assign_user_to_subgroup(user, SubGroup, group)
+        set_user_detail(user_detail_key("U0000"), {"cached": True})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pack_group_into_subgroups(group, list(User.objects.filter(pk=users[2].pk)))
+
+        self.assertSubgroupInvariants()
+        self.assertEqual(SubGroup.objects.count(), 2)
+        self.assertIsNone(get_user_detail(user_detail_key("U0000")))
+
+
+class ConcurrentPlacementTests(SimpleTestCase):
+    def test_concurrent_signups_keep_subgroup_invariants(self):
+        # The test database is in memory, which threads can't share, so the
+        # stress script runs on its own scratch SQLite file
+        script = os.path.join(settings.BASE_DIR, "benchmarks", "stress_subgroup_allocation.py")
+        result = subprocess.run(
+            [sys.executable, script, "--users", "60", "--threads", "4"],
+            capture_output=True, text=True, timeout=300,
+        )
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+
+
+class ReclusterMoveTests(SubgroupInvariantsMixin, MutualsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.old = Group.objects.create(group_id=1, name="Old")
+        self.new = Group.objects.create(group_id=2, name="New")
+
+    def join(self, n, group, **fields):
+        user = create_user(n, group, **fields)
+        assign_user_to_subgroup(user, SubGroup, group)
+        user.refresh_from_db()
+        return user
+
+    def test_moved_users_leave_their_subgroups_and_are_packed_in_the_new_group(self):
+        users = [self.join(n, self.old, age=30 + n) for n in range(4)]
+        loner = self.join(4, self.old, age=60)
+        shared, alone = users[0].subgroup_id, loner.subgroup_id
+        self.assertNotEqual(shared, alone)
+
+        pks = np.array([user.pk for user in users + [loner]])
+        clusters = np.array([2, 1, 2, 1, 2])
+        moved = update_user_groups(pks, clusters, chunk_size=2)
+
+        self.assertEqual(moved, 3)
+        self.assertFalse(User.objects.exclude(subgroup__group=F("group")).exists())
+        self.assertEqual(set(User.objects.filter(group=self.new).values_list("pk", flat=True)),
+                         {users[0].pk, users[2].pk, loner.pk})
+        self.assertFalse(SubGroup.objects.filter(pk=alone).exists())
+
+        stayed = SubGroup.objects.get(pk=shared)
+        self.assertEqual((stayed.member_count, stayed.min_age, stayed.max_age), (2, 31, 33))
+        self.assertSubgroupInvariants()
+
+    def test_users_left_out_of_the_clustering_keep_their_group(self):
+        users = [self.join(n, self.old) for n in range(3)]
+        before = [(user.group_id, user.subgroup_id) for user in users]
+
+        # No interests (cluster 0), or a cluster without a Group row
+        pks = np.array([user.pk for user in users])
+        moved = update_user_groups(pks, np.array([0, 9, 1]), chunk_size=2)
+
+        self.assertEqual(moved, 0)
+        after = [(user.group_id, user.subgroup_id) for user in User.objects.filter(pk__in=pks).order_by("pk")]
+        self.assertEqual(after, before)
+        self.assertSubgroupInvariants()
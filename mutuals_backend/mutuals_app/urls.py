@@ -1,10 +1,11 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('', views.index),
     path('interests/', views.interests_handler),
     path('users/', views.users_handler),
+    path('users/batch/', views.users_batch_handler, name='users-batch-create'),
     path('users/<int:pk>/', views.user_detail_handler),
     path('groups/', views.groups_handler, name='group-list-create'),
     path('subgroups/', views.subgroups_handler, name='subgroup-list-create'),
@@ -12,4 +13,15 @@ urlpatterns = [
     path('user-detail/<str:user_id>/', views.get_user_by_user_id, name='get-user-by-user-id'),
     path('events/', views.events_handler, name='events-handler'),
     path('events/user/<str:user_id>/', views.events_by_user_group_tags, name='events-by-user-group-tags'),
+    path('export/users/', views.export_users, name='export-users'),
+    path('export/groups/', views.export_groups, name='export-groups'),
+    path('export/events/', views.export_events, name='export-events'),
+    path('stats/assignment-cache/', views.assignment_cache_stats, name='assignment-cache-stats'),
+    path('stats/response-cache/', views.response_cache_stats, name='response-cache-stats'),
+
+    # Async versions of the hot endpoints, for ASGI deployments
+    path('async/login/', async_views.login, name='async-login'),
+    path('async/users/', async_views.signup, name='async-signup'),
+    path('async/user-detail/<str:user_id>/', async_views.get_user_by_user_id, name='async-get-user-by-user-id'),
+    path('async/events/user/<str:user_id>/', async_views.events_by_user_group_tags, name='async-events-by-user-group-tags'),
 ]   
\ No newline at end of file
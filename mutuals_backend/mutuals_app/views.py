@@ -1,12 +1,30 @@
-import random
-import re
 from datetime import datetime, date
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, renderer_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework import status
-from .models import User, Interest, Group, SubGroup, Event
-from .serializers import EventSerializer, InterestSerializer, UserSerializer, GroupSerializer, SubGroupSerializer
-from .ml_models.models import assign_new_user_to_cluster, assign_user_to_subgroup 
+from django.conf import settings
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Prefetch
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from django.utils.timezone import localdate
+from .models import User, Interest, Group, SubGroup, Event, normalize_tag
+from .serializers import EventSerializer, InterestSerializer, UserSerializer, UserBatchSerializer, GroupSerializer, SubGroupSerializer
+from .ml_models.models import assign_new_user_to_cluster, assign_new_users_to_clusters, assign_user_to_subgroup, assignment_cache
+from .ml_models.live_index import loaded_live_index
+from .ids import new_user_id, new_user_ids
+from .fieldsets import parse_fieldset
+from .exports import EVENT_COLUMNS, FORMATS, GROUP_COLUMNS, USER_COLUMNS, event_rows, export_response, group_rows, user_rows
+from .cache import cache_stats, cached_response, get_cached, get_user_detail, response_key, set_cached, set_user_detail, user_detail_key
+from .pagination import UserCursorPagination
+from .fast_serializers import USER_VALUES, event_dicts, subgroup_list, user_dicts
+from .renderers import FastJSONRenderer
+from .conditional import resource_versions, versioned_resource
+from .ml_models.event_ranking import rank_events
+from .ml_models.recommendations import GROUP_RECOMMENDATION_SIZE, group_tag_words, matching_events
 
 
 
@@ -36,12 +54,19 @@ def calculate_age_and_range(dob_str):
 
     return age, age_range
 
-def generate_unique_user_id():
-    while True:
-        user_id = f"M{random.randint(1000, 9999)}"
-        if not User.objects.filter(user_id=user_id).exists():
-            return user_id
 
+def interest_id_list(value):
+    """
+    A signup's interests: a list of Interest IDs, as numbers or digit strings
+    (the frontend sends strings, which PrimaryKeyRelatedField also takes).
+    Returns them as ints; raises ValueError for anything else.
+    """
+    if not isinstance(value, list):
+        raise ValueError("Expected a list of interest IDs.")
+    try:
+        return [int(str(i)) for i in value]
+    except ValueError:
+        raise ValueError("Expected a list of interest IDs.") from None
 
 # Root route
 @api_view(['GET'])
@@ -65,7 +90,11 @@ def login(request):
         return Response({"error": "user_id is required."}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        user = User.objects.get(user_id=user_id)
+        user = (
+            User.objects.select_related('group', 'subgroup__group')
+            .prefetch_related('interests')
+            .get(user_id=user_id)
+        )
         serializer = UserSerializer(user)
         return Response({
             "message": "Login successful",
@@ -78,56 +107,110 @@ def login(request):
 def get_user_by_user_id(request, user_id):
     """
     Get detailed user data including group, subgroup, and subgroup members.
+    Built from three queries and cached per user (see cache.py).
     """
-    try:
-        user = User.objects.select_related('group', 'subgroup').get(user_id=user_id)
-
-        # Build user data response
-        user_data = {
-            "id": str(user.id),
-            "user_id": str(user.user_id),
-            "name": user.name,
-            "age": user.age,
-            "city": user.city,
-            "occupation": user.occupation,
-            "interests": [
-                { "id": str(interest.id), "name": interest.name }
-                for interest in user.interests.all()
-            ],
-            "group": {
-                "name": user.group.name if user.group else None,
-            },
-            "subgroup": {
-                "name": user.subgroup.name if user.subgroup else None,
-            },
-            "subgroupMembers": [],
-        }
-
-        # Get subgroup members (excluding current user)
-        if user.subgroup:
-            members = User.objects.filter(subgroup=user.subgroup).exclude(id=user.id)
-            print("Members>", members)
-            for member in members:
-                user_data["subgroupMembers"].append({
-                    "id": str(member.id),
-                    "name": member.name,
-                    "age": member.age,
-                    "occupation": member.occupation,
-                })
+    key = user_detail_key(user_id)
+    user_data = get_user_detail(key)
+    if user_data is not None:
+        return Response(user_data, status=status.HTTP_200_OK)
 
+    try:
+        user = user_detail_queryset().get(user_id=user_id)
+        members = user.subgroup.users.all() if user.subgroup else []
+        user_data = user_detail_payload(user, user.interests.all(), members)
+        set_user_detail(key, user_data)
         return Response(user_data, status=status.HTTP_200_OK)
 
     except User.DoesNotExist:
         return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
 
 
+def user_detail_queryset():
+    return (
+        User.objects.select_related('group', 'subgroup')
+        .only('id', 'user_id', 'name', 'age', 'city', 'occupation', 'group__name', 'subgroup__name')
+        .prefetch_related(
+            Prefetch('interests', queryset=Interest.objects.only('id', 'name').order_by('pk')),
+            Prefetch(
+                'subgroup__users',
+                queryset=User.objects.only('id', 'name', 'age', 'occupation', 'subgroup_id').order_by('pk'),
+            ),
+        )
+    )
+
+
+def user_detail_payload(user, interests, subgroup_members):
+    # Build user data response
+    user_data = {
+        "id": str(user.id),
+        "user_id": str(user.user_id),
+        "name": user.name,
+        "age": user.age,
+        "city": user.city,
+        "occupation": user.occupation,
+        "interests": [
+            { "id": str(interest.id), "name": interest.name }
+            for interest in interests
+        ],
+        "group": {
+            "name": user.group.name if user.group else None,
+        },
+        "subgroup": {
+            "name": user.subgroup.name if user.subgroup else None,
+        },
+        "subgroupMembers": [],
+    }
+
+    # Get subgroup members (excluding current user)
+    for member in subgroup_members:
+        if member.id == user.id:
+            continue
+        user_data["subgroupMembers"].append({
+            "id": str(member.id),
+            "name": member.name,
+            "age": member.age,
+            "occupation": member.occupation,
+        })
+    return user_data
+
+
 @api_view(['GET', 'POST'])
+@renderer_classes([FastJSONRenderer, BrowsableAPIRenderer])
 def users_handler(request):
-    # Gets all users
+    # Gets users a page at a time (?cursor=, ?page_size=), optionally filtered
+    # by ?group_id=, ?city= and ?age_range=
     if request.method == 'GET':
-        users = User.objects.all()
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data)
+        try:
+            fieldset = parse_fieldset(request.query_params, UserSerializer)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if fieldset is not None:
+            users = fieldset.queryset(User.objects.all(), UserSerializer)
+        elif settings.FAST_SERIALIZATION:
+            users = User.objects.values(*USER_VALUES)
+        else:
+            users = User.objects.select_related('group', 'subgroup__group').prefetch_related(
+                Prefetch('interests', queryset=Interest.objects.order_by('pk'))
+            )
+
+        group_id = request.query_params.get('group_id')
+        if group_id:
+            try:
+                users = users.filter(group__group_id=int(group_id))
+            except ValueError:
+                return Response({"error": "group_id must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('city'):
+            users = users.filter(city=request.query_params['city'])
+        if request.query_params.get('age_range'):
+            users = users.filter(age_range=request.query_params['age_range'])
+
+        paginator = UserCursorPagination()
+        page = paginator.paginate_queryset(users, request)
+        if fieldset is None and settings.FAST_SERIALIZATION:
+            return paginator.get_paginated_response(user_dicts(page))
+        serializer = UserSerializer(page, many=True, fieldset=fieldset)
+        return paginator.get_paginated_response(serializer.data)
     
     # Create user
     elif request.method == 'POST':
@@ -139,57 +222,191 @@ def users_handler(request):
         - Subgroup assignment within the group
         """
 
-        # Step 1: Calculate age and age range
-        age, age_range = calculate_age_and_range(request.data['dob'])
-        request.data['age'] = age
-        request.data['age_range'] = age_range
+        interests_qs, interest_names = prepare_signup(request.data)
 
-        # Step 2: Generate unique user ID
-        request.data['user_id'] = generate_unique_user_id()
-        user_id = request.data['user_id']
+        # Step 3: Assign user to a group (cluster) using the interest-based ML algorithm
+        cluster_assignment = assign_new_user_to_cluster(request.data['user_id'], interest_names)
 
-        # Step 3: Get interests and match to database
-        interests = request.data.get('interests', [])  # Expecting a list of interest IDs
-        interests_qs = Interest.objects.filter(id__in=interests)
-        interest_names = list(interests_qs.values_list('name', flat=True))
+        payload, code = complete_signup(request.data, interests_qs, cluster_assignment)
+        return Response(payload, status=code)
 
-        # Step 4: Assign user to a group (cluster) using the interest-based ML algorithm
-        cluster_assignment = assign_new_user_to_cluster(user_id, interest_names)
 
-        # Step 5: Use the assigned cluster to get or create the group
-        group_id = cluster_assignment.get('cluster')
-        if group_id is not None:
-            group, _ = Group.objects.get_or_create(group_id=group_id, defaults={"name": f"Group {group_id}"})
-            request.data['group_id'] = group.id  # Set foreign key for serializer
-        else:
-            return Response({"error": "No cluster assigned. Cannot proceed."}, status=status.HTTP_400_BAD_REQUEST)
+def prepare_signup(data):
+    """
+    Signup steps before scoring: fills in the age, age range and a new
+    user ID, and returns the chosen interests (queryset, names). Raises
+    ValidationError for a missing or malformed dob or interests.
+    """
+    # Step 1: Calculate age and age range
+    try:
+        age, age_range = calculate_age_and_range(data['dob'])
+    except (KeyError, TypeError, ValueError):
+        raise ValidationError({'dob': ["A valid date (YYYY-MM-DD) is required."]})
+    try:
+        # Expecting a list of interest IDs, as `interests` or `interest_ids`
+        interests = interest_id_list(data.get('interests', data.get('interest_ids', [])))
+    except ValueError as e:
+        raise ValidationError({'interests': [str(e)]})
+    data['age'] = age
+    data['age_range'] = age_range
+
+    # Step 2: Generate unique user ID
+    data['user_id'] = new_user_id()
+
+    # Match interests to the database
+    interests_qs = Interest.objects.filter(id__in=interests)
+    return interests_qs, list(interests_qs.values_list('name', flat=True))
+
+
+def complete_signup(data, interests_qs, cluster_assignment):
+    """
+    Signup steps after scoring: creates the user in the assigned group and
+    places them in a subgroup. Returns (response payload, status code).
+    """
+    # Step 4: Use the assigned cluster to get or create the group
+    group_id = cluster_assignment.get('cluster')
+    if group_id is not None:
+        group, _ = Group.objects.get_or_create(group_id=group_id, defaults={"name": f"Group {group_id}"})
+        data['group_id'] = group.id  # Set foreign key for serializer
+    else:
+        return {"error": "No cluster assigned. Cannot proceed."}, status.HTTP_400_BAD_REQUEST
+
+    # Step 5: Create the user
+    serializer = UserSerializer(data=data)
+    if serializer.is_valid():
+        # Committed together, so a live index refresh never sees the user
+        # without their interests
+        with transaction.atomic():
+            user = serializer.save(model_version=cluster_assignment['model_version'])
 
-        # Step 6: Create the user
-        serializer = UserSerializer(data=request.data)
-        if serializer.is_valid():
-            user = serializer.save()
-            
             # Attach interest relations after user is created
             if interests_qs.exists():
                 user.interests.set(interests_qs)
 
-            # Step 7: Assign to appropriate subgroup within the assigned group
-            assign_user_to_subgroup(user, SubGroup, group)
+        # Step 6: Assign to appropriate subgroup within the assigned group
+        assign_user_to_subgroup(user, SubGroup, group)
 
-            return Response(UserSerializer(user).data, status=status.HTTP_201_CREATED)
+        return UserSerializer(user).data, status.HTTP_201_CREATED
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    return serializer.errors, status.HTTP_400_BAD_REQUEST
+
+
+@api_view(['POST'])
+def users_batch_handler(request):
+    """
+    Creates many users in one request (e.g. partner imports).
+    Expects a list of user payloads shaped like the single create (interests
+    as `interests` or `interest_ids`). Clusters are scored for the whole batch
+    at once and all users are inserted in a single transaction; nothing is
+    written if any record is invalid. A 400 lists the errors of each record
+    at the record's position in the request.
+    """
+    records = request.data
+    if not isinstance(records, list) or not records:
+        return Response({"error": "Expected a non-empty list of users."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Step 1: Validate dates and interests, and compute age and age range
+    errors = [{} for _ in records]
+    payloads = []
+    for i, record in enumerate(records):
+        payload = dict(record) if isinstance(record, dict) else {}
+        try:
+            payload['age'], payload['age_range'] = calculate_age_and_range(payload['dob'])
+        except (KeyError, TypeError, ValueError):
+            errors[i]['dob'] = ["A valid date (YYYY-MM-DD) is required."]
+        try:
+            payload['interests'] = interest_id_list(payload.get('interests', payload.get('interest_ids', [])))
+        except ValueError as e:
+            errors[i]['interests'] = [str(e)]
+            payload['interests'] = []
+        payloads.append(payload)
+
+    # Step 2: Resolve every referenced interest with one query
+    interests_by_id = Interest.objects.in_bulk({i for payload in payloads for i in payload['interests']})
+    for i, payload in enumerate(payloads):
+        unknown = [pk for pk in payload['interests'] if pk not in interests_by_id]
+        if unknown:
+            errors[i]['interests'] = [f"Unknown interest IDs: {', '.join(map(str, unknown))}."]
+    user_interests = [
+        [interests_by_id[i] for i in dict.fromkeys(payload['interests']) if i in interests_by_id]
+        for payload in payloads
+    ]
+
+    # Step 3: Assign all users to clusters in one pass
+    assignments = assign_new_users_to_clusters([
+        (i, [interest.name for interest in interests])
+        for i, interests in enumerate(user_interests)
+    ])
+
+    # Step 4: Every user needs a cluster; their groups are created on write
+    for i, assignment in enumerate(assignments):
+        if assignment['cluster'] is None:
+            errors[i]['group'] = ["No cluster assigned. Cannot proceed."]
+
+    # Step 5: Validate every record before writing anything
+    serializer = UserBatchSerializer(data=payloads, many=True)
+    serializer.is_valid()
+    for i, field_errors in enumerate(serializer.errors or []):
+        errors[i].update(field_errors)
+    if any(errors):
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+    # Step 6: Insert groups, users, interest links and subgroups in one transaction
+    with transaction.atomic():
+        cluster_ids = {a['cluster'] for a in assignments}
+        groups = {g.group_id: g for g in Group.objects.filter(group_id__in=cluster_ids)}
+        for group_id in cluster_ids - groups.keys():
+            groups[group_id], _ = Group.objects.get_or_create(group_id=group_id, defaults={"name": f"Group {group_id}"})
+
+        # Reserved inside the transaction, so a rollback releases them too
+        user_ids = new_user_ids(len(payloads))
+        users = User.objects.bulk_create([
+            User(**{**data, 'user_id': user_id}, group=groups[assignment['cluster']], model_version=assignment['model_version'])
+            for data, user_id, assignment in zip(serializer.validated_data, user_ids, assignments)
+        ])
+
+        Through = User.interests.through
+        Through.objects.bulk_create([
+            Through(user_id=user.pk, interest_id=interest.pk)
+            for user, interests in zip(users, user_interests)
+            for interest in interests
+        ])
+
+        for user in users:
+            assign_user_to_subgroup(user, SubGroup, user.group)
+
+    # Bulk inserts send no signals; pull the new users into the live index
+    live_index = loaded_live_index()
+    if live_index is not None:
+        live_index.refresh()
+
+    created = (
+        User.objects.filter(pk__in=[user.pk for user in users])
+        .select_related('group', 'subgroup__group')
+        .prefetch_related('interests')
+        .order_by('pk')
+    )
+    return Response(UserSerializer(created, many=True).data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['GET', 'PUT', 'DELETE'])
 def user_detail_handler(request, pk):
+    users, fieldset = User.objects.all(), None
+    if request.method == 'GET':
+        try:
+            fieldset = parse_fieldset(request.query_params, UserSerializer)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if fieldset is not None:
+            users = fieldset.queryset(users, UserSerializer)
+
     try:
-        user = User.objects.get(pk=pk)
+        user = users.get(pk=pk)
     except User.DoesNotExist:
         return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
-        serializer = UserSerializer(user)
+        serializer = UserSerializer(user, fieldset=fieldset)
         return Response(serializer.data)
 
     elif request.method == 'PUT':
@@ -204,10 +421,28 @@ def user_detail_handler(request, pk):
         return Response(status=status.HTTP_204_NO_CONTENT)
     
     
+@api_view(['GET'])
+def assignment_cache_stats(request):
+    """
+    Hit/miss counters of the cluster assignment cache in this worker.
+    """
+    return Response(assignment_cache.stats())
+
+
+@api_view(['GET'])
+def response_cache_stats(request):
+    """
+    Hit/miss counters of the cached read endpoints in this worker.
+    """
+    return Response(cache_stats.stats())
+
+
 # ----------------------
 # INTEREST VIEWS
 # ----------------------
 
+@versioned_resource('interests')
+@cached_response('interests')
 @api_view(['GET', 'POST'])
 def interests_handler(request):
     if request.method == 'GET':
@@ -227,6 +462,8 @@ def interests_handler(request):
 # GROUP VIEWS
 # ----------------------
 
+@versioned_resource('groups')
+@cached_response('groups')
 @api_view(['GET', 'POST'])
 def groups_handler(request):
     if request.method == 'GET':
@@ -246,11 +483,23 @@ def groups_handler(request):
 # SUBGROUP VIEWS
 # ----------------------
 
+@versioned_resource('subgroups')
+@cached_response('subgroups')
 @api_view(['GET', 'POST'])
+@renderer_classes([FastJSONRenderer, BrowsableAPIRenderer])
 def subgroups_handler(request):
     if request.method == 'GET':
+        try:
+            fieldset = parse_fieldset(request.query_params, SubGroupSerializer)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         subgroups = SubGroup.objects.all()
-        serializer = SubGroupSerializer(subgroups, many=True)
+        if fieldset is not None:
+            subgroups = fieldset.queryset(subgroups, SubGroupSerializer)
+        elif settings.FAST_SERIALIZATION:
+            return Response(subgroup_list(subgroups))
+        serializer = SubGroupSerializer(subgroups, many=True, fieldset=fieldset)
         return Response(serializer.data)
 
     elif request.method == 'POST':
@@ -260,11 +509,27 @@ def subgroups_handler(request):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+@versioned_resource('events')
+@cached_response('events')
 @api_view(['GET', 'POST'])
+@renderer_classes([FastJSONRenderer, BrowsableAPIRenderer])
 def events_handler(request):
+    """
+    GET lists events, optionally filtered in the DB by
+    ?tag= (repeatable, any of), ?city=, ?from= / ?to= (YYYY-MM-DD, inclusive)
+    and ?max_price=.
+    """
     if request.method == 'GET':
-        events = Event.objects.all()
-        serializer = EventSerializer(events, many=True)
+        try:
+            events = filter_events(Event.objects.all(), request.query_params)
+            fieldset = parse_fieldset(request.query_params, EventSerializer)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if fieldset is not None:
+            events = fieldset.queryset(events, EventSerializer)
+        elif settings.FAST_SERIALIZATION:
+            return Response(event_dicts(events))
+        serializer = EventSerializer(events, many=True, fieldset=fieldset)
         return Response(serializer.data)
 
     elif request.method == 'POST':
@@ -274,27 +539,155 @@ def events_handler(request):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def filter_events(events, params):
+    """
+    Applies the events list filters from query params. Raises ValueError with
+    a message for the client on malformed values.
+    """
+    tags = [normalize_tag(tag) for tag in params.getlist('tag') if tag.strip()]
+    if tags:
+        events = events.filter(tag_set__name__in=tags).distinct()
+
+    city = params.get('city', '').strip()
+    if city:
+        events = events.filter(location=city)
+
+    for param, lookup in (('from', 'event_date__gte'), ('to', 'event_date__lte')):
+        if params.get(param):
+            try:
+                day = datetime.strptime(params[param], "%Y-%m-%d").date()
+            except ValueError:
+                raise ValueError(f"{param} must be a date in YYYY-MM-DD format.")
+            events = events.filter(**{lookup: day})
+
+    if params.get('max_price'):
+        try:
+            max_price = float(params['max_price'])
+        except ValueError:
+            raise ValueError("max_price must be a number.")
+        events = events.filter(ticket_price__lte=max_price)
+
+    return events.order_by('pk')
+
+
+def parse_page(params, default_limit, max_limit=100):
+    """
+    Reads ?limit=&offset= from the query params. Returns (limit, offset),
+    or raises ValueError with a message for the client.
+    """
+    try:
+        limit = int(params.get('limit', default_limit))
+        offset = int(params.get('offset', 0))
+    except ValueError:
+        raise ValueError("limit and offset must be integers.")
+    if limit < 1 or offset < 0:
+        raise ValueError("limit must be positive and offset non-negative.")
+    return min(limit, max_limit), offset
+
+
+def group_events_key(request, user, ranked, limit, offset):
+    # Pages are shared by the group's members (ranked ones by those with the
+    # same budget and city, for the day) and retired when the events, groups
+    # or stored recommendations change
+    return response_key(
+        'events-by-user',
+        *resource_versions(request, 'events', 'groups', 'recommendations'),
+        *((user.group.name, user.budget, user.city, localdate()) if ranked else (user.group_id,)),
+        limit,
+        offset,
+    )
+
+
+def group_events_page(user, group, ranked, limit, offset):
+    # Extract words from group name (split by non-word chars)
+    words = group_tag_words(group.name)
+
+    if ranked:
+        ranked_pks = rank_events(words, user.budget, user.city, localdate(), limit, offset)
+        events = Event.objects.in_bulk([pk for pk, _ in ranked_pks])
+        data = []
+        for pk, score in ranked_pks:
+            item = EventSerializer(events[pk]).data
+            item['score'] = round(score, 4)
+            data.append(item)
+        return data
+
+    if offset + limit <= GROUP_RECOMMENDATION_SIZE:
+        # Materialized per group (GroupEventRecommendation)
+        matched_events = (
+            Event.objects.filter(group_recommendations__group=group)
+            .order_by('group_recommendations__rank')[offset:offset + limit]
+        )
+    else:
+        # Past the stored list: look the words up in the tag index
+        matched_events = matching_events(words)[offset:offset + limit]
+
+    return EventSerializer(matched_events, many=True).data
+
+
 @api_view(['GET'])
 def events_by_user_group_tags(request, user_id):
+    """
+    Events for the user's group, matched on the group name's tag words.
+
+    By default the first matching events in catalogue order. With
+    ?mode=ranked they are ordered by a score combining tag overlap, budget
+    fit, city and how soon the event is (see ml_models/event_ranking.py),
+    and each carries its `score`. Both modes take ?limit= (default 3) and
+    ?offset=.
+    """
     try:
-        user = User.objects.get(user_id=user_id)
+        user = User.objects.select_related('group').get(user_id=user_id)
         group = user.group
 
         if not group:
             return Response({"error": "User does not belong to any group."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Extract words from group name (split by non-word chars)
-        words = re.findall(r'\b\w+\b', group.name.lower())
+        try:
+            limit, offset = parse_page(request.query_params, default_limit=3)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Fetch events and match tags loosely
-        matched_events = []
-        for event in Event.objects.all():
-            event_tags = [tag.lower() for tag in event.tags]
-            if any(word in event_tags for word in words):
-                matched_events.append(event)
+        ranked = request.query_params.get('mode') == 'ranked'
 
-        serializer = EventSerializer(matched_events[:3], many=True)
-        return Response(serializer.data)
+        key = group_events_key(request, user, ranked, limit, offset)
+        data = get_cached('events-by-user', key)
+        if data is None:
+            data = group_events_page(user, group, ranked, limit, offset)
+            set_cached(key, data)
+        return Response(data)
 
     except User.DoesNotExist:
-        return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+
+# ----------------------
+# EXPORT VIEWS
+# ----------------------
+# Plain Django views: DRF would take ?format= as a renderer name
+
+def export(request, name, columns, rows):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        return JsonResponse(
+            {"error": f"format must be one of: {', '.join(FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST
+        )
+    return export_response(name, columns, rows, fmt, asynchronous=isinstance(request, ASGIRequest))
+
+
+@require_GET
+def export_users(request):
+    """
+    Streams every user in the layout of data/clustered_mutuals.csv
+    (?format=csv, the default, or ?format=ndjson).
+    """
+    return export(request, 'users', USER_COLUMNS, user_rows())
+
+
+@require_GET
+def export_groups(request):
+    return export(request, 'groups', GROUP_COLUMNS, group_rows())
+
+
+@require_GET
+def export_events(request):
+    return export(request, 'events', EVENT_COLUMNS, event_rows())
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -88,6 +89,95 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# MUTUALS_CACHE_BACKEND=locmem keeps entries per process; =file shares them
+# between the workers on a host (under MUTUALS_CACHE_DIR). Rendered responses
+# get their own cache so they can't evict the small keys in "default".
+
+CACHE_BACKEND = os.environ.get("MUTUALS_CACHE_BACKEND", "locmem")
+
+CACHE_DIR = Path(os.environ.get("MUTUALS_CACHE_DIR", BASE_DIR / "cache"))
+
+
+def _cache(name, max_entries):
+    if CACHE_BACKEND == "file":
+        backend = {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": CACHE_DIR / name,
+        }
+    else:
+        backend = {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": f"mutuals-{name}",
+        }
+    return {**backend, "TIMEOUT": 300, "OPTIONS": {"MAX_ENTRIES": max_entries}}
+
+
+CACHES = {
+    "default": _cache("default", 20000),
+    "responses": _cache("responses", 2000),
+}
+
+# Cached list and events-by-user responses (seconds); keyed on the version
+# stamps signals bump, see mutuals_app/cache.py
+
+RESPONSE_CACHE_ALIAS = "responses"
+
+RESPONSE_CACHE_TIMEOUT = 300
+
+
+# Clustering model
+# Seconds between checks for new model artifacts on disk (None disables hot reload)
+
+CLUSTER_MODEL_RELOAD_INTERVAL = 30
+
+# Load the model in a background thread on the first request, so the first
+# signup doesn't pay for it
+
+CLUSTER_MODEL_WARMUP = True
+
+# Score new users against the live User table instead of only the users the
+# model was trained on; the index snapshot lives next to the model artifacts
+
+CLUSTER_LIVE_INDEX = True
+
+CLUSTER_LIVE_INDEX_REFRESH_INTERVAL = 30
+
+# Seconds edits stay in the change log workers replay; a worker further
+# behind rebuilds its index instead
+
+CLUSTER_LIVE_INDEX_CHANGE_RETENTION = 24 * 3600
+
+# Cluster assignments memoized per interest set (in-process LRU size, plus an
+# optional CACHES alias to share them between workers)
+
+CLUSTER_ASSIGNMENT_CACHE_SIZE = 4096
+
+CLUSTER_ASSIGNMENT_CACHE_ALIAS = None
+
+# User IDs each worker reserves at a time (see mutuals_app/ids.py)
+
+USER_ID_BLOCK_SIZE = 100
+
+# Threads scoring signups for the async views (mutuals_app/async_views.py)
+
+CLUSTER_SCORING_WORKERS = 2
+
+# Cached user detail payloads (seconds); invalidated by signals, see mutuals_app/cache.py
+
+USER_DETAIL_CACHE_TIMEOUT = 300
+
+# Serve the users, events and subgroups lists from values() rows and encode
+# them with orjson (same JSON, see mutuals_app/fast_serializers.py)
+
+FAST_SERIALIZATION = False
+
+# Rows fetched per query by the streaming exports (mutuals_app/exports.py)
+
+EXPORT_CHUNK_SIZE = 2000
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -1,39 +1,74 @@
 import os
 import argparse
 import json
+import queue
+import threading
+import time
 import django
 import pandas as pd
-from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 
 # Setup Django environment
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mutuals_backend.settings')  # Replace with your project name
 django.setup()
 
+from django.db import connection, reset_queries, transaction
+from django.db.models import Max
+
 from mutuals_app.models import Interest, User, Group, SubGroup, Event
-from mutuals_app.ml_models.models import assign_user_to_subgroup
+from mutuals_app.ml_models.models import pack_group_into_subgroups
+from mutuals_app.ml_models.recommendations import batch_refresh
 
 
 
 # csv_file = './data/sm500_data.csv'
 
 
+# Headers of the raw export (data/sm_data.csv) -> those of clustered_mutuals.csv
+RAW_USER_COLUMNS = {
+    'UserID': 'user_id',
+    'Name': 'name',
+    'Gender': 'gender',
+    'DOB': 'dob',
+    'Interests': 'interests',
+    'City': 'city',
+    'Occupation': 'occupation',
+    'Budget (£)': 'budget',
+    'Age': 'age',
+    'Age Range': 'age_range',
+}
+
+
 def clean_interest_string(raw):
     return [i.strip(" '") for i in raw.split(',') if i.strip(" '")]
 
-# Load Interests to the Database
-def load_interests(file_path):
-    df = pd.read_csv(file_path)
 
-    # Flatten all interest entries into a list
-    all_interests = []
+def split_interests(raw):
+    """
+    The interest names in a column of "'Nature', 'Cooking'" strings, one
+    per name, indexed by the row they came from.
+    """
+    names = raw.dropna().str.split(',').explode().str.strip(" '")
+    return names[names.notna() & names.ne('')]
 
-    for entry in df['interests'].dropna():
-        # Clean and split on commas
-        interests = [i.strip(" '") for i in entry.split(',')]
-        all_interests.extend(interests)
 
+def read_users_csv(file_path, chunk_size=5000):
+    """
+    The rows of a users CSV, `chunk_size` at a time, so memory doesn't grow
+    with the file. Either layout; users from sm_data.csv have no Cluster
+    (group) yet. user_id is kept as text.
+    """
+    chunks = pd.read_csv(file_path, chunksize=chunk_size, dtype={'user_id': str, 'UserID': str})
+    for chunk in chunks:
+        yield chunk.rename(columns=RAW_USER_COLUMNS)
+
+# Load Interests to the Database
+def load_interests(file_path):
     # Get unique interests
-    unique_interests = set(all_interests)
+    unique_interests = set()
+    for chunk in read_users_csv(file_path):
+        unique_interests.update(split_interests(chunk['interests']))
 
     for interest in unique_interests:
         obj, created = Interest.objects.get_or_create(name=interest)
@@ -63,9 +98,10 @@ def load_groups(file_path):
 
 # Load users to the database
 def load_users(file_path):
-    df = pd.read_csv(file_path)
+    unplaced = {}  # group -> its users without a subgroup yet
 
-    for _, row in df.iterrows():  #islice(df.iterrows(), 28, 35, 1):
+    rows = (row for chunk in read_users_csv(file_path) for _, row in chunk.iterrows())
+    for row in rows:
         user, created = User.objects.get_or_create(
             user_id=row["user_id"],
             defaults={
@@ -92,36 +128,316 @@ def load_users(file_path):
                     continue
 
         # Assign group from "Cluster" column
-        if pd.notna(row["Cluster"]):
+        if pd.notna(row.get("Cluster")):
             group_id = int(row["Cluster"])
             group, _ = Group.objects.get_or_create(group_id=group_id, defaults={"name": f"Group {group_id}"})
             user.group = group
             user.save()
 
-            # Assign to subgroup
-            assign_user_to_subgroup(user, SubGroup, group)
+            if user.subgroup_id is None:
+                unplaced.setdefault(group, []).append(user)
 
         print(f"{'Created' if created else 'Updated'} user: {user.name}")
 
+    # Assign to subgroups, a whole group at a time
+    for group, users in unplaced.items():
+        subgroups = pack_group_into_subgroups(group, users)
+        print(f"Packed {len(users)} users of {group.name} into {len(subgroups)} subgroups")
 
-def load_events(file_path):
-    df = pd.read_csv(file_path)
 
-    for _, row in df.iterrows():
+# Load users with bulk queries (--users --bulk)
+class StageTimes:
+    """
+    Wall time per loading stage, summed over chunks.
+    """
+
+    def __init__(self):
+        self.times = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
         try:
-            Event.objects.get_or_create(
-                event_id=row['event_id'],
-                defaults={
-                    'event_name': row['event_name'],
-                    'event_date': pd.to_datetime(row['event_date']).date(),
-                    'location': row['location'],
-                    'ticket_price': float(row['ticket_price']),
-                    'venue_id': int(row['venue_id']),
-                    'tags': eval(row['tags']) if isinstance(row['tags'], str) else row['tags'],
-                }
-            )
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, elapsed):
+        self.times[name] = self.times.get(name, 0) + elapsed
+
+    def report(self, rows, elapsed):
+        # Reading and parsing overlap the inserts, so stages add up to more
+        for name, stage_elapsed in self.times.items():
+            print(f"{name:<10} {stage_elapsed:8.2f}s")
+        print(f"{'total':<10} {elapsed:8.2f}s   {rows / elapsed if elapsed else 0:,.0f} rows/s")
+
+
+def cluster_groups(clusters):
+    """
+    Group pks by group_id for the given Cluster values, creating missing
+    groups as load_users does.
+    """
+    group_ids = {int(c) for c in clusters}
+    groups = dict(Group.objects.filter(group_id__in=group_ids).values_list('group_id', 'pk'))
+    for group_id in group_ids - groups.keys():
+        group, _ = Group.objects.get_or_create(group_id=group_id, defaults={"name": f"Group {group_id}"})
+        groups[group_id] = group.pk
+    return groups
+
+
+def parse_users(chunk, interest_pks):
+    """
+    Parses and validates a chunk of user rows with vectorized pandas ops.
+    Runs in the parse pool, so it doesn't touch the database.
+
+    Returns (users, links, invalid): the valid rows with typed columns
+    (dob as dates, cluster NaN when missing), the (row in users, interest
+    pk) pairs of their known interests, and how many rows were dropped for
+    a missing user_id or name, an unreadable dob, budget or age, or a
+    user_id repeated within the chunk.
+    """
+    dob = pd.to_datetime(chunk['dob'], errors='coerce')
+    budget = pd.to_numeric(chunk['budget'], errors='coerce')
+    age = pd.to_numeric(chunk['age'], errors='coerce')
+    user_id = chunk['user_id'].str.strip()
+    valid = (
+        user_id.notna() & user_id.ne('') & chunk['name'].notna()
+        & dob.notna() & budget.notna() & age.notna() & ~user_id.duplicated()
+    )
+
+    users = pd.DataFrame({
+        'user_id': user_id,
+        'name': chunk['name'],
+        'dob': dob.dt.date,
+        'gender': chunk['gender'].fillna(''),
+        'city': chunk['city'].fillna(''),
+        'occupation': chunk['occupation'].fillna(''),
+        'budget': budget.astype(float),
+        'age': age,
+        'age_range': chunk['age_range'].fillna(''),
+        'cluster': pd.to_numeric(chunk['Cluster'], errors='coerce') if 'Cluster' in chunk else float('nan'),
+    })[valid]
+    users['age'] = users['age'].astype(int)
+
+    # Interest names -> pks, unknown ones skipped as in load_users
+    names = split_interests(chunk['interests'][valid])
+    rows = pd.Series(range(len(users)), index=users.index)
+    links = pd.DataFrame({
+        'row': rows.reindex(names.index).to_numpy(),
+        'interest': names.map(interest_pks).to_numpy(),
+    }).dropna().astype(int).drop_duplicates().sort_values(['row', 'interest'])
+
+    return users.reset_index(drop=True), links, int((~valid).sum())
+
+
+def _timed_parse(chunk, interest_pks):
+    start = time.perf_counter()
+    return parse_users(chunk, interest_pks), time.perf_counter() - start
+
+
+def parsed_user_chunks(file_path, interest_pks, times, chunk_size=5000, workers=None, read_ahead=4):
+    """
+    Yields parse_users() of each chunk of the file, in file order.
+
+    A thread reads the chunks and hands them to a pool of `workers`
+    processes (none: parsed here), so parsing overlaps whatever the caller
+    does with the results. At most `read_ahead` parsed or parsing chunks
+    wait on the caller, so memory is bounded by the chunk size, not the
+    file size.
+    """
+    chunks = read_users_csv(file_path, chunk_size)
+    if not workers:
+        for chunk in chunks:
+            parsed, elapsed = _timed_parse(chunk, interest_pks)
+            times.add('parse', elapsed)
+            yield parsed
+        return
+
+    done = object()
+    pending = queue.Queue(maxsize=read_ahead)
+    stop = threading.Event()
+    pool = ProcessPoolExecutor(max_workers=workers)
+
+    def read():
+        try:
+            while not stop.is_set():
+                with times.stage('read'):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                pending.put(pool.submit(_timed_parse, chunk, interest_pks))
+            pending.put(done)
         except Exception as e:
-            print(f"Failed to insert row: {row['event_id']} - Error: {e}")
+            pending.put(e)
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    try:
+        while (item := pending.get()) is not done:
+            if isinstance(item, Exception):
+                raise item
+            with times.stage('wait'):
+                parsed, elapsed = item.result()
+            times.add('parse', elapsed)
+            yield parsed
+    finally:
+        # Let a reader blocked on a full queue see the stop
+        stop.set()
+        while reader.is_alive():
+            try:
+                pending.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        pool.shutdown(cancel_futures=True)
+
+
+def prepare_users(users, group_pks):
+    """
+    Unsaved Users for parsed rows, creating the groups of clusters not seen
+    yet (added to `group_pks`).
+    """
+    group_pks.update(cluster_groups(set(users['cluster'].dropna().astype(int)) - group_pks.keys()))
+    return [
+        User(
+            user_id=row['user_id'],
+            name=row['name'],
+            dob=row['dob'],
+            gender=row['gender'],
+            city=row['city'],
+            occupation=row['occupation'],
+            budget=row['budget'],
+            age=row['age'],
+            age_range=row['age_range'],
+            group_id=group_pks.get(row['cluster']),
+        )
+        for row in users.to_dict('records')
+    ]
+
+
+def insert_users(users, links):
+    """
+    Inserts the users not seeded yet and their interest links (parse_users
+    pairs, rows being positions in `users`) in one transaction. Returns
+    (users created, links created).
+
+    Links are written with a plain executemany: building a model instance
+    per link costs more than the insert itself.
+    """
+    Through = User.interests.through
+    quote = connection.ops.quote_name
+    insert_links = "INSERT INTO {} ({}, {}) VALUES (%s, %s)".format(
+        quote(Through._meta.db_table),
+        quote(Through._meta.get_field('user').column),
+        quote(Through._meta.get_field('interest').column),
+    )
+    with transaction.atomic():
+        existing = set(
+            User.objects.filter(user_id__in=[user.user_id for user in users]).values_list('user_id', flat=True)
+        )
+        new = [row for row, user in enumerate(users) if user.user_id not in existing]
+        created = User.objects.bulk_create([users[row] for row in new])
+        if any(user.pk is None for user in created):
+            # Backends that can't return ids from a bulk insert
+            pks = dict(User.objects.filter(user_id__in=[u.user_id for u in created]).values_list('user_id', 'pk'))
+            for user in created:
+                user.pk = pks[user.user_id]
+
+        links = links[links['row'].isin(new)]
+        user_pks = [users[row].pk for row in links['row'].tolist()]
+        with connection.cursor() as cursor:
+            cursor.executemany(insert_links, zip(user_pks, links['interest'].tolist()))
+    return len(created), len(links)
+
+
+def pack_new_users(after_pk, chunk_size=5000):
+    """
+    Packs the grouped users with pks above `after_pk` and no subgroup into
+    subgroups, a group at a time and `chunk_size` users (in pk order) at a
+    time, so memory doesn't grow with the file. Returns the number of
+    subgroups created.
+    """
+    users = (
+        User.objects.filter(pk__gt=after_pk, group__isnull=False, subgroup__isnull=True)
+        .only('pk', 'user_id', 'age', 'budget', 'group', 'subgroup')
+        .order_by('pk')
+    )
+    # Unordered: ordering by pk would make distinct() apply to (group_id, pk) pairs
+    groups = Group.objects.in_bulk(users.order_by().values_list('group_id', flat=True).distinct())
+    created = 0
+    for group in groups.values():
+        last_pk = after_pk
+        while chunk := list(users.filter(group=group, pk__gt=last_pk)[:chunk_size]):
+            created += len(pack_group_into_subgroups(group, chunk))
+            last_pk = chunk[-1].pk
+    return created
+
+
+def load_users_bulk(file_path, chunk_size=5000, workers=None, read_ahead=4):
+    """
+    load_users with bulk queries. The file is streamed in chunks, parsed in
+    a pool of `workers` processes (default: one per CPU but one) while
+    earlier chunks are written; see parsed_user_chunks. The interest map is
+    read once, each chunk is inserted (users, then their interest links) in
+    one transaction, and subgroups are packed at the end. Users already in
+    the database are skipped rather than updated. Signals aren't sent;
+    running servers pick the new users up into their live index on the next
+    refresh.
+    """
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) - 1)
+
+    start = time.perf_counter()
+    times = StageTimes()
+    with times.stage('lookups'):
+        interest_pks = dict(Interest.objects.values_list('name', 'pk'))
+        last_pk = User.objects.aggregate(last=Max('pk'))['last'] or 0
+
+    group_pks = {}
+    rows = created = links = invalid = 0
+    for users, user_links, chunk_invalid in parsed_user_chunks(
+        file_path, interest_pks, times, chunk_size, workers, read_ahead
+    ):
+        with times.stage('prepare'):
+            prepared = prepare_users(users, group_pks)
+        with times.stage('insert'):
+            chunk_created, chunk_links = insert_users(prepared, user_links)
+        rows += len(users) + chunk_invalid
+        created += chunk_created
+        links += chunk_links
+        invalid += chunk_invalid
+        reset_queries()  # With DEBUG on, the query log keeps every insert
+
+    with times.stage('subgroups'):
+        subgroups = pack_new_users(last_pk, chunk_size)
+
+    times.report(rows, time.perf_counter() - start)
+    print(
+        f"Created {created} users ({rows - created - invalid} already seeded, {invalid} invalid), "
+        f"{links} interest links and {subgroups} subgroups"
+    )
+    return times
+
+
+def load_events(file_path):
+    rows = (row for chunk in pd.read_csv(file_path, chunksize=5000) for _, row in chunk.iterrows())
+
+    # Group recommendations are refreshed once at the end, not per event
+    with batch_refresh():
+        for row in rows:
+            try:
+                Event.objects.get_or_create(
+                    event_id=row['event_id'],
+                    defaults={
+                        'event_name': row['event_name'],
+                        'event_date': pd.to_datetime(row['event_date']).date(),
+                        'location': row['location'],
+                        'ticket_price': float(row['ticket_price']),
+                        'venue_id': int(row['venue_id']),
+                        'tags': eval(row['tags']) if isinstance(row['tags'], str) else row['tags'],
+                    }
+                )
+            except Exception as e:
+                print(f"Failed to insert row: {row['event_id']} - Error: {e}")
 
 
 def clear_data():
@@ -137,6 +453,10 @@ def main():
     parser.add_argument('--groups', action='store_true', help='Load groups data')
     parser.add_argument('--file', type=str, default='./data/clustered_mutuals.csv', help='Path to CSV file')
     parser.add_argument('--clear', action='store_true', help='Clears data')
+    parser.add_argument('--bulk', action='store_true', help='Load users with bulk inserts, in chunked transactions')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Users inserted per transaction with --bulk')
+    parser.add_argument('--workers', type=int, default=None, help='Parse processes with --bulk (default: CPU count - 1, 0 parses inline)')
+    parser.add_argument('--read-ahead', type=int, default=4, help='Chunks read ahead of the inserts with --bulk')
 
     args = parser.parse_args()
 
@@ -150,7 +470,10 @@ def main():
         load_groups(args.file)
 
     if args.users:
-        load_users(args.file)
+        if args.bulk:
+            load_users_bulk(args.file, args.chunk_size, args.workers, args.read_ahead)
+        else:
+            load_users(args.file)
     
     if args.clear:
         clear_data()